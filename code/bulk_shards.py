@@ -0,0 +1,93 @@
+# bulk_shards.py
+"""
+Splitting a bulk run across machines with --shard i/N, and merging the shard outputs back together.
+
+Each preset belongs to exactly one shard, chosen from a hash of its name. The assignment depends only
+on the name and N, not on preset order or on which machine does the work.
+"""
+
+import os
+import hashlib
+import shutil
+from render_manifest import RenderManifest
+
+
+def shard_of(preset_name, shard_count):
+    """The 1-based shard a preset belongs to when the run is split into `shard_count` shards."""
+    digest = hashlib.sha256(preset_name.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count + 1
+
+
+def in_shard(preset_name, shard):
+    """True if `preset_name` belongs to `shard`, an (i, N) tuple; every preset belongs to shard None."""
+    return shard is None or shard_of(preset_name, shard[1]) == shard[0]
+
+
+def _copy_output(source_path, target_path):
+    # Copy under a temporary name first so a half-copied file never looks like a finished output
+    tmp_path = f"{target_path}.tmp"
+    shutil.copy2(source_path, tmp_path)
+    os.replace(tmp_path, target_path)
+
+
+def merge_shards(shard_dirs, output_dir):
+    """
+    Copies the outputs listed in each shard's render manifest into `output_dir` and merges the manifests,
+    so a later unsharded run in `output_dir` sees every preset as up to date.
+    Presets whose outputs in `output_dir` are already up to date are not copied again.
+    :return: A (success, message) tuple. Missing shards or shards that did not finish are reported
+             as warnings and still merged.
+    """
+    target = RenderManifest.load(output_dir)
+    target.shard = None
+    sources = {}
+    copied, current = 0, 0
+    warnings = []
+    shard_counts = set()
+    shards_seen = set()
+
+    for shard_dir in shard_dirs:
+        shard = RenderManifest.load(shard_dir)
+        if not shard.entries:
+            warnings.append(f"'{shard_dir}' has no render manifest entries.")
+            continue
+        if shard.interrupted:
+            warnings.append(f"'{shard_dir}' did not finish; only its completed presets are merged.")
+        if shard.shard:
+            shard_counts.add(shard.shard[1])
+            shards_seen.add(tuple(shard.shard))
+
+        for preset_name, entry in sorted(shard.entries.items()):
+            if preset_name in sources and sources[preset_name][1] != entry['key']:
+                warnings.append(f"'{preset_name}' is in both '{sources[preset_name][0]}' and '{shard_dir}' "
+                                f"with different settings; keeping the one from '{shard_dir}'.")
+            if target.is_up_to_date(preset_name, entry['key']):
+                sources[preset_name] = (shard_dir, entry['key'])
+                current += 1
+                continue
+            missing = [filename for filename in entry['outputs'] if not os.path.exists(os.path.join(shard_dir, filename))]
+            if missing:
+                warnings.append(f"'{preset_name}' in '{shard_dir}' is missing {', '.join(missing)}; skipped.")
+                continue
+            os.makedirs(output_dir, exist_ok=True)
+            for filename in entry['outputs']:
+                _copy_output(os.path.join(shard_dir, filename), os.path.join(output_dir, filename))
+            target.record(preset_name, entry['key'], entry['outputs'])
+            sources[preset_name] = (shard_dir, entry['key'])
+            copied += 1
+
+    if len(shard_counts) > 1:
+        warnings.append(f"The shard directories come from runs split {' and '.join(map(str, sorted(shard_counts)))} ways.")
+    elif shard_counts:
+        shard_count = shard_counts.pop()
+        missing_shards = [f"{index}/{shard_count}" for index in range(1, shard_count + 1) if (index, shard_count) not in shards_seen]
+        if missing_shards:
+            warnings.append(f"No output for shard(s) {', '.join(missing_shards)}; the merged tree is incomplete.")
+
+    for warning in warnings:
+        print(f"Warning: {warning}")
+    if not sources:
+        return False, "Nothing to merge: none of the shard directories has finished presets."
+    target.save()
+    return True, (f"Merged {len(sources)} presets from {len(shard_dirs)} shard directories into '{output_dir}' "
+                  f"({copied} copied, {current} already up to date).")
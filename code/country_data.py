@@ -270,6 +270,19 @@ COUNTRY_CODES = {
     "Tuvalu": "tv", "Vanuatu": "vu"
 }
 
+# Alternative spellings accepted wherever a country name is expected (matched case-insensitively).
+COUNTRY_ALIASES = {
+    "Czechia": "Czech Republic", "Great Britain": "United Kingdom", "Britain": "United Kingdom",
+    "United States": "USA", "United States of America": "USA", "Holland": "Netherlands",
+    "The Netherlands": "Netherlands", "Macedonia": "North Macedonia", "Russian Federation": "Russia",
+    "Vatican": "Vatican City", "Holy See": "Vatican City", "Ivory Coast": "Cote d'Ivoire",
+    "C\u00f4te d'Ivoire": "Cote d'Ivoire", "Cape Verde": "Cabo Verde", "Swaziland": "Eswatini",
+    "East Timor": "Timor-Leste", "Burma": "Myanmar", "Turkiye": "Turkey", "T\u00fcrkiye": "Turkey",
+    "UAE": "United Arab Emirates", "Republic of Korea": "South Korea",
+    "Democratic Republic of the Congo": "Congo (Dem. Rep.)", "DR Congo": "Congo (Dem. Rep.)",
+    "Republic of the Congo": "Congo (Rep.)",
+}
+
 if __name__ == "__main__":
     print("Country Data Module")
     print("-------------------")
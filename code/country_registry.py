@@ -0,0 +1,108 @@
+# country_registry.py
+
+import os
+import difflib
+
+DEFAULT_FLAGS_DIR = "flags"
+
+
+def parse_hex_color(hex_color):
+    """'#DA291C' -> (218, 41, 28)"""
+    value = hex_color.lstrip('#')
+    if len(value) == 3:
+        value = ''.join(ch * 2 for ch in value)
+    return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+
+
+class Country:
+    """
+    One read-only country record: display name, ISO 3166-1 alpha-2 code, flag colors
+    (as the original hex strings and as parsed RGB tuples) and the path of its flag file.
+    """
+    __slots__ = ("name", "code", "colors", "rgb_colors", "flag_path", "aliases")
+
+    def __init__(self, name, code, colors, flag_path, aliases=()):
+        for attr, value in (("name", name), ("code", code), ("colors", tuple(colors)),
+                            ("rgb_colors", tuple(parse_hex_color(color) for color in colors)),
+                            ("flag_path", flag_path), ("aliases", tuple(aliases))):
+            object.__setattr__(self, attr, value)
+
+    def __setattr__(self, attr, value):
+        raise AttributeError(f"Country records are read-only (tried to set '{attr}').")
+
+    def __delattr__(self, attr):
+        raise AttributeError(f"Country records are read-only (tried to delete '{attr}').")
+
+    def __reduce__(self):
+        # Slots without __dict__ and a blocked __setattr__ need an explicit recipe for pickling (process pools)
+        return (Country, (self.name, self.code, self.colors, self.flag_path, self.aliases))
+
+    def __repr__(self):
+        return f"Country(name={self.name!r}, code={self.code!r})"
+
+
+class CountryRegistry:
+    """
+    All known countries, built once from country_data. Lookups are single dict hits on a
+    case-insensitive index of ISO codes, names and aliases: 'pl', 'PL', 'Poland' and 'poland' all
+    resolve to the same record.
+    """
+    def __init__(self, country_colors, country_codes, aliases=None, flags_dir=DEFAULT_FLAGS_DIR):
+        aliases_by_name = {}
+        for alias, name in (aliases or {}).items():
+            aliases_by_name.setdefault(name, []).append(alias)
+
+        self._by_code = {}
+        self._index = {}
+        for name in sorted(country_codes):
+            if name not in country_colors:
+                raise ValueError(f"Country '{name}' has a code but no colors in country_data.py.")
+            code = country_codes[name]
+            country = Country(name, code, country_colors[name], os.path.join(flags_dir, f"{code}.svg"), aliases_by_name.get(name, ()))
+            self._by_code[code] = country
+            for key in (code, name, *country.aliases):
+                existing = self._index.setdefault(key.lower(), country)
+                if existing is not country:
+                    raise ValueError(f"'{key}' refers to both {existing.name} and {name}.")
+        for name in aliases_by_name:
+            if name not in country_codes:
+                raise ValueError(f"Alias target '{name}' is not a known country.")
+        self.names = tuple(country.name for country in self._by_code.values())
+        self.flags_dir = flags_dir
+
+    def reload(self, country_colors, country_codes, aliases=None):
+        """
+        Rebuilds the registry in place from new country data, so every module holding a reference sees it.
+        The data is validated first; on a ValueError the registry is left unchanged.
+        :return: The set of ISO codes that were added, removed or given different colors.
+        """
+        updated = CountryRegistry(country_colors, country_codes, aliases=aliases, flags_dir=self.flags_dir)
+        old_colors = {country.code: country.colors for country in self}
+        new_colors = {country.code: country.colors for country in updated}
+        self.__dict__.update(updated.__dict__)
+        return {code for code in old_colors.keys() | new_colors.keys() if old_colors.get(code) != new_colors.get(code)}
+
+    def get(self, key):
+        """The Country for a code, name or alias (any letter case), or None, also for keys that are not strings."""
+        if not key or not isinstance(key, str): return None
+        return self._index.get(key.strip().lower())
+
+    def by_code(self, code):
+        """The Country for an exact ISO code as stored in leaf params, or None."""
+        return self._by_code.get(code)
+
+    def suggest(self, key, limit=3):
+        """Close matches among names and aliases, for 'did you mean' messages."""
+        candidates = {name.lower(): name for name in self.names}
+        for country in self._by_code.values():
+            candidates.update((alias.lower(), alias) for alias in country.aliases)
+        return [candidates[match] for match in difflib.get_close_matches(key.strip().lower(), candidates, n=limit)]
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        return iter(self._by_code.values())
+
+    def __len__(self):
+        return len(self._by_code)
@@ -0,0 +1,155 @@
+# fast_raster.py
+"""
+A small NumPy rasterizer for logos whose shapes are all filled with solid colors or linear gradients.
+It draws the same pictures CairoSVG would for such documents (nonzero fill rule, pad-extended
+objectBoundingBox gradients, source-over compositing) without building, serializing or parsing any SVG.
+"""
+
+import struct
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from path_geometry import flatten_path, control_point_bbox
+
+SUBSAMPLES = 16          # Sample rows per pixel row; coverage along each row is computed exactly
+FLATTEN_TOLERANCE = 0.05  # In output pixels
+# Unfiltered rows at zlib level 3 come out about as small as CairoSVG's PNGs of the same logos, at a
+# third of the encoding time of the usual level 6
+PNG_COMPRESSION_LEVEL = 3
+
+
+def _edges(d_attr, scale):
+    """The flattened path as an (n, 4) array of x0, y0, x1, y1 edges in pixels, every subpath closed."""
+    edges = []
+    for subpath in flatten_path(d_attr, FLATTEN_TOLERANCE / scale):
+        points = np.asarray(subpath, dtype=np.float64) * scale
+        edges.append(np.hstack((points, np.roll(points, -1, axis=0))))
+    return np.vstack(edges) if edges else np.zeros((0, 4))
+
+
+@lru_cache(maxsize=64)
+def coverage_mask(d_attr, width, height, scale):
+    """
+    Antialiased coverage of a path drawn at `scale` pixels per unit on a width x height canvas.
+    :return: (top, left, mask) where mask is a float32 array in [0, 1] for the rows/columns of the
+             canvas the path touches, or None if it touches none. Memoized per path and size, so a bulk
+             run flattens each template shape once per output width.
+    """
+    edges = _edges(d_attr, scale)
+    edges = edges[edges[:, 1] != edges[:, 3]]  # Horizontal edges never cross a sample row
+    if not len(edges):
+        return None
+    x0, y0, x1, y1 = edges.T
+    direction = np.where(y1 > y0, 1.0, -1.0)
+    y_low, y_high = np.minimum(y0, y1), np.maximum(y0, y1)
+
+    # Sample row k sits at y = (k + 0.5) / SUBSAMPLES; each edge crosses rows first..last-1
+    first = np.clip(np.ceil(y_low * SUBSAMPLES - 0.5), 0, height * SUBSAMPLES).astype(np.int64)
+    last = np.clip(np.ceil(y_high * SUBSAMPLES - 0.5), 0, height * SUBSAMPLES).astype(np.int64)
+    counts = last - first
+    if not counts.sum():
+        return None
+    edge_index = np.repeat(np.arange(len(edges)), counts)
+    rows = first[edge_index] + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+    sample_y = (rows + 0.5) / SUBSAMPLES
+    xs = x0[edge_index] + (sample_y - y0[edge_index]) * (x1[edge_index] - x0[edge_index]) / (y1[edge_index] - y0[edge_index])
+    xs = np.clip(xs, 0.0, float(width))
+    weights = direction[edge_index] / SUBSAMPLES
+
+    # Each crossing adds its winding from x onwards; split it between the two pixels around x so the
+    # running sum along the row gives exact horizontal coverage.
+    pixel_rows = rows // SUBSAMPLES
+    top, bottom = int(pixel_rows.min()), int(pixel_rows.max()) + 1
+    left = int(np.floor(xs.min()))
+    right = min(int(np.floor(xs.max())) + 2, width + 1)
+    columns = np.floor(xs).astype(np.int64)
+    fraction = xs - columns
+    span = right - left + 1
+    index = (pixel_rows - top) * span + (columns - left)
+    accumulator = np.bincount(index, weights * (1.0 - fraction), minlength=(bottom - top) * span)
+    accumulator += np.bincount(index + 1, weights * fraction, minlength=(bottom - top) * span)[:(bottom - top) * span]
+    winding = np.cumsum(accumulator.reshape(bottom - top, span), axis=1)[:, :min(span, width - left)]
+    return top, left, np.clip(np.abs(winding), 0.0, 1.0).astype(np.float32)
+
+
+def linear_gradient(bbox, coords, stops, top, left, rows, columns, scale):
+    """
+    Colors of an objectBoundingBox <linearGradient> at the pixel centers of a rows x columns window.
+    :param coords: The x1/y1/x2/y2 attributes as fractions of the box.
+    :param stops: (offset, (r, g, b)) pairs with offsets in [0, 1], in document order.
+    :return: A float32 array of 0-255 color values that broadcasts to (3, rows, columns); axis-aligned
+             gradients come back as a single row or column per channel.
+    """
+    box_x, box_y, box_w, box_h = bbox
+    u = ((left + np.arange(columns) + 0.5) / scale - box_x) / box_w
+    v = ((top + np.arange(rows) + 0.5) / scale - box_y) / box_h
+    x1, y1, x2, y2 = coords
+    dx, dy = x2 - x1, y2 - y1
+    length = dx * dx + dy * dy
+    if not length or len(stops) == 1:
+        return np.array(stops[-1][1] if not length else stops[0][1], dtype=np.float32)[:, None, None]
+    if dx == 0:
+        t = ((v - y1) * dy / length)[:, None]
+    elif dy == 0:
+        t = ((u - x1) * dx / length)[None, :]
+    else:
+        t = ((u[None, :] - x1) * dx + (v[:, None] - y1) * dy) / length
+    t = np.clip(t, 0.0, 1.0)  # spreadMethod="pad"
+
+    offsets = np.maximum.accumulate(np.array([offset for offset, _ in stops], dtype=np.float64))
+    colors = np.array([color for _, color in stops], dtype=np.float64)
+    return np.stack([np.interp(t, offsets, colors[:, channel]) for channel in range(3)]).astype(np.float32)
+
+
+def encode_png(rgba):
+    """Encodes an (height, width, 4) uint8 array as an 8-bit RGBA PNG."""
+    height, width, _ = rgba.shape
+    rows = np.zeros((height, width * 4 + 1), dtype=np.uint8)  # Leading 0 per row: filter type None
+    rows[:, 1:] = rgba.reshape(height, width * 4)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows.tobytes(), PNG_COMPRESSION_LEVEL))
+            + chunk(b"IEND", b""))
+
+
+def render_png(layers, view_width, view_height, png_width):
+    """
+    Draws `layers` in order onto a transparent canvas and returns PNG bytes.
+    The canvas maps a view_width x view_height viewBox to png_width pixels, sized the way CairoSVG
+    sizes it for an output_width.
+    :param layers: (d_attr, paint) pairs, where paint is ('solid', (r, g, b)) or
+                   ('gradient', (x1, y1, x2, y2), ((offset, (r, g, b)), ...)).
+    """
+    scale = png_width / view_width
+    width, height = int(round(png_width)), int(round(view_height * scale))
+    # Planar (channel, row, column) buffers keep every window update on contiguous rows
+    premultiplied = np.zeros((3, height, width), dtype=np.float32)
+    alpha = np.zeros((height, width), dtype=np.float32)
+
+    for d_attr, paint in layers:
+        coverage = coverage_mask(d_attr, width, height, scale)
+        if coverage is None: continue
+        top, left, mask = coverage
+        rows, columns = mask.shape
+        if paint[0] == 'gradient':
+            color = linear_gradient(control_point_bbox(d_attr), paint[1], paint[2], top, left, rows, columns, scale)
+        else:
+            color = np.array(paint[1], dtype=np.float32)[:, None, None]
+        # Source-over on premultiplied colors: dst += (src - dst) * coverage
+        window = (slice(top, top + rows), slice(left, left + columns))
+        target = premultiplied[:, window[0], window[1]]
+        target += (color - target) * mask
+        alpha[window] += (1.0 - alpha[window]) * mask
+
+    rgba = np.empty((height, width, 4), dtype=np.uint8)
+    straight = premultiplied / np.where(alpha > 0, alpha, 1.0)
+    np.rint(straight, out=straight)
+    np.clip(straight, 0, 255, out=straight)
+    rgba[..., :3] = straight.transpose(1, 2, 0)
+    rgba[..., 3] = np.rint(alpha * 255)
+    return encode_png(rgba)
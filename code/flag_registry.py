@@ -0,0 +1,233 @@
+# flag_registry.py
+
+import xml.etree.ElementTree as ET
+import os
+import re
+import glob
+import base64
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+DEFAULT_FLAGS_DIR = "flags"
+DEFAULT_MAX_ENTRIES = 64
+
+SVG_NAMESPACE = "http://www.w3.org/2000/svg"
+XLINK_NAMESPACE = "http://www.w3.org/1999/xlink"
+# Editor metadata and text that never renders; dropped when a flag is inlined
+SKIPPED_INLINE_TAGS = {f"{{{SVG_NAMESPACE}}}{tag}" for tag in ("title", "desc", "metadata")}
+# Elements whose effect is not confined to the flag once it sits in the logo's document
+UNSUPPORTED_INLINE_TAGS = {f"{{{SVG_NAMESPACE}}}{tag}" for tag in ("style", "script")}
+# Root <svg> attributes that describe the viewport rather than inheritable presentation
+ROOT_VIEWPORT_ATTRIBUTES = {"id", "version", "baseProfile", "x", "y", "width", "height", "viewBox", "preserveAspectRatio", "class"}
+URL_REFERENCE_PATTERN = re.compile(r"url\(\s*#([^)\s]+)\s*\)")
+
+# Everything the styler needs to know about a flag file, computed once per file version.
+# inline_element is the flag's artwork as a <g> ready to be copied into a logo's <defs> (None if the
+# file cannot be inlined, with the reason in inline_error).
+FlagAsset = namedtuple("FlagAsset", [
+    "country_code", "path", "mtime_ns", "size",
+    "svg_bytes", "digest", "view_box", "width", "height", "aspect_ratio", "data_uri",
+    "inline_element", "inline_error",
+])
+
+
+# Offsets (relative to the viewport size) and scales this close to the identity are rounding noise
+IDENTITY_TOLERANCE = 1e-6
+
+
+def _format_number(value):
+    return f"{value:.6g}"
+
+
+def _snap(value, identity, tolerance):
+    return identity if abs(value - identity) <= tolerance else value
+
+
+def viewport_transform(flag_root, width, height):
+    """
+    The transform that maps a flag's viewBox onto its width x height viewport, following the
+    preserveAspectRatio rules an <image> of the file would apply. Returns None for the identity.
+    """
+    view_box = flag_root.get("viewBox")
+    if not view_box:
+        return None
+    min_x, min_y, box_w, box_h = (float(value) for value in view_box.replace(',', ' ').split())
+    if box_w <= 0 or box_h <= 0:
+        raise ValueError(f"invalid viewBox '{view_box}'")
+
+    align, _, meet_or_slice = flag_root.get("preserveAspectRatio", "xMidYMid meet").strip().partition(' ')
+    scale_x, scale_y = width / box_w, height / box_h
+    if align == "none":
+        translate_x, translate_y = -min_x * scale_x, -min_y * scale_y
+    else:
+        scale_x = scale_y = max(scale_x, scale_y) if meet_or_slice.strip() == "slice" else min(scale_x, scale_y)
+        factors = {"Min": 0.0, "Mid": 0.5, "Max": 1.0}
+        translate_x = -min_x * scale_x + (width - box_w * scale_x) * factors.get(align[1:4], 0.5)
+        translate_y = -min_y * scale_y + (height - box_h * scale_y) * factors.get(align[5:8], 0.5)
+
+    # Snap each component on its own, so e.g. a viewBox of 119.99999 x 120 does not leave translate(5e-06,0) behind
+    offset_tolerance = IDENTITY_TOLERANCE * max(width, height)
+    translate_x, translate_y = (_snap(value, 0.0, offset_tolerance) for value in (translate_x, translate_y))
+    scale_x, scale_y = (_snap(value, 1.0, IDENTITY_TOLERANCE) for value in (scale_x, scale_y))
+
+    parts = []
+    if translate_x or translate_y:
+        parts.append(f"translate({_format_number(translate_x)},{_format_number(translate_y)})")
+    if scale_x != 1.0 or scale_y != 1.0:
+        parts.append(f"scale({_format_number(scale_x)})" if scale_x == scale_y else f"scale({_format_number(scale_x)},{_format_number(scale_y)})")
+    return " ".join(parts) or None
+
+
+def build_inline_element(country_code, flag_root, width, height):
+    """
+    Turns a parsed flag SVG into a <g id="flag-{code}"> drawn at the flag's natural width x height, so it
+    can replace the <image> a pattern would otherwise reference. Every id inside the flag is prefixed
+    with 'flag-{code}-' and every reference to it (href, url(#...)) is rewritten to match, so flags never
+    collide with each other or with the logo. Editor metadata, foreign attributes and class names
+    (which the logo's own stylesheet could otherwise match) are dropped.
+    :raises ValueError: If the flag uses features that would leak into the rest of the logo, like <style>.
+    """
+    id_prefix = f"flag-{country_code}-"
+    group = ET.Element(f"{{{SVG_NAMESPACE}}}g", {"id": f"flag-{country_code}"})
+    for attr, value in flag_root.attrib.items():
+        if attr not in ROOT_VIEWPORT_ATTRIBUTES and not attr.startswith('{'):
+            group.set(attr, value)
+    transform = viewport_transform(flag_root, width, height)
+    if transform:
+        group.set("transform", transform)
+
+    local_ids = {el.get("id") for el in flag_root.iter() if el.get("id")}
+
+    def rewrite_reference(match):
+        target = match.group(1)
+        return f"url(#{id_prefix}{target})" if target in local_ids else match.group(0)
+
+    def import_element(source):
+        if source.tag in UNSUPPORTED_INLINE_TAGS:
+            raise ValueError(f"<{source.tag.split('}')[-1]}> cannot be inlined")
+        copy_el = ET.Element(source.tag)
+        # Keep text content (e.g. in <text>) but not the indentation between elements
+        copy_el.text = source.text if source.text and source.text.strip() else None
+        for attr, value in source.attrib.items():
+            if attr == "class" or (attr.startswith('{') and not attr.startswith(f"{{{XLINK_NAMESPACE}}}")):
+                continue
+            if attr == "id":
+                value = id_prefix + value
+            elif attr in (f"{{{XLINK_NAMESPACE}}}href", "href") and value.startswith('#') and value[1:] in local_ids:
+                value = f"#{id_prefix}{value[1:]}"
+            elif "url(" in value:
+                value = URL_REFERENCE_PATTERN.sub(rewrite_reference, value)
+            copy_el.set(attr, value)
+        for child in source:
+            if child.tag.startswith(f"{{{SVG_NAMESPACE}}}") and child.tag not in SKIPPED_INLINE_TAGS:
+                copy_el.append(import_element(child))
+        return copy_el
+
+    for child in flag_root:
+        if child.tag.startswith(f"{{{SVG_NAMESPACE}}}") and child.tag not in SKIPPED_INLINE_TAGS:
+            group.append(import_element(child))
+    return group
+
+
+def load_flag_asset(country_code, path):
+    """Reads, parses and encodes a single flag SVG file into a FlagAsset."""
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        svg_bytes = f.read()
+
+    flag_root = ET.fromstring(svg_bytes)
+    flag_viewbox = flag_root.get("viewBox", "0 0 100 100").split()
+    flag_w = float(flag_root.get("width", flag_viewbox[2] if len(flag_viewbox) == 4 else "100"))
+    flag_h = float(flag_root.get("height", flag_viewbox[3] if len(flag_viewbox) == 4 else "100"))
+    flag_aspect_ratio = flag_w / flag_h if flag_h > 0 else 1
+
+    try:
+        inline_element, inline_error = build_inline_element(country_code, flag_root, flag_w, flag_h), None
+    except ValueError as e:
+        inline_element, inline_error = None, str(e)
+
+    encoded_flag = base64.b64encode(svg_bytes).decode('ascii')
+    return FlagAsset(
+        country_code=country_code, path=path, mtime_ns=stat.st_mtime_ns, size=stat.st_size,
+        svg_bytes=svg_bytes, digest=hashlib.sha256(svg_bytes).hexdigest(),
+        view_box=tuple(flag_viewbox), width=flag_w, height=flag_h, aspect_ratio=flag_aspect_ratio,
+        data_uri=f"data:image/svg+xml;base64,{encoded_flag}",
+        inline_element=inline_element, inline_error=inline_error,
+    )
+
+
+class FlagRegistry:
+    """
+    A bounded, thread-safe LRU cache of FlagAssets keyed by country code.
+    An entry is reloaded when its file's mtime or size changes, and dropped when the file disappears.
+    """
+    def __init__(self, flags_dir=DEFAULT_FLAGS_DIR, max_entries=DEFAULT_MAX_ENTRIES):
+        self.flags_dir = flags_dir
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def flag_path(self, country_code):
+        return os.path.join(self.flags_dir, f"{country_code}.svg")
+
+    def get(self, country_code):
+        """
+        Returns the FlagAsset for `country_code`, or None if there is no flag file for it.
+        Raises if the file exists but cannot be parsed.
+        """
+        path = self.flag_path(country_code)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with self._lock:
+                self._entries.pop(country_code, None)
+            return None
+
+        with self._lock:
+            asset = self._entries.get(country_code)
+            if asset is not None and asset.path == path and asset.mtime_ns == stat.st_mtime_ns and asset.size == stat.st_size:
+                self._entries.move_to_end(country_code)
+                self.hits += 1
+                return asset
+
+        # Load outside the lock; a concurrent duplicate load is harmless.
+        asset = load_flag_asset(country_code, path)
+        with self._lock:
+            self.misses += 1
+            self._entries[country_code] = asset
+            self._entries.move_to_end(country_code)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return asset
+
+    def preload(self):
+        """
+        Loads every flags/*.svg file into the registry.
+        :return: The list of country codes that were loaded successfully.
+        """
+        loaded = []
+        for path in sorted(glob.glob(os.path.join(self.flags_dir, "*.svg"))):
+            country_code = os.path.splitext(os.path.basename(path))[0]
+            try:
+                if self.get(country_code) is not None:
+                    loaded.append(country_code)
+            except Exception as e:
+                print(f"Warning: Could not preload flag '{path}'. Reason: {e}")
+        return loaded
+
+    def invalidate(self, country_code=None):
+        """Drops one entry, or the whole cache when no country code is given."""
+        with self._lock:
+            if country_code is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(country_code, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, country_code):
+        return country_code in self._entries
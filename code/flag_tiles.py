@@ -0,0 +1,122 @@
+# flag_tiles.py
+
+import os
+import base64
+import threading
+from collections import OrderedDict
+
+DEFAULT_TILE_DIR = ".flag_tiles"
+DEFAULT_MAX_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+MIN_TILE_WIDTH = 64
+MAX_TILE_WIDTH = 8192
+
+
+def tile_bucket(pixel_width):
+    """
+    The tile width used for a flag drawn `pixel_width` pixels wide: the smallest step of the
+    64, 91, 128, 181, 256, ... series (x sqrt(2) per step) that is at least that wide, capped at 8192.
+    Nearby sizes share a tile, and a tile is never scaled down by more than about 30%.
+    """
+    step = 0
+    width = MIN_TILE_WIDTH
+    while width < pixel_width and width < MAX_TILE_WIDTH:
+        step += 1
+        width = min(round(MIN_TILE_WIDTH * 2 ** (step / 2)), MAX_TILE_WIDTH)
+    return width
+
+
+class FlagTileCache:
+    """
+    PNG renderings of flag SVGs, keyed by (country code, flag file digest, bucketed width).
+    Tiles are kept as data URIs in a bounded in-memory LRU and as PNG files in `directory`, which is
+    shared between processes and runs. When the directory grows past its limit, the least recently
+    used files are deleted.
+    :param rasterize: Callable(svg_bytes, width) -> png_bytes. Only called on a cache miss.
+    """
+    def __init__(self, rasterize, directory=DEFAULT_TILE_DIR, max_memory_bytes=DEFAULT_MAX_MEMORY_BYTES, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.rasterize = rasterize
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def tile_path(self, flag_asset, width):
+        return os.path.join(self.directory, f"{flag_asset.country_code}-{flag_asset.digest[:16]}-{width}.png")
+
+    def data_uri(self, flag_asset, pixel_width):
+        """Returns a data:image/png URI of `flag_asset` rasterized at least `pixel_width` pixels wide."""
+        width = tile_bucket(pixel_width)
+        key = (flag_asset.country_code, flag_asset.digest, width)
+        with self._lock:
+            uri = self._memory.get(key)
+            if uri is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return uri
+
+        path = self.tile_path(flag_asset, width)
+        try:
+            with open(path, "rb") as f:
+                png_bytes = f.read()
+        except OSError:
+            png_bytes = self.rasterize(flag_asset.svg_bytes, width)
+            self.misses += 1
+            self._write_tile(path, png_bytes)
+        else:
+            self.disk_hits += 1
+            try:
+                os.utime(path)  # Marks the tile as recently used for disk eviction
+            except OSError:
+                pass
+
+        uri = f"data:image/png;base64,{base64.b64encode(png_bytes).decode('ascii')}"
+        with self._lock:
+            if key not in self._memory:
+                self._memory[key] = uri
+                self._memory_bytes += len(uri)
+            while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+        return uri
+
+    def _write_tile(self, path, png_bytes):
+        # Written under a process-unique name and renamed, so concurrent workers never read a partial tile
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(png_bytes)
+            os.replace(tmp_path, path)
+            self._evict_disk(keep=path)
+        except OSError as e:
+            print(f"Warning: Could not write flag tile '{path}'. Reason: {e}")
+
+    def _evict_disk(self, keep=None):
+        tiles = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".png") and entry.is_file():
+                    stat = entry.stat()
+                    tiles.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in tiles)
+        for _, size, path in sorted(tiles):
+            if total <= self.max_disk_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                total -= size  # Another worker evicted it first
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
@@ -0,0 +1,160 @@
+# pair_matrix.py
+"""
+Expands a compact language matrix into presets.json-style entries, one per source-target pair.
+
+A matrix spec is a JSON file such as:
+
+    {
+      "languages": {
+        "en": {"country": "United Kingdom", "fill_type": "flag-svg", "target": null},
+        "pl": {"country": "Poland", "fill_type": "gradient", "direction": "vertical", "transition": 42.0},
+        "cs": {"country": "Czech Republic", "fill_type": "flag-svg", "zoom": 133.2, "pan_x": -98.0,
+               "target": {"fill_type": "gradient", "direction": "vertical"}}
+      },
+      "sources": ["cs", "pl"],
+      "targets": ["en", "pl"],
+      "leaves": {"source": "top", "target": "right"},
+      "exclude": ["cs-en"],
+      "overrides": {"cs-pl": {"top_zoom": 140.0}}
+    }
+
+Each language gives its country and default leaf style. A "source" or "target" entry adjusts that style
+when the language plays that role; null leaves the leaf in its default color. "sources" and "targets"
+default to every language. "leaves" maps each role to a leaf and defaults to source=top, target=right.
+"overrides" take presets.json keys and are applied last. Pairs of a language with itself are skipped.
+"""
+
+import json
+
+LEAF_PREFIXES = ('top', 'right', 'left')
+LEAF_STYLE_KEYS = ('country', 'fill_type', 'direction', 'transition', 'zoom', 'pan_x', 'pan_y')
+ROLES = ('source', 'target')
+DEFAULT_LEAVES = {'source': 'top', 'target': 'right'}
+PRESET_KEYS = {f'{prefix}_{key}' for prefix in LEAF_PREFIXES for key in LEAF_STYLE_KEYS}
+
+
+class MatrixSpecError(ValueError):
+    """Raised for a matrix spec that cannot be expanded."""
+
+
+def _check_style(style, where, countries):
+    unknown = set(style) - set(LEAF_STYLE_KEYS)
+    if unknown:
+        raise MatrixSpecError(f"{where}: unknown option(s) {', '.join(sorted(unknown))} (allowed: {', '.join(LEAF_STYLE_KEYS)}).")
+    if 'country' in style and countries is not None and style['country'] not in countries:
+        raise MatrixSpecError(f"{where}: '{style['country']}' is not a valid country name.")
+
+
+def validate_matrix_spec(spec, countries=None):
+    """
+    Checks a matrix spec and fills in its defaults.
+    :param countries: Optional container of valid country names/aliases/codes to check 'country' against.
+    :return: The normalized spec (a new dict).
+    :raises MatrixSpecError: If the spec is malformed.
+    """
+    if not isinstance(spec, dict) or not isinstance(spec.get('languages'), dict) or not spec['languages']:
+        raise MatrixSpecError("The spec needs a non-empty 'languages' object.")
+    languages = spec['languages']
+    for code, style in languages.items():
+        if not isinstance(style, dict) or 'country' not in style:
+            raise MatrixSpecError(f"Language '{code}' needs an object with at least a 'country'.")
+        _check_style({key: value for key, value in style.items() if key not in ROLES}, f"Language '{code}'", countries)
+        for role in ROLES:
+            role_style = style.get(role, {})
+            if role_style is not None and not isinstance(role_style, dict):
+                raise MatrixSpecError(f"Language '{code}': '{role}' must be an object or null.")
+            _check_style(role_style or {}, f"Language '{code}' as {role}", countries)
+
+    normalized = {'languages': languages}
+    for role_list in ('sources', 'targets'):
+        codes = spec.get(role_list, list(languages))
+        missing = [code for code in codes if code not in languages]
+        if missing:
+            raise MatrixSpecError(f"'{role_list}' lists languages that are not defined: {', '.join(missing)}.")
+        normalized[role_list] = list(codes)
+
+    if not isinstance(spec.get('leaves', {}), dict):
+        raise MatrixSpecError("'leaves' must be an object, e.g. {\"source\": \"top\", \"target\": \"right\"}.")
+    leaves = {**DEFAULT_LEAVES, **spec.get('leaves', {})}
+    if set(leaves) != set(ROLES) or any(leaf not in LEAF_PREFIXES for leaf in leaves.values()) or leaves['source'] == leaves['target']:
+        raise MatrixSpecError(f"'leaves' must map 'source' and 'target' to two different leaves out of {', '.join(LEAF_PREFIXES)}.")
+    normalized['leaves'] = leaves
+
+    normalized['exclude'] = set(spec.get('exclude', []))
+    overrides = spec.get('overrides', {})
+    if not isinstance(overrides, dict):
+        raise MatrixSpecError("'overrides' must be an object mapping pair names to presets.json keys.")
+    # Match against the generated names, since language ids may themselves contain '-' (e.g. 'pt-BR')
+    pair_names = {f"{source}-{target}" for source, target in iter_pairs(normalized)} if overrides else set()
+    for pair_name, override in overrides.items():
+        if pair_name not in pair_names:
+            raise MatrixSpecError(f"Override for '{pair_name}' does not match any pair in the matrix.")
+        if not isinstance(override, dict):
+            raise MatrixSpecError(f"Override for '{pair_name}' must be an object.")
+        unknown = set(override) - PRESET_KEYS
+        if unknown:
+            raise MatrixSpecError(f"Override for '{pair_name}': unknown key(s) {', '.join(sorted(unknown))}.")
+    normalized['overrides'] = overrides
+    return normalized
+
+
+def load_matrix_spec(path, countries=None):
+    """Reads and validates a matrix spec file. Raises MatrixSpecError (or OSError) on failure."""
+    try:
+        with open(path, 'r') as f:
+            spec = json.load(f)
+    except json.JSONDecodeError as e:
+        raise MatrixSpecError(f"Could not parse '{path}': {e}")
+    return validate_matrix_spec(spec, countries)
+
+
+def _role_style(language, role):
+    # The language's own style, adjusted for the role; None means "leave this leaf uncolored"
+    if role in language and language[role] is None:
+        return None
+    base = {key: value for key, value in language.items() if key not in ROLES}
+    return {**base, **(language.get(role) or {})}
+
+
+def iter_pairs(spec):
+    """Yields the (source, target) language codes of a validated spec, in spec order."""
+    for source in spec['sources']:
+        for target in spec['targets']:
+            if source != target and f"{source}-{target}" not in spec['exclude']:
+                yield source, target
+
+
+def matrix_size(spec):
+    """Number of pairs a validated spec expands to, without building any of them."""
+    return sum(1 for _ in iter_pairs(spec))
+
+
+def iter_matrix_presets(spec):
+    """
+    Lazily expands a validated spec into (pair_name, config) tuples, where config has the same keys as a
+    presets.json entry (e.g. 'top_country', 'right_transition') and can go straight to leaf_params_from_preset.
+    """
+    styles = {(code, role): _role_style(language, role) for code, language in spec['languages'].items() for role in ROLES}
+    for source, target in iter_pairs(spec):
+        pair_name = f"{source}-{target}"
+        config = {}
+        for role, code in (('source', source), ('target', target)):
+            style = styles[(code, role)]
+            if style is None: continue
+            prefix = spec['leaves'][role]
+            config.update({f'{prefix}_{key}': value for key, value in style.items()})
+        config.update(spec['overrides'].get(pair_name, {}))
+        yield pair_name, config
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 2:
+        print("Usage: python3 pair_matrix.py <matrix.json>   (prints the expansion as presets.json)")
+        sys.exit(2)
+    try:
+        matrix_spec = load_matrix_spec(sys.argv[1])
+    except (MatrixSpecError, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(json.dumps(dict(iter_matrix_presets(matrix_spec)), indent=2))
@@ -0,0 +1,351 @@
+# path_geometry.py
+
+import re
+import math
+from array import array
+from functools import lru_cache
+
+# Every path is normalized to absolute M, L, C, Q, A and Z commands.
+# H/V become L, S becomes C, T becomes Q, so consumers only deal with six segment types.
+_PARAM_COUNTS = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7, 'Z': 0}
+_COORD_COUNTS = {'M': 2, 'L': 2, 'C': 6, 'Q': 4, 'A': 7, 'Z': 0}
+_TOKEN_RE = re.compile(r"([MmLlHhVvCcSsQqTtAaZz])|([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)")
+
+
+class CompiledPath:
+    """
+    A parsed SVG path: `commands` holds one absolute command letter per segment and `coords` holds
+    their parameters back to back in a flat array of doubles.
+    """
+    __slots__ = ("commands", "coords")
+
+    def __init__(self, commands, coords):
+        self.commands = commands
+        self.coords = coords
+
+    def segments(self):
+        """Yields (command, params) pairs, with params as a tuple of absolute values."""
+        pos = 0
+        for cmd in self.commands:
+            count = _COORD_COUNTS[cmd]
+            yield cmd, tuple(self.coords[pos:pos + count])
+            pos += count
+
+
+def _tokenize(d_attr):
+    """Splits a path string into command letters and number strings in a single regex pass."""
+    for match in _TOKEN_RE.finditer(d_attr):
+        yield match.group(1) or match.group(2)
+
+
+@lru_cache(maxsize=256)
+def compile_path(d_attr):
+    """Parses a path 'd' attribute into a CompiledPath. Results are memoized by the 'd' string."""
+    commands = []
+    coords = array('d')
+    tokens = list(_tokenize(d_attr or ""))
+    i, n = 0, len(tokens)
+    cmd = None
+    cur_x = cur_y = start_x = start_y = 0.0
+    last_ctrl = None  # Last control point and the segment type it belongs to, for S/T reflection
+
+    def read_number():
+        nonlocal i
+        value = float(tokens[i])
+        i += 1
+        return value
+
+    def read_flag():
+        # Arc flags may be written without separators, e.g. "a5,5 0 011,1"
+        nonlocal i
+        token = tokens[i]
+        if len(token) > 1 and token[0] in "01":
+            tokens[i] = token[1:]
+            return float(token[0])
+        i += 1
+        return float(token)
+
+    while i < n:
+        token = tokens[i]
+        if token[0].isalpha():
+            cmd = token
+            i += 1
+            if cmd in 'Zz':
+                commands.append('Z')
+                cur_x, cur_y = start_x, start_y
+                last_ctrl = None
+                continue
+        elif cmd is None or cmd in 'Zz':
+            break  # Numbers without a command are invalid; stop like a browser would
+
+        upper = cmd.upper()
+        if i + _PARAM_COUNTS[upper] > n and upper != 'A':
+            break
+        rel = cmd.islower()
+        ox, oy = (cur_x, cur_y) if rel else (0.0, 0.0)
+        try:
+            if upper == 'M':
+                cur_x, cur_y = read_number() + ox, read_number() + oy
+                start_x, start_y = cur_x, cur_y
+                commands.append('M'); coords.extend((cur_x, cur_y))
+                cmd = 'l' if rel else 'L'  # Subsequent pairs are implicit line-tos
+                last_ctrl = None
+            elif upper in 'LHV':
+                if upper == 'L':
+                    cur_x, cur_y = read_number() + ox, read_number() + oy
+                elif upper == 'H':
+                    cur_x = read_number() + ox
+                else:
+                    cur_y = read_number() + oy
+                commands.append('L'); coords.extend((cur_x, cur_y))
+                last_ctrl = None
+            elif upper in 'CS':
+                if upper == 'C':
+                    x1, y1 = read_number() + ox, read_number() + oy
+                elif last_ctrl and last_ctrl[0] == 'C':
+                    x1, y1 = 2 * cur_x - last_ctrl[1], 2 * cur_y - last_ctrl[2]
+                else:
+                    x1, y1 = cur_x, cur_y
+                x2, y2 = read_number() + ox, read_number() + oy
+                cur_x, cur_y = read_number() + ox, read_number() + oy
+                commands.append('C'); coords.extend((x1, y1, x2, y2, cur_x, cur_y))
+                last_ctrl = ('C', x2, y2)
+            elif upper in 'QT':
+                if upper == 'Q':
+                    x1, y1 = read_number() + ox, read_number() + oy
+                elif last_ctrl and last_ctrl[0] == 'Q':
+                    x1, y1 = 2 * cur_x - last_ctrl[1], 2 * cur_y - last_ctrl[2]
+                else:
+                    x1, y1 = cur_x, cur_y
+                cur_x, cur_y = read_number() + ox, read_number() + oy
+                commands.append('Q'); coords.extend((x1, y1, cur_x, cur_y))
+                last_ctrl = ('Q', x1, y1)
+            elif upper == 'A':
+                rx, ry, rotation = abs(read_number()), abs(read_number()), read_number()
+                large_arc, sweep = read_flag(), read_flag()
+                cur_x, cur_y = read_number() + ox, read_number() + oy
+                commands.append('A'); coords.extend((rx, ry, rotation, large_arc, sweep, cur_x, cur_y))
+                last_ctrl = None
+        except (IndexError, ValueError):
+            break  # Truncated segment; keep what was parsed so far
+
+    return CompiledPath(''.join(commands), coords)
+
+
+# --- Bounding Box ---
+def _quadratic_roots(a, b, c):
+    """Real roots of a*t^2 + b*t + c in the open interval (0, 1)."""
+    if abs(a) < 1e-12:
+        if abs(b) < 1e-12: return ()
+        roots = (-c / b,)
+    else:
+        disc = b * b - 4 * a * c
+        if disc < 0: return ()
+        sq = math.sqrt(disc)
+        roots = ((-b + sq) / (2 * a), (-b - sq) / (2 * a))
+    return tuple(t for t in roots if 0 < t < 1)
+
+
+def _cubic_extrema(p0, p1, p2, p3):
+    # Derivative of the cubic Bezier, divided by 3
+    a = -p0 + 3 * p1 - 3 * p2 + p3
+    b = 2 * (p0 - 2 * p1 + p2)
+    c = p1 - p0
+    return [((1 - t) ** 3) * p0 + 3 * ((1 - t) ** 2) * t * p1 + 3 * (1 - t) * t * t * p2 + t ** 3 * p3
+            for t in _quadratic_roots(a, b, c)]
+
+
+def _quad_extrema(p0, p1, p2):
+    denom = p0 - 2 * p1 + p2
+    if abs(denom) < 1e-12: return []
+    t = (p0 - p1) / denom
+    if not 0 < t < 1: return []
+    return [((1 - t) ** 2) * p0 + 2 * (1 - t) * t * p1 + t * t * p2]
+
+
+def _arc_center(x0, y0, rx, ry, rotation, large_arc, sweep, x, y):
+    """
+    Endpoint-to-center conversion from the SVG spec (F.6.5).
+    :return: (cx, cy, rx, ry, cos_phi, sin_phi, theta1, delta) with the radii scaled up if needed,
+             or None for an arc that is drawn as a straight line.
+    """
+    if rx == 0 or ry == 0 or (x0 == x and y0 == y):
+        return None
+    phi = math.radians(rotation % 360)
+    cos_phi, sin_phi = math.cos(phi), math.sin(phi)
+    dx, dy = (x0 - x) / 2, (y0 - y) / 2
+    x1p = cos_phi * dx + sin_phi * dy
+    y1p = -sin_phi * dx + cos_phi * dy
+
+    # Scale radii up if they are too small to span the endpoints
+    lam = (x1p * x1p) / (rx * rx) + (y1p * y1p) / (ry * ry)
+    if lam > 1:
+        scale = math.sqrt(lam)
+        rx, ry = rx * scale, ry * scale
+
+    num = rx * rx * ry * ry - rx * rx * y1p * y1p - ry * ry * x1p * x1p
+    den = rx * rx * y1p * y1p + ry * ry * x1p * x1p
+    coef = math.sqrt(max(0.0, num / den)) if den else 0.0
+    if bool(large_arc) == bool(sweep): coef = -coef
+    cxp, cyp = coef * rx * y1p / ry, -coef * ry * x1p / rx
+    cx = cos_phi * cxp - sin_phi * cyp + (x0 + x) / 2
+    cy = sin_phi * cxp + cos_phi * cyp + (y0 + y) / 2
+
+    def angle(ux, uy, vx, vy):
+        return math.atan2(ux * vy - uy * vx, ux * vx + uy * vy)
+
+    theta1 = angle(1, 0, (x1p - cxp) / rx, (y1p - cyp) / ry)
+    delta = angle((x1p - cxp) / rx, (y1p - cyp) / ry, (-x1p - cxp) / rx, (-y1p - cyp) / ry)
+    if not sweep and delta > 0: delta -= 2 * math.pi
+    elif sweep and delta < 0: delta += 2 * math.pi
+    return cx, cy, rx, ry, cos_phi, sin_phi, theta1, delta
+
+
+def _arc_extrema(x0, y0, rx, ry, rotation, large_arc, sweep, x, y):
+    """Axis extrema of an elliptical arc."""
+    center = _arc_center(x0, y0, rx, ry, rotation, large_arc, sweep, x, y)
+    if center is None:
+        return [], []
+    cx, cy, rx, ry, cos_phi, sin_phi, theta1, delta = center
+
+    def on_arc(theta):
+        # Is `theta` swept between theta1 and theta1 + delta?
+        offset = (theta - theta1) % (2 * math.pi) if delta >= 0 else (theta1 - theta) % (2 * math.pi)
+        return offset <= abs(delta)
+
+    xs, ys = [], []
+    theta_x = math.atan2(-ry * sin_phi, rx * cos_phi)
+    theta_y = math.atan2(ry * cos_phi, rx * sin_phi)
+    for theta in (theta_x, theta_x + math.pi):
+        if on_arc(theta):
+            xs.append(cx + rx * cos_phi * math.cos(theta) - ry * sin_phi * math.sin(theta))
+    for theta in (theta_y, theta_y + math.pi):
+        if on_arc(theta):
+            ys.append(cy + rx * sin_phi * math.cos(theta) + ry * cos_phi * math.sin(theta))
+    return xs, ys
+
+
+@lru_cache(maxsize=256)
+def path_bbox(d_attr):
+    """
+    Exact bounding box of a path, including the extrema of curve and arc segments.
+    :return: An (x, y, width, height) tuple, or None if the path has no segments.
+    """
+    compiled = compile_path(d_attr)
+    if not compiled.commands: return None
+    xs, ys = [], []
+    cur_x = cur_y = start_x = start_y = 0.0
+    for cmd, params in compiled.segments():
+        if cmd == 'M':
+            cur_x, cur_y = start_x, start_y = params
+            xs.append(cur_x); ys.append(cur_y)
+        elif cmd == 'L':
+            cur_x, cur_y = params
+            xs.append(cur_x); ys.append(cur_y)
+        elif cmd == 'C':
+            x1, y1, x2, y2, x, y = params
+            xs.extend(_cubic_extrema(cur_x, x1, x2, x)); ys.extend(_cubic_extrema(cur_y, y1, y2, y))
+            cur_x, cur_y = x, y
+            xs.append(cur_x); ys.append(cur_y)
+        elif cmd == 'Q':
+            x1, y1, x, y = params
+            xs.extend(_quad_extrema(cur_x, x1, x)); ys.extend(_quad_extrema(cur_y, y1, y))
+            cur_x, cur_y = x, y
+            xs.append(cur_x); ys.append(cur_y)
+        elif cmd == 'A':
+            arc_xs, arc_ys = _arc_extrema(cur_x, cur_y, *params)
+            xs.extend(arc_xs); ys.extend(arc_ys)
+            cur_x, cur_y = params[5], params[6]
+            xs.append(cur_x); ys.append(cur_y)
+        elif cmd == 'Z':
+            cur_x, cur_y = start_x, start_y
+    min_x, max_x = min(xs), max(xs)
+    min_y, max_y = min(ys), max(ys)
+    return min_x, min_y, max_x - min_x, max_y - min_y
+
+
+def control_point_bbox(d_attr):
+    """
+    Bounding box of a path's end points and Bezier control points, with arcs at their extrema.
+    This is the box CairoSVG uses to resolve objectBoundingBox gradients, which can be slightly larger
+    than path_bbox() where a control point lies outside the curve.
+    :return: An (x, y, width, height) tuple, or None if the path has no segments.
+    """
+    compiled = compile_path(d_attr)
+    if not compiled.commands: return None
+    xs, ys = [], []
+    cur_x = cur_y = 0.0
+    for cmd, params in compiled.segments():
+        if cmd == 'A':
+            arc_xs, arc_ys = _arc_extrema(cur_x, cur_y, *params)
+            xs.extend(arc_xs); ys.extend(arc_ys)
+            params = params[5:]
+        xs.extend(params[0::2]); ys.extend(params[1::2])
+        if params:
+            cur_x, cur_y = params[-2], params[-1]
+    min_x, max_x = min(xs), max(xs)
+    min_y, max_y = min(ys), max(ys)
+    return min_x, min_y, max_x - min_x, max_y - min_y
+
+
+def _curve_steps(deviation, tolerance):
+    # A Bezier flattened into n chords strays at most deviation / n^2 from the curve
+    return max(1, min(1024, math.ceil(math.sqrt(deviation / tolerance)))) if deviation > 0 else 1
+
+
+def flatten_path(d_attr, tolerance=0.1):
+    """
+    Approximates a path with straight lines, no further than `tolerance` (in path units) from the curves.
+    :return: A list of subpaths, each a list of (x, y) points. Subpaths are not explicitly closed;
+             filling treats every subpath as closed anyway.
+    """
+    subpaths = []
+    points = None
+    cur_x = cur_y = start_x = start_y = 0.0
+    for cmd, params in compile_path(d_attr).segments():
+        if cmd == 'M':
+            cur_x, cur_y = start_x, start_y = params
+            points = [(cur_x, cur_y)]
+            subpaths.append(points)
+            continue
+        if points is None:
+            points = [(cur_x, cur_y)]
+            subpaths.append(points)
+        if cmd == 'L':
+            cur_x, cur_y = params
+            points.append((cur_x, cur_y))
+        elif cmd == 'C':
+            x1, y1, x2, y2, x, y = params
+            deviation = 0.75 * max(math.hypot(cur_x - 2 * x1 + x2, cur_y - 2 * y1 + y2), math.hypot(x1 - 2 * x2 + x, y1 - 2 * y2 + y))
+            steps = _curve_steps(deviation, tolerance)
+            for step in range(1, steps + 1):
+                t = step / steps
+                mt = 1 - t
+                points.append((mt ** 3 * cur_x + 3 * mt * mt * t * x1 + 3 * mt * t * t * x2 + t ** 3 * x,
+                               mt ** 3 * cur_y + 3 * mt * mt * t * y1 + 3 * mt * t * t * y2 + t ** 3 * y))
+            cur_x, cur_y = x, y
+        elif cmd == 'Q':
+            x1, y1, x, y = params
+            steps = _curve_steps(0.25 * math.hypot(cur_x - 2 * x1 + x, cur_y - 2 * y1 + y), tolerance)
+            for step in range(1, steps + 1):
+                t = step / steps
+                mt = 1 - t
+                points.append((mt * mt * cur_x + 2 * mt * t * x1 + t * t * x, mt * mt * cur_y + 2 * mt * t * y1 + t * t * y))
+            cur_x, cur_y = x, y
+        elif cmd == 'A':
+            center = _arc_center(cur_x, cur_y, *params)
+            if center is not None:
+                cx, cy, rx, ry, cos_phi, sin_phi, theta1, delta = center
+                # Chord error of an angle step a on radius r is r * (1 - cos(a / 2))
+                max_step = 2 * math.acos(max(-1.0, 1 - tolerance / max(rx, ry)))
+                steps = max(1, min(1024, math.ceil(abs(delta) / max_step)))
+                for step in range(1, steps):
+                    theta = theta1 + delta * step / steps
+                    ex, ey = rx * math.cos(theta), ry * math.sin(theta)
+                    points.append((cx + cos_phi * ex - sin_phi * ey, cy + sin_phi * ex + cos_phi * ey))
+            cur_x, cur_y = params[5], params[6]
+            points.append((cur_x, cur_y))
+        elif cmd == 'Z':
+            cur_x, cur_y = start_x, start_y
+            points = None
+    return [subpath for subpath in subpaths if len(subpath) > 1]
@@ -0,0 +1,123 @@
+# render_manifest.py
+
+import json
+import os
+
+MANIFEST_FILENAME = ".render_manifest.json"
+JOURNAL_FILENAME = ".render_journal.jsonl"
+MANIFEST_VERSION = 1
+
+
+class RenderManifest:
+    """
+    Records, per preset, the render key its outputs were built from and which files were written.
+    Stored as JSON next to the outputs so a later bulk run can skip presets that have not changed.
+
+    While a bulk run is in progress, every record/forget is also appended to a journal file and flushed
+    immediately. The manifest itself is only written at the end of a run, so if the process is killed
+    the journal is what lets the next run resume; load() replays it and finish() removes it.
+    """
+    def __init__(self, output_dir, entries=None, shard=None):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_FILENAME)
+        self.journal_path = os.path.join(output_dir, JOURNAL_FILENAME)
+        self.entries = entries if entries is not None else {}
+        self.shard = shard          # (i, N) for a --shard run, None otherwise
+        self.resumed = set()        # Presets completed by an interrupted run, replayed from its journal
+        self._journal = None
+
+    @classmethod
+    def load(cls, output_dir):
+        """Loads the manifest from `output_dir`. A missing or unreadable manifest yields an empty one."""
+        manifest = cls(output_dir)
+        try:
+            with open(manifest.path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                manifest.entries = data.get('entries', {})
+                manifest.shard = tuple(data['shard']) if data.get('shard') else None
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, AttributeError):
+            print(f"Warning: Ignoring unreadable render manifest '{manifest.path}'.")
+        manifest._replay_journal()
+        return manifest
+
+    def _replay_journal(self):
+        try:
+            with open(self.journal_path, 'r') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # The last line may be cut short if the run was killed mid-write
+            if record.get('key') is None:
+                self.entries.pop(record['name'], None)
+                self.resumed.discard(record['name'])
+            else:
+                self.entries[record['name']] = {'key': record['key'], 'outputs': record['outputs']}
+                self.resumed.add(record['name'])
+
+    @property
+    def interrupted(self):
+        """True if a journal from an unfinished run was found next to the manifest."""
+        return os.path.exists(self.journal_path)
+
+    def open_journal(self):
+        """Starts journaling record/forget calls; keeps any entries left by an interrupted run."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._journal = open(self.journal_path, 'a')
+
+    def _append_journal(self, record):
+        if self._journal:
+            self._journal.write(json.dumps(record, sort_keys=True) + "\n")
+            self._journal.flush()
+
+    def is_up_to_date(self, preset_name, render_key):
+        """True if `preset_name` was last built from `render_key` and all of its outputs still exist."""
+        entry = self.entries.get(preset_name)
+        if not entry or entry.get('key') != render_key:
+            return False
+        return all(os.path.exists(os.path.join(self.output_dir, filename)) for filename in entry.get('outputs', []))
+
+    def record(self, preset_name, render_key, output_filenames):
+        self.entries[preset_name] = {'key': render_key, 'outputs': sorted(output_filenames)}
+        self._append_journal({'name': preset_name, **self.entries[preset_name]})
+
+    def forget(self, preset_name):
+        self.entries.pop(preset_name, None)
+        self._append_journal({'name': preset_name, 'key': None})
+
+    def prune(self, preset_names):
+        """Drops entries for presets that are no longer in `preset_names`."""
+        keep = set(preset_names)
+        for preset_name in list(self.entries):
+            if preset_name not in keep:
+                del self.entries[preset_name]
+
+    def save(self):
+        """Writes the manifest atomically, so an interrupted run never leaves a truncated file behind."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        data = {'version': MANIFEST_VERSION, 'entries': self.entries}
+        if self.shard:
+            data['shard'] = list(self.shard)
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def finish(self, completed):
+        """
+        Saves the manifest and closes the journal. The journal is deleted only if the run `completed`;
+        otherwise it stays behind so the next run can resume from it.
+        """
+        self.save()
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+        if completed and os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+            self.resumed.clear()
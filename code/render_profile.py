@@ -0,0 +1,101 @@
+# render_profile.py
+
+import json
+import time
+from contextlib import nullcontext
+
+_DISABLED_STAGE = nullcontext()
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "start", "child_seconds")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.child_seconds = 0.0
+        self.profiler._active.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        active = self.profiler._active
+        active.pop()
+        if active:
+            active[-1].child_seconds += elapsed
+        # Self time only: stages nested inside this one are reported under their own names
+        self.profiler.add_time(self.name, elapsed - self.child_seconds)
+        return False
+
+
+class StageProfiler:
+    """
+    Accumulates wall time per named stage plus simple counters. Disabled by default; while disabled,
+    stage() hands back a shared no-op context manager and count() returns immediately.
+    Usage: `with PROFILER.stage('serialize'): ...` and `PROFILER.count('flag_fills')`.
+    Stages may be nested. Each stage is charged its self time, i.e. without the stages opened inside it,
+    so the stage totals add up to the time spent inside any stage.
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.timings = {}   # stage -> [calls, total_seconds, max_seconds]
+        self.counters = {}
+        self._active = []   # Stages currently open, innermost last
+
+    def stage(self, name):
+        if not self.enabled:
+            return _DISABLED_STAGE
+        return _Stage(self, name)
+
+    def add_time(self, name, seconds):
+        entry = self.timings.get(name)
+        if entry is None:
+            self.timings[name] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]: entry[2] = seconds
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self):
+        """Returns the collected data as a plain, picklable and JSON-serializable dict."""
+        return {
+            'stages': {name: {'calls': calls, 'total_s': total, 'max_s': max_s} for name, (calls, total, max_s) in self.timings.items()},
+            'counters': dict(self.counters),
+        }
+
+    def merge(self, snapshot):
+        """Adds a snapshot (e.g. one returned by a worker process) into this profiler."""
+        for name, stats in snapshot['stages'].items():
+            entry = self.timings.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += stats['calls']
+            entry[1] += stats['total_s']
+            entry[2] = max(entry[2], stats['max_s'])
+        for name, amount in snapshot['counters'].items():
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def format_report(self, title="Profile"):
+        """A human-readable per-stage breakdown, slowest stage first."""
+        total = sum(total_s for _, total_s, _ in self.timings.values())
+        lines = [f"--- {title} ---", f"  {'Stage':<20}{'Calls':>8}{'Total ms':>12}{'Avg ms':>10}{'Max ms':>10}{'Share':>8}"]
+        for name, (calls, total_s, max_s) in sorted(self.timings.items(), key=lambda item: -item[1][1]):
+            share = total_s / total * 100 if total else 0.0
+            lines.append(f"  {name:<20}{calls:>8}{total_s * 1000:>12.2f}{total_s / calls * 1000:>10.3f}{max_s * 1000:>10.3f}{share:>7.1f}%")
+        lines.append(f"  {'total':<20}{'':>8}{total * 1000:>12.2f}")
+        if self.counters:
+            lines.append("  Counters: " + ", ".join(f"{name}={amount}" for name, amount in sorted(self.counters.items())))
+        return "\n".join(lines)
+
+
+def write_profile_record(f, record_type, name, snapshot):
+    """Writes one JSON-lines record, e.g. {"type": "preset", "name": "pl-en", "stages": {...}, "counters": {...}}."""
+    f.write(json.dumps({'type': record_type, 'name': name, **snapshot}, sort_keys=True) + "\n")
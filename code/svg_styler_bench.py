@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# svg_styler_bench.py
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from svg_styler_core import (
+    process_svg, modify_leaf_fill, get_simple_path_bbox, render_cairo_outputs, iter_rendered_logos, leaf_params_from_preset,
+    output_formats, parse_output_formats, render_logo, get_flag_tile_cache, LOGO_TEMPLATE, LEAF_D_STARTS, COUNTRIES, FLAG_REGISTRY, load_cairosvg,
+    load_fast_raster
+)
+from path_geometry import compile_path, path_bbox
+
+LEAVES = (('top', 'Top'), ('right', 'Right'), ('left', 'Left'))
+
+
+def make_synthetic_presets(count, flag_ratio=0.3, seed=0):
+    """
+    Builds `count` presets.json-style entries that cycle through every country in COUNTRIES.
+    Roughly `flag_ratio` of the leaves use 'flag-svg' (falling back to a gradient where no flag file exists).
+    """
+    rng = random.Random(seed)
+    countries = COUNTRIES.names
+    presets = {}
+    for i in range(count):
+        config = {}
+        for leaf_index, (prefix, _) in enumerate(LEAVES[:rng.randint(1, 3)]):
+            config[f'{prefix}_country'] = countries[(i * 3 + leaf_index) % len(countries)]
+            if rng.random() < flag_ratio:
+                config[f'{prefix}_fill_type'] = 'flag-svg'
+                config[f'{prefix}_zoom'] = round(rng.uniform(80, 250), 1)
+                config[f'{prefix}_pan_x'] = round(rng.uniform(-100, 100), 1)
+                config[f'{prefix}_pan_y'] = round(rng.uniform(-100, 100), 1)
+            else:
+                config[f'{prefix}_fill_type'] = 'gradient'
+                config[f'{prefix}_direction'] = rng.choice(['horizontal', 'vertical'])
+                config[f'{prefix}_transition'] = round(rng.uniform(1, 99), 1)
+        presets[f"bench-{i:05d}"] = config
+    return presets
+
+
+def summarize_samples(samples):
+    """Per-call statistics for a list of wall times in seconds."""
+    return {
+        'calls': len(samples),
+        'min_ms': min(samples) * 1000,
+        'median_ms': statistics.median(samples) * 1000,
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'total_s': sum(samples),
+    }
+
+
+def time_stage(func, items, repeat):
+    """Runs `func` over every item `repeat` times and summarizes the per-call wall time."""
+    samples = []
+    for _ in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            func(item)
+            samples.append(time.perf_counter() - start)
+    return summarize_samples(samples)
+
+
+IMPORT_PROBE = """
+import json, time
+start = time.perf_counter()
+import svg_styler_core
+core_seconds = time.perf_counter() - start
+cairosvg_module = svg_styler_core.load_cairosvg()
+print(json.dumps([core_seconds, svg_styler_core.CAIROSVG_IMPORT_SECONDS if cairosvg_module else None]))
+"""
+
+def measure_import_times(repeat):
+    """
+    Times `import svg_styler_core`, which must not pull in CairoSVG, and the lazy CairoSVG import that
+    follows it, each run in a fresh interpreter so nothing is already in sys.modules.
+    """
+    code_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [code_dir, os.environ.get('PYTHONPATH')])))
+    samples = {'import_core': [], 'import_cairosvg': []}
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', IMPORT_PROBE], capture_output=True, text=True, env=env, check=True)
+        core_seconds, cairosvg_seconds = json.loads(result.stdout.strip().splitlines()[-1])
+        samples['import_core'].append(core_seconds)
+        if cairosvg_seconds is not None:
+            samples['import_cairosvg'].append(cairosvg_seconds)
+    return {stage: summarize_samples(values) for stage, values in samples.items() if values}
+
+
+def run_benchmarks(presets, repeat=3, formats=('svg',), png_width=600):
+    """Times each styling and rendering stage, then a full streaming bulk run over `presets`."""
+    FLAG_REGISTRY.preload()
+    leaf_param_sets = [leaf_params_from_preset(config) for config in presets.values()]
+    leaf_list = [params for leaf_params in leaf_param_sets for params in leaf_params.values() if params]
+    leaf_ds = [leaf.get("d") for leaf in LOGO_TEMPLATE.instantiate()[3].values()]
+    stages = measure_import_times(repeat)
+
+    stages['template_instantiate'] = time_stage(lambda _: LOGO_TEMPLATE.instantiate(), range(len(leaf_param_sets)), repeat)
+
+    def style_leaf(params):
+        root, defs_element, layer_group, leaf_elements = LOGO_TEMPLATE.instantiate()
+        leaf_id_method = {'type': 'element', 'd_start': LEAF_D_STARTS[params['leaf_name']], 'element': leaf_elements[params['leaf_name']]}
+        modify_leaf_fill(root, defs_element, layer_group, leaf_id_method, params, warnings=[])
+    stages['modify_leaf_fill'] = time_stage(style_leaf, leaf_list, repeat)
+
+    def cold_bbox(d_attr):
+        compile_path.cache_clear()
+        path_bbox.cache_clear()
+        get_simple_path_bbox(d_attr)
+    stages['path_bbox_cold'] = time_stage(cold_bbox, leaf_ds, repeat * 20)
+    stages['path_bbox_memoized'] = time_stage(get_simple_path_bbox, leaf_ds, repeat * 20)
+
+    stages['process_svg'] = time_stage(lambda leaf_params: process_svg(warnings=[], **leaf_params), leaf_param_sets, repeat)
+    stages['process_svg_inline_flags'] = time_stage(
+        lambda leaf_params: process_svg(warnings=[], inline_flags=True, **leaf_params), leaf_param_sets, repeat)
+    stages['process_svg_dom'] = time_stage(lambda leaf_params: process_svg(warnings=[], emitter='dom', **leaf_params), leaf_param_sets, repeat)
+    stages['process_svg_dom_inline_flags'] = time_stage(
+        lambda leaf_params: process_svg(warnings=[], inline_flags=True, emitter='dom', **leaf_params), leaf_param_sets, repeat)
+
+    cairo_formats = [fmt for fmt in output_formats(formats) if fmt != 'svg']
+    if cairo_formats:
+        for suffix, inline_flags in (('', False), ('_inline_flags', True)):
+            svg_documents = [process_svg(warnings=[], inline_flags=inline_flags, **leaf_params)[1] for leaf_params in leaf_param_sets]
+            for fmt in cairo_formats:
+                stages[f'cairo_{fmt}{suffix}'] = time_stage(
+                    lambda svg: list(render_cairo_outputs(svg, [fmt], png_widths=(png_width,))), svg_documents, repeat)
+
+    if 'png' in cairo_formats:
+        # Tiles are rasterized on the first pass over each flag/size, so the median reflects warm-cache PNGs
+        with tempfile.TemporaryDirectory() as tile_dir:
+            flag_tiles = get_flag_tile_cache(tile_dir)
+            stages['render_png_flag_tiles'] = time_stage(
+                lambda leaf_params: list(render_logo(png_width=png_width, formats=['png'], warnings=[], flag_tiles=flag_tiles, **leaf_params)),
+                leaf_param_sets, repeat)
+
+    if 'png' in output_formats(formats, png_engine='numpy') and load_fast_raster():
+        # Logos with flag fills still go through CairoSVG, so this stage may include some of them
+        stages['render_png_numpy'] = time_stage(
+            lambda leaf_params: list(render_logo(png_width=png_width, formats=['png'], warnings=[], png_engine='numpy', **leaf_params)),
+            leaf_param_sets, repeat)
+
+    def bulk_run():
+        outputs = 0
+        for _ in iter_rendered_logos(presets.items(), png_width=png_width, formats=formats, on_error=lambda name, e: None):
+            outputs += 1
+        return outputs
+
+    start = time.perf_counter()
+    outputs = bulk_run()
+    bulk_seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    bulk_run()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'stages': stages,
+        'bulk': {
+            'presets': len(presets),
+            'outputs': outputs,
+            'formats': output_formats(formats),
+            'total_s': bulk_seconds,
+            'logos_per_sec': len(presets) / bulk_seconds if bulk_seconds else 0.0,
+            'peak_traced_mb': peak_bytes / (1024 * 1024),
+        },
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(baseline, current, threshold_percent):
+    """
+    Compares median stage times and bulk throughput against a baseline result.
+    :return: A list of (metric, baseline_value, current_value, change_percent, regressed) tuples.
+    """
+    rows = []
+    for stage, stats in current['stages'].items():
+        if stage not in baseline.get('stages', {}): continue
+        old, new = baseline['stages'][stage]['median_ms'], stats['median_ms']
+        change = (new - old) / old * 100 if old else 0.0
+        rows.append((f"{stage} (median ms)", old, new, change, change > threshold_percent))
+    if 'bulk' in baseline:
+        old, new = baseline['bulk']['logos_per_sec'], current['bulk']['logos_per_sec']
+        change = (new - old) / old * 100 if old else 0.0
+        rows.append(("bulk (logos/sec)", old, new, change, -change > threshold_percent))
+    return rows
+
+
+def print_report(result):
+    print(f"\n--- Stage Timings ({result['meta']['presets']} presets, repeat {result['meta']['repeat']}) ---")
+    for stage, stats in result['stages'].items():
+        print(f"  {stage:<22} median {stats['median_ms']:9.3f} ms   min {stats['min_ms']:9.3f} ms   calls {stats['calls']}")
+    bulk = result['bulk']
+    print(f"\n--- Bulk ({', '.join(bulk['formats'])}) ---")
+    print(f"  {bulk['presets']} presets, {bulk['outputs']} outputs in {bulk['total_s']:.2f} s")
+    print(f"  Throughput: {bulk['logos_per_sec']:.1f} logos/sec")
+    print(f"  Peak traced memory: {bulk['peak_traced_mb']:.2f} MB")
+
+
+def check_svg_emitter(presets):
+    """
+    Builds every preset with both SVG emitters, with and without inline flags, and compares the
+    canonicalized documents along with the warnings and flag sizes each emitter reports.
+    :return: A list of (preset_name, inline_flags) pairs that differ.
+    """
+    import xml.etree.ElementTree as ET
+    mismatches = []
+    for preset_name, config in presets.items():
+        leaf_params = leaf_params_from_preset(config)
+        for inline_flags in (False, True):
+            results = []
+            for emitter in ('dom', 'text'):
+                warnings, flag_uses = [], {}
+                svg_content = process_svg(warnings=warnings, inline_flags=inline_flags, flag_uses=flag_uses, emitter=emitter, **leaf_params)[1]
+                results.append((ET.canonicalize(svg_content), warnings, flag_uses))
+            if results[0] != results[1]:
+                mismatches.append((preset_name, inline_flags))
+    return mismatches
+
+
+def check_png_engine(presets, png_width=600, max_mean_diff=1.0, max_outlier_ratio=0.005, outlier_diff=32):
+    """
+    Renders every preset without flag fills with both PNG engines and compares the premultiplied pixels.
+    :return: A list of (preset_name, mean_diff, outlier_ratio, passed) rows, or None if CairoSVG,
+             NumPy or Pillow is unavailable.
+    """
+    try:
+        import numpy as np
+        from PIL import Image
+    except ImportError:
+        return None
+    if not load_cairosvg() or not load_fast_raster():
+        return None
+
+    def premultiplied(png_bytes):
+        pixels = np.asarray(Image.open(io.BytesIO(png_bytes)).convert('RGBA'), dtype=np.float32)
+        return np.concatenate((pixels[..., :3] * pixels[..., 3:] / 255, pixels[..., 3:]), axis=-1)
+
+    rows = []
+    for preset_name, config in presets.items():
+        leaf_params = leaf_params_from_preset(config)
+        flag_uses = {}
+        process_svg(warnings=[], flag_uses=flag_uses, **leaf_params)
+        if flag_uses: continue
+        (_, cairo_png), = render_logo(png_width=png_width, formats=['png'], warnings=[], **leaf_params)
+        (_, numpy_png), = render_logo(png_width=png_width, formats=['png'], warnings=[], png_engine='numpy', **leaf_params)
+        expected, actual = premultiplied(cairo_png), premultiplied(numpy_png)
+        if expected.shape != actual.shape:
+            rows.append((preset_name, float('inf'), 1.0, False))
+            continue
+        diff = np.abs(expected - actual).max(axis=-1)
+        mean_diff, outlier_ratio = float(diff.mean()), float((diff > outlier_diff).mean())
+        rows.append((preset_name, mean_diff, outlier_ratio, mean_diff <= max_mean_diff and outlier_ratio <= max_outlier_ratio))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks logo styling, rasterization and bulk generation on synthetic presets.\n"
+                    "Run from the repository root so flags/ can be found.",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('-n', '--presets', type=int, default=100, help="Number of synthetic presets. Default is 100.")
+    parser.add_argument('--flag-ratio', type=float, default=0.3, help="Share of leaves using flag-svg fills. Default is 0.3.")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for the synthetic presets. Default is 0.")
+    parser.add_argument('-r', '--repeat', type=int, default=3, help="Repetitions per stage. Default is 3.")
+    parser.add_argument('--formats', type=parse_output_formats, default=['svg'],
+                        help="Output formats for the bulk run and the CairoSVG stages. Default is 'svg'.")
+    parser.add_argument('--png-width', type=int, default=600, help="PNG width in pixels. Default is 600.")
+    parser.add_argument('-o', '--output', help="Write the results as JSON to this file.")
+    parser.add_argument('--compare', help="Baseline JSON result to compare against.")
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="Regression threshold in percent for --compare. Default is 10.\n"
+                             "Exits with status 1 if any metric regresses by more than this.")
+    parser.add_argument('--check-png-engine', action='store_true',
+                        help="Compare --png-engine numpy against CairoSVG on the presets without flag fills\n"
+                             "instead of benchmarking. Exits with status 1 if any logo differs beyond tolerance.")
+    parser.add_argument('--check-svg-emitter', action='store_true',
+                        help="Compare the 'text' SVG emitter against the 'dom' one instead of benchmarking.\n"
+                             "Exits with status 1 if any document differs.")
+    args = parser.parse_args()
+
+    if args.check_svg_emitter:
+        presets = make_synthetic_presets(args.presets, args.flag_ratio, args.seed)
+        FLAG_REGISTRY.preload()
+        mismatches = check_svg_emitter(presets)
+        for preset_name, inline_flags in mismatches:
+            print(f"  MISMATCH {preset_name}{' (inline flags)' if inline_flags else ''}")
+        print(f"{len(presets) * 2} documents compared, {len(mismatches)} differ.")
+        sys.exit(1 if mismatches else 0)
+
+    if args.check_png_engine:
+        presets = make_synthetic_presets(args.presets, args.flag_ratio, args.seed)
+        rows = check_png_engine(presets, png_width=args.png_width)
+        if rows is None:
+            print("Error: The PNG engine check needs CairoSVG, NumPy and Pillow.")
+            sys.exit(1)
+        for preset_name, mean_diff, outlier_ratio, passed in rows:
+            print(f"  {preset_name:<24} mean diff {mean_diff:7.3f}   pixels off by >32: {outlier_ratio * 100:6.3f}%  {'' if passed else 'MISMATCH'}")
+        failed = [row for row in rows if not row[3]]
+        print(f"\n{len(rows)} logos compared, {len(failed)} outside tolerance.")
+        sys.exit(1 if failed else 0)
+
+    if any(fmt != 'svg' for fmt in args.formats) and not load_cairosvg():
+        print("Note: CairoSVG not found, PNG/PDF stages will be skipped.")
+
+    presets = make_synthetic_presets(args.presets, args.flag_ratio, args.seed)
+    result = run_benchmarks(presets, repeat=args.repeat, formats=args.formats, png_width=args.png_width)
+    result['meta'] = {
+        'revision': _git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cairosvg': 'import_cairosvg' in result['stages'],
+        'presets': args.presets,
+        'flag_ratio': args.flag_ratio,
+        'seed': args.seed,
+        'repeat': args.repeat,
+    }
+    print_report(result)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved results: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        print(f"\n--- Comparison with {args.compare} (revision {baseline.get('meta', {}).get('revision')}) ---")
+        rows = compare_results(baseline, result, args.threshold)
+        for metric, old, new, change, regressed in rows:
+            marker = "REGRESSION" if regressed else ""
+            print(f"  {metric:<34} {old:10.3f} -> {new:10.3f}  {change:+7.1f}%  {marker}")
+        if any(row[4] for row in rows):
+            print(f"\nRegression above {args.threshold:g}% detected.")
+            sys.exit(1)
+        print("\nNo regressions above threshold.")
+
+if __name__ == "__main__":
+    main()
@@ -6,70 +6,297 @@
 import json
 import argparse
 import os
-from svg_styler_core import generate_and_save_logo, COUNTRY_CODES, create_argument_parser
+import io
+import contextlib
+import collections
+import itertools
+import time
+import svg_styler_core
+from svg_styler_core import (
+    generate_and_save_logo, COUNTRIES, create_argument_parser, FLAG_REGISTRY,
+    compute_render_key, output_filenames, leaf_params_from_preset, PROFILER,
+    reload_country_data, reload_logo_template
+)
+from render_manifest import RenderManifest
+from render_profile import StageProfiler, write_profile_record
+from pair_matrix import load_matrix_spec, iter_matrix_presets, matrix_size, MatrixSpecError
+from bulk_shards import in_shard, merge_shards
+from watch_mode import DependencyGraph, FileWatcher, TEMPLATE_DEPENDENCY
 
-def run_bulk_generation(args):
-    """Handles the logic for generating all logos from presets."""
-    output_dir = args.output
-    print(f"--- Starting Bulk Generation (Output Directory: {output_dir}) ---")
+def render_preset_job(job):
+    """
+    Renders a single preset. Used directly in serial mode and as the worker entry point in --jobs mode.
+    Progress output is captured so the parent can print it in preset order.
+    :param job: A (preset_name, output_path, leaf_params, render_options, profile) tuple, where render_options
+                holds the generate_and_save_logo keyword arguments shared by every preset
+                (png_width, formats, png_scales, unique_ids, inline_flags, flag_tile_dir, png_engine, svg_emitter) and profile enables per-stage timing.
+    :return: A (preset_name, success, message, log, profile_snapshot) tuple; profile_snapshot is None
+             unless profiling was requested.
+    """
+    preset_name, output_path, leaf_params, render_options, profile = job
+    if profile:
+        PROFILER.enabled = True
+        PROFILER.reset()
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        try:
+            success, message = generate_and_save_logo(output_path, **leaf_params, **render_options)
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            success, message = False, str(e)
+    return preset_name, success, message, log.getvalue(), (PROFILER.snapshot() if profile else None)
+
+
+def preload_flags():
+    """Warms the flag registry. Runs once in the parent for serial runs and once per worker process."""
+    FLAG_REGISTRY.preload()
+
+
+def run_preset_jobs(jobs, num_workers):
+    """
+    Runs preset render jobs serially or across a process pool.
+    `jobs` may be any iterable, including a lazy generator; in parallel mode only a bounded window of
+    jobs is in flight at once. Results are yielded in job order, regardless of which worker finishes first.
+    """
+    if num_workers <= 1:
+        for job in jobs:
+            yield render_preset_job(job)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor  # Imported here so serial runs skip loading multiprocessing
+    max_in_flight = num_workers * 4
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=preload_flags) as executor:
+        in_flight = collections.deque()
+        jobs = iter(jobs)
+        while True:
+            for job in itertools.islice(jobs, max_in_flight - len(in_flight)):
+                in_flight.append((job, executor.submit(render_preset_job, job)))
+            if not in_flight:
+                break
+            job, future = in_flight.popleft()
+            try:
+                yield future.result()
+            except Exception as e:
+                # The worker itself died (e.g. BrokenProcessPool); report it against this preset.
+                yield job[0], False, f"Worker failed: {e}", "", None
+
+
+def load_bulk_presets(args):
+    """
+    Returns (source_description, presets), where presets is an iterable of (preset_name, config) pairs:
+    the entries of presets.json, or the lazily expanded pairs of the --matrix spec.
+    Returns (None, None) after printing an error if the source cannot be read.
+    """
+    if args.matrix:
+        try:
+            spec = load_matrix_spec(args.matrix, countries=COUNTRIES)
+        except FileNotFoundError:
+            print(f"Error: Matrix spec '{args.matrix}' not found.")
+            return None, None
+        except MatrixSpecError as e:
+            print(f"Error: Invalid matrix spec '{args.matrix}'. {e}")
+            return None, None
+        return f"matrix {args.matrix} ({matrix_size(spec)} pairs)", iter_matrix_presets(spec)
 
     try:
-        os.makedirs(output_dir, exist_ok=True)
         with open('presets.json', 'r') as f:
-            presets = json.load(f)
+            return "presets.json", json.load(f).items()
     except FileNotFoundError:
         print("Error: presets.json not found. Cannot run bulk generation.")
-        return
     except json.JSONDecodeError:
         print("Error: Could not parse presets.json. Please check its syntax.")
+    return None, None
+
+
+def run_bulk_generation(args, only=None, jobs=None):
+    """
+    Handles the logic for generating all logos from presets.json or a --matrix spec.
+    Presets are streamed through the render key check and the workers one at a time, so the
+    preset list is never materialized. With --shard only this machine's share of the presets is
+    considered, and completed presets are journaled so a killed run picks up where it stopped.
+    :param only: Optional set of preset names; every other preset is left alone (used by --watch).
+    :param jobs: Overrides --jobs when given; --watch renders its batches with jobs=1.
+    """
+    output_dir = args.output
+    print(f"--- Starting Bulk Generation (Output Directory: {output_dir}) ---")
+
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+    except OSError as e:
+        print(f"Error: Could not create output directory '{output_dir}'. Reason: {e}")
         return
+    source, presets = load_bulk_presets(args)
+    if presets is None:
+        return
+    print(f"Presets from: {source}")
+    if args.shard:
+        print(f"Rendering shard {args.shard[0]}/{args.shard[1]}")
+
+    render_options = {'png_width': args.png_width, 'formats': args.formats, 'png_scales': args.png_scales, 'unique_ids': args.unique_ids, 'inline_flags': args.inline_flags, 'flag_tile_dir': args.flag_tile_cache, 'png_engine': args.png_engine, 'svg_emitter': args.svg_emitter}
+    preload_flags()
+    manifest = RenderManifest.load(output_dir)
+    if manifest.interrupted:
+        print(f"Resuming an interrupted run: {len(manifest.resumed)} presets were already completed.")
+    manifest.shard = args.shard
+    render_keys = {}
+    seen, up_to_date = set(), []
+
+    def pending_jobs():
+        # Skip presets whose render key matches the one their existing outputs were built from
+        for preset_name, config in presets:
+            if not in_shard(preset_name, args.shard) or (only is not None and preset_name not in only):
+                continue
+            seen.add(preset_name)
+            leaf_params = leaf_params_from_preset(config)
+            render_key = compute_render_key(**leaf_params, **render_options)
+            # --force still skips presets an interrupted run already re-rendered
+            if (not args.force or preset_name in manifest.resumed) and manifest.is_up_to_date(preset_name, render_key):
+                up_to_date.append(preset_name)
+                continue
+            render_keys[preset_name] = render_key
+            yield preset_name, os.path.join(output_dir, preset_name), leaf_params, render_options, args.profile
+
+    jobs = args.jobs if jobs is None else jobs
+    num_workers = jobs if jobs > 0 else (os.cpu_count() or 1)
+    if num_workers > 1:
+        print(f"Rendering with {num_workers} worker processes...")
+
+    failures = []
+    rendered = 0
+    completed = False
+    profile_totals = StageProfiler()
+    profile_file = open(args.profile_output, 'w') if args.profile and args.profile_output else None
+    start_time = time.perf_counter()
+    manifest.open_journal()
+    try:
+        for preset_name, success, message, log, profile_data in run_preset_jobs(pending_jobs(), num_workers):
+            print(f"\n--- Processing Preset: {preset_name} ---")
+            print(log, end='')
+            if profile_data:
+                profile_totals.merge(profile_data)
+                if profile_file:
+                    write_profile_record(profile_file, 'preset', preset_name, profile_data)
+            if success:
+                rendered += 1
+                manifest.record(preset_name, render_keys.pop(preset_name), output_filenames(preset_name, args.formats, args.png_scales, args.png_engine))
+            else:
+                render_keys.pop(preset_name, None)
+                manifest.forget(preset_name)
+                failures.append((preset_name, message))
+        completed = True
+    finally:
+        if completed and only is None:
+            manifest.prune(seen)  # Only a full pass knows which presets no longer exist
+        manifest.finish(completed)
+        if profile_file:
+            write_profile_record(profile_file, 'total', None, profile_totals.snapshot())
+            profile_file.close()
+    elapsed = time.perf_counter() - start_time
 
-    for preset_name, config in presets.items():
-        print(f"\n--- Processing Preset: {preset_name} ---")
-        output_path = os.path.join(output_dir, preset_name)
-
-        # Build params for each leaf from the preset config
-        top_params, right_params, left_params = None, None, None
-
-        if 'top_country' in config and config['top_country'] in COUNTRY_CODES:
-            top_params = {
-                'leaf_name': 'Top',
-                'country_code': COUNTRY_CODES[config['top_country']],
-                'fill_type': config.get('top_fill_type', 'gradient'),
-                'direction': config.get('top_direction', 'horizontal'),
-                'transition': config.get('top_transition', 20.0),
-                'zoom': config.get('top_zoom', 100.0),
-                'pan_x': config.get('top_pan_x', 0.0),
-                'pan_y': config.get('top_pan_y', 0.0)
-            }
-
-        if 'right_country' in config and config['right_country'] in COUNTRY_CODES:
-            right_params = {
-                'leaf_name': 'Right',
-                'country_code': COUNTRY_CODES[config['right_country']],
-                'fill_type': config.get('right_fill_type', 'gradient'),
-                'direction': config.get('right_direction', 'horizontal'),
-                'transition': config.get('right_transition', 20.0),
-                'zoom': config.get('right_zoom', 100.0),
-                'pan_x': config.get('right_pan_x', 0.0),
-                'pan_y': config.get('right_pan_y', 0.0)
-            }
-            
-        if 'left_country' in config and config['left_country'] in COUNTRY_CODES:
-            left_params = {
-                'leaf_name': 'Left',
-                'country_code': COUNTRY_CODES[config['left_country']],
-                'fill_type': config.get('left_fill_type', 'gradient'),
-                'direction': config.get('left_direction', 'horizontal'),
-                'transition': config.get('left_transition', 20.0),
-                'zoom': config.get('left_zoom', 100.0),
-                'pan_x': config.get('left_pan_x', 0.0),
-                'pan_y': config.get('left_pan_y', 0.0)
-            }
-
-        generate_and_save_logo(output_path, top_params=top_params, right_params=right_params, left_params=left_params, png_width=args.png_width)
-    
     print("\n--- Bulk Generation Complete ---")
+    if up_to_date:
+        shown = ', '.join(up_to_date[:20]) + (f", ... ({len(up_to_date) - 20} more)" if len(up_to_date) > 20 else "")
+        print(f"Skipped {len(up_to_date)} up-to-date presets (use --force to rebuild): {shown}")
+    print(f"Presets: {len(seen)} {'affected' if only is not None else 'in this shard' if args.shard else 'total'}, {rendered} rendered, "
+          f"{len(up_to_date)} up to date, {len(failures)} failed.")
+    for preset_name, message in failures:
+        print(f"  FAILED {preset_name}: {message}")
+
+    if args.profile:
+        print()
+        print(profile_totals.format_report(f"Profile: {rendered + len(failures)} presets"))
+        print(f"  Wall time: {elapsed * 1000:.2f} ms with {num_workers} worker(s)"
+              " (stage totals are summed across workers)")
+        if args.profile_output:
+            print(f"  Profile records written to: {args.profile_output}")
+
+
+def load_watched_presets(args):
+    """(preset_name, leaf_params) pairs for the presets this run renders, or None if they cannot be read."""
+    with contextlib.redirect_stdout(io.StringIO()) as messages:
+        _, presets = load_bulk_presets(args)
+    if presets is None:
+        print(messages.getvalue(), end='')
+        return None
+    return [(preset_name, leaf_params_from_preset(config)) for preset_name, config in presets if in_shard(preset_name, args.shard)]
+
+
+def run_watch_mode(args):
+    """
+    Brings the output directory up to date (with --jobs workers, if requested), then keeps watching the
+    preset source, the flags directory, country_data.py and the logo template. After each batch of changes
+    (debounced), only the presets that depend on a changed input are re-rendered. Batches are always
+    rendered serially in this process: it is the one that reloads the template and country data, and its
+    flags, gradients and parsed templates stay cached between batches. Runs until interrupted with Ctrl+C.
+    """
+    run_bulk_generation(args)
+    graph = DependencyGraph()
+    presets = load_watched_presets(args)
+    if presets is None:
+        return
+    graph.update_presets(presets)
+
+    preset_source = args.matrix or 'presets.json'
+    country_data_path = os.path.join(os.path.dirname(os.path.abspath(svg_styler_core.__file__)), 'country_data.py')
+    template_path = os.path.abspath(svg_styler_core.__file__)
+    watcher = FileWatcher(files=[preset_source, country_data_path, template_path], directories=[FLAG_REGISTRY.flags_dir])
+    print(f"\n--- Watching {preset_source}, {FLAG_REGISTRY.flags_dir}/, country_data.py and the logo template "
+          f"({len(graph)} presets); press Ctrl+C to stop ---")
+    if args.jobs != 1:
+        print("Note: Changes are re-rendered serially in this process; --jobs only applied to the initial pass.")
+
+    try:
+        while True:
+            changed_paths = watcher.wait_for_changes(args.watch_debounce)
+            changed_inputs, affected = set(), set()
+            reload_presets = False
+            for path in sorted(changed_paths):
+                if path == preset_source:
+                    reload_presets = True
+                elif path == country_data_path:
+                    try:
+                        changed_inputs |= {('colors', code) for code in reload_country_data()}
+                        reload_presets = True  # Names and aliases may now resolve to other countries
+                    except ValueError as e:
+                        print(f"Error: {e} Keeping the previous country data.")
+                elif path == template_path:
+                    try:
+                        if reload_logo_template():
+                            changed_inputs.add(TEMPLATE_DEPENDENCY)
+                        else:
+                            print("Note: svg_styler_core.py changed outside the logo template; restart --watch to pick up code changes.")
+                    except ValueError as e:
+                        print(f"Error: {e} Keeping the previous template.")
+                else:
+                    changed_inputs.add(('flag', os.path.splitext(os.path.basename(path))[0]))
+
+            if reload_presets:
+                presets = load_watched_presets(args)
+                if presets is not None:
+                    changed, removed = graph.update_presets(presets)
+                    affected |= changed
+                    if removed:
+                        print(f"Removed from {preset_source}: {', '.join(sorted(removed))} (outputs are kept).")
+            affected |= graph.affected(changed_inputs)
+
+            changed_names = ', '.join(os.path.relpath(path) for path in sorted(changed_paths))
+            if not affected:
+                print(f"\nChanged: {changed_names}. No presets affected.")
+                continue
+            print(f"\nChanged: {changed_names}. Re-rendering {len(affected)} affected presets.")
+            run_bulk_generation(args, only=affected, jobs=1)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+
+
+def resolve_country_arg(parser, option, value):
+    """Looks up a --*-country value by name, alias or ISO code, exiting with a suggestion if unknown."""
+    country = COUNTRIES.get(value)
+    if country is None:
+        suggestions = COUNTRIES.suggest(value)
+        hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""
+        parser.error(f"{option} '{value}' is not a valid country name.{hint}")
+    return country
 
 
 def run_single_generation(parser, initial_args):
@@ -96,30 +323,27 @@ def run_single_generation(parser, initial_args):
 
     top_params, right_params, left_params = None, None, None
     if args.top_country:
-        if args.top_country not in COUNTRY_CODES:
-            parser.error(f"--top-country '{args.top_country}' is not a valid country name.")
+        top_country = resolve_country_arg(parser, '--top-country', args.top_country)
         top_params = {
-            'leaf_name': 'Top', 'country_code': COUNTRY_CODES[args.top_country],
+            'leaf_name': 'Top', 'country_code': top_country.code,
             'fill_type': args.top_fill_type, 'direction': args.top_direction,
             'transition': args.top_transition, 'zoom': args.top_zoom,
             'pan_x': args.top_pan_x, 'pan_y': args.top_pan_y
         }
 
     if args.right_country:
-        if args.right_country not in COUNTRY_CODES:
-            parser.error(f"--right-country '{args.right_country}' is not a valid country name.")
+        right_country = resolve_country_arg(parser, '--right-country', args.right_country)
         right_params = {
-            'leaf_name': 'Right', 'country_code': COUNTRY_CODES[args.right_country],
+            'leaf_name': 'Right', 'country_code': right_country.code,
             'fill_type': args.right_fill_type, 'direction': args.right_direction,
             'transition': args.right_transition, 'zoom': args.right_zoom,
             'pan_x': args.right_pan_x, 'pan_y': args.right_pan_y
         }
     
     if args.left_country:
-        if args.left_country not in COUNTRY_CODES:
-            parser.error(f"--left-country '{args.left_country}' is not a valid country name.")
+        left_country = resolve_country_arg(parser, '--left-country', args.left_country)
         left_params = {
-            'leaf_name': 'Left', 'country_code': COUNTRY_CODES[args.left_country],
+            'leaf_name': 'Left', 'country_code': left_country.code,
             'fill_type': args.left_fill_type, 'direction': args.left_direction,
             'transition': args.left_transition, 'zoom': args.left_zoom,
             'pan_x': args.left_pan_x, 'pan_y': args.left_pan_y
@@ -128,13 +352,31 @@ def run_single_generation(parser, initial_args):
     if not top_params and not right_params and not left_params:
         parser.error("At least one leaf must be configured. Use a preset or specify a country (e.g., --top-country).")
 
-    generate_and_save_logo(args.output, top_params=top_params, right_params=right_params, left_params=left_params, png_width=args.png_width)
+    PROFILER.enabled = args.profile
+    generate_and_save_logo(args.output, top_params=top_params, right_params=right_params, left_params=left_params, png_width=args.png_width, formats=args.formats, png_scales=args.png_scales, unique_ids=args.unique_ids, inline_flags=args.inline_flags, flag_tile_dir=args.flag_tile_cache, png_engine=args.png_engine, svg_emitter=args.svg_emitter)
+    if args.profile:
+        print()
+        print(PROFILER.format_report("Profile"))
+        if args.profile_output:
+            with open(args.profile_output, 'w') as f:
+                write_profile_record(f, 'total', args.output, PROFILER.snapshot())
+            print(f"  Profile records written to: {args.profile_output}")
 
 def main():
     parser = create_argument_parser(is_cli=True)
     args = parser.parse_args()
+    for option, value in (('--matrix', args.matrix), ('--shard', args.shard), ('--watch', args.watch)):
+        if value and not args.generate_all:
+            parser.error(f"{option} can only be used together with --generate-all.")
 
-    if args.generate_all:
+    if args.merge_shards:
+        if args.generate_all:
+            parser.error("--merge-shards cannot be combined with --generate-all; merge once every shard has finished.")
+        success, message = merge_shards(args.merge_shards, args.output)
+        print(message if success else f"Error: {message}")
+    elif args.watch:
+        run_watch_mode(args)
+    elif args.generate_all:
         run_bulk_generation(args)
     else:
         run_single_generation(parser, args)
@@ -1,81 +1,154 @@
 # svg_styler_core.py
 
 import xml.etree.ElementTree as ET
-import re
 import os
-import uuid
 import io
 import argparse
-import base64
+import copy
+import json
+import hashlib
+import functools
+import importlib
+import itertools
+import re
+import ast
+import time
+from collections import namedtuple
 
 # --- Dependency Check and Imports ---
-try:
-    import cairosvg
-except ImportError:
-    print("Dependency Error: CairoSVG is not installed. This is required for PNG output.")
-    print("Please install with: pip install cairosvg")
-    # We don't exit here, as SVG generation might still work, but PNG saving will fail.
-    cairosvg = None
+# CairoSVG (and with it cairocffi, cssselect2, tinycss2 and PIL) is only imported once a PNG or PDF
+# is actually needed, so SVG-only runs and --help never pay for loading the rasterizer.
+# The loaders never print; why an import failed is kept until the CLI reports it (see pop_dependency_messages).
+_cairosvg = None
+_cairosvg_loaded = False
+CAIROSVG_IMPORT_SECONDS = None  # Wall time of the CairoSVG import, once attempted
+_dependency_messages = []
+
+def pop_dependency_messages():
+    """Returns the messages recorded by failed optional imports since the last call, and clears them."""
+    messages = list(_dependency_messages)
+    _dependency_messages.clear()
+    return messages
+
+def load_cairosvg():
+    """
+    Imports CairoSVG on first call and returns the module, or None if it is unavailable.
+    Nothing is printed; a failed first attempt records a message for pop_dependency_messages().
+    """
+    global _cairosvg, _cairosvg_loaded, CAIROSVG_IMPORT_SECONDS
+    if not _cairosvg_loaded:
+        _cairosvg_loaded = True
+        start = time.perf_counter()
+        try:
+            import cairosvg as module
+            _cairosvg = module
+        except (ImportError, OSError):
+            # OSError: the package is installed but the native cairo library is missing.
+            # We don't fail here, as SVG generation might still work, but PNG saving will fail.
+            _dependency_messages.append("Dependency Error: CairoSVG is not installed. This is required for PNG output.\n"
+                                        "Please install with: pip install cairosvg")
+        CAIROSVG_IMPORT_SECONDS = time.perf_counter() - start
+        if PROFILER.enabled:
+            PROFILER.add_time('import_cairosvg', CAIROSVG_IMPORT_SECONDS)
+    return _cairosvg
+
+_fast_raster = None
+_fast_raster_loaded = False
+
+def load_fast_raster():
+    """
+    Imports the NumPy rasterizer behind --png-engine numpy on first call; None if NumPy is unavailable.
+    Like load_cairosvg, a failure is recorded for pop_dependency_messages() rather than printed.
+    """
+    global _fast_raster, _fast_raster_loaded
+    if not _fast_raster_loaded:
+        _fast_raster_loaded = True
+        try:
+            import fast_raster as module
+            _fast_raster = module
+        except ImportError:
+            _dependency_messages.append("Note: NumPy is not installed, so PNGs are rendered with CairoSVG. Install with: pip install numpy")
+    return _fast_raster
+
+def __getattr__(name):
+    # Keeps `from svg_styler_core import cairosvg` working; importing the name triggers the lazy load
+    if name == 'cairosvg':
+        return load_cairosvg()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 try:
-    from country_data import COUNTRY_COLORS, COUNTRY_CODES
+    from country_data import COUNTRY_COLORS, COUNTRY_CODES, COUNTRY_ALIASES
 except ImportError:
     print("File Not Found: Could not import from country_data.py.")
     print("Please ensure it is in the same directory as this script.")
     exit()
 
+from flag_registry import FlagRegistry
+from flag_tiles import FlagTileCache
+from country_registry import CountryRegistry, parse_hex_color
+from path_geometry import path_bbox
+from render_profile import StageProfiler
+
 SVG_NAMESPACE = "http://www.w3.org/2000/svg"
 XLINK_NAMESPACE = "http://www.w3.org/1999/xlink"
 ET.register_namespace('', SVG_NAMESPACE)
 ET.register_namespace('xlink', XLINK_NAMESPACE)
-CODE_TO_COUNTRY_NAME = {code: name for name, code in COUNTRY_CODES.items()}
-COUNTRY_NAMES_SORTED = sorted(list(COUNTRY_CODES.keys()))
+FLAG_REGISTRY = FlagRegistry()
+PROFILER = StageProfiler()  # Enabled by `svg_styler_cli.py --profile`
+COUNTRIES = CountryRegistry(COUNTRY_COLORS, COUNTRY_CODES, aliases=COUNTRY_ALIASES, flags_dir=FLAG_REGISTRY.flags_dir)
+CODE_TO_COUNTRY_NAME = {country.code: country.name for country in COUNTRIES}
+COUNTRY_NAMES_SORTED = list(COUNTRIES.names)
+_FLAG_TILE_CACHES = {}
+
+def get_flag_tile_cache(directory):
+    """The process-wide FlagTileCache for `directory`, created on first use. Tiles are rasterized with CairoSVG."""
+    cache = _FLAG_TILE_CACHES.get(directory)
+    if cache is None:
+        cache = _FLAG_TILE_CACHES[directory] = FlagTileCache(
+            lambda svg_bytes, width: load_cairosvg().svg2png(bytestring=svg_bytes, output_width=width), directory=directory)
+    return cache
 
 # --- SVG Processing Logic ---
 def get_simple_path_bbox(d_attr):
+    """Bounding box of a path as an x/y/width/height dict. Width and height are never less than 1."""
     if not d_attr: return None
-    points_x, points_y = [], []
-    path_commands = re.findall(r"([mMlLhHvVcCsSqQtTaAzZ])([^mMlLhHvVcCsSqQtTaAzZ]*)", d_attr)
-    current_x, current_y = 0, 0
-    start_of_subpath_x, start_of_subpath_y = 0, 0
-    for cmd_idx, (cmd, params_str) in enumerate(path_commands):
-        params = [float(p) for p in re.findall(r"[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?", params_str)]
-        idx = 0; is_relative = cmd.islower(); cmd_upper = cmd.upper(); original_cmd_upper = cmd_upper
-        if cmd_upper == 'M':
-            px = params[idx] + (current_x if is_relative and cmd_idx > 0 else 0)
-            py = params[idx+1] + (current_y if is_relative and cmd_idx > 0 else 0)
-            points_x.append(px); points_y.append(py); current_x, current_y = px, py
-            start_of_subpath_x, start_of_subpath_y = px, py; idx += 2; cmd_upper = 'L'
-        while idx < len(params):
-            if cmd_upper == 'L':
-                px = params[idx] + (current_x if is_relative else 0); py = params[idx+1] + (current_y if is_relative else 0)
-                points_x.append(px); points_y.append(py); current_x, current_y = px, py; idx += 2
-            elif cmd_upper == 'H':
-                px = params[idx] + (current_x if is_relative else 0); py = current_y
-                points_x.append(px); points_y.append(py); current_x = px; idx += 1
-            elif cmd_upper == 'V':
-                px = current_x; py = params[idx] + (current_y if is_relative else 0)
-                points_x.append(px); points_y.append(py); current_y = py; idx += 1
-            elif cmd_upper in ['C', 'S', 'Q', 'T', 'A']:
-                num_params = {'C':6,'S':4,'Q':4,'T':2,'A':7}.get(cmd_upper,0)
-                if not num_params or idx + num_params > len(params): break
-                px = params[idx+num_params-2]+(current_x if is_relative else 0); py = params[idx+num_params-1]+(current_y if is_relative else 0)
-                points_x.append(px); points_y.append(py); current_x,current_y=px,py; idx+=num_params
-            else: break
-        if original_cmd_upper == 'Z' and points_x: current_x, current_y = start_of_subpath_x, start_of_subpath_y
-    if not points_x or not points_y: return {"x":0,"y":0,"width":1,"height":1}
-    min_x,max_x=min(points_x),max(points_x); min_y,max_y=min(points_y),max(points_y)
-    return {"x":min_x,"y":min_y,"width":max_x-min_x if max_x>min_x else 1,"height":max_y-min_y if max_y>min_y else 1}
+    bbox = path_bbox(d_attr)
+    if bbox is None: return {"x":0,"y":0,"width":1,"height":1}
+    min_x, min_y, width, height = bbox
+    return {"x":min_x,"y":min_y,"width":width if width>0 else 1,"height":height if height>0 else 1}
 
-def create_gradient_definition(defs_element, colors, gradient_id_base, gradient_direction, transition_width_percent=10):
-    gradient_id = f"{gradient_id_base}-{gradient_direction}-gradient-{uuid.uuid4().hex[:6]}"
+def leaf_id_base(leaf_params, unique_ids=False):
+    """
+    Prefix for the id of the pattern a leaf adds (and of its gradient with `unique_ids`), e.g. 'pl-top-3f2a9c1e'.
+    The suffix is a hash of the leaf params, so the same params always give the same ids and
+    unchanged logos are byte-identical across runs. With `unique_ids`, a random suffix is used instead.
+    """
+    if unique_ids:
+        import uuid  # Only needed for the opt-in random ids; importing it costs several ms at startup
+        suffix = uuid.uuid4().hex[:8]
+    else:
+        suffix = hashlib.sha256(json.dumps(_normalize_leaf_params(leaf_params), sort_keys=True).encode('utf-8')).hexdigest()[:8]
+    return f"{leaf_params['country_code']}-{leaf_params['leaf_name'].lower()}-{suffix}"
+
+# A gradient compiled once per (colors, direction, transition): its content-derived id, the
+# <linearGradient> coordinate attributes and the attributes of each <stop>.
+CompiledGradient = namedtuple("CompiledGradient", ["gradient_id", "coords", "stops"])
+
+@functools.lru_cache(maxsize=1024)
+def compile_gradient(colors, gradient_direction, transition_width_percent=10):
+    """
+    Computes the band and plateau stops of a country gradient. Memoized, so bulk runs build each
+    distinct gradient once per process. `colors` must be a tuple.
+    """
+    transition_width_percent = float(transition_width_percent)
+    key = json.dumps([list(colors), gradient_direction, transition_width_percent])
+    gradient_id = f"{gradient_direction}-gradient-{hashlib.sha256(key.encode('utf-8')).hexdigest()[:8]}"
     coords = {"x1": "0%", "y1": "0%", "x2": ("0%" if gradient_direction == "vertical" else "100%"), "y2": ("100%" if gradient_direction == "vertical" else "0%")}
-    gradient_element = ET.SubElement(defs_element, f"{{{SVG_NAMESPACE}}}linearGradient", {"id": gradient_id, **coords})
     num_colors = len(colors)
-    if num_colors == 0: return None
-    if num_colors == 1:
-        ET.SubElement(gradient_element, f"{{{SVG_NAMESPACE}}}stop", {"offset": "0%", "style": f"stop-color:{colors[0]}"})
-        return gradient_id
+    if num_colors <= 1:
+        stops = tuple({"offset": "0%", "style": f"stop-color:{color}"} for color in colors)
+        return CompiledGradient(gradient_id, coords, stops)
+    stops = []
     softness = transition_width_percent / 100.0
     band_width = 100.0 / num_colors
     transition_size = band_width * softness
@@ -88,75 +161,130 @@ def create_gradient_definition(defs_element, colors, gradient_id_base, gradient_
         if i == num_colors - 1: plateau_end = 100
         if plateau_start >= plateau_end:
             center_pos = band_start + (band_width / 2.0)
-            ET.SubElement(gradient_element, f"{{{SVG_NAMESPACE}}}stop", {"offset": f"{center_pos:.2f}%", "style": f"stop-color:{color}"})
+            stops.append({"offset": f"{center_pos:.2f}%", "style": f"stop-color:{color}"})
         else:
-            ET.SubElement(gradient_element, f"{{{SVG_NAMESPACE}}}stop", {"offset": f"{plateau_start:.2f}%", "style": f"stop-color:{color}"})
-            ET.SubElement(gradient_element, f"{{{SVG_NAMESPACE}}}stop", {"offset": f"{plateau_end:.2f}%", "style": f"stop-color:{color}"})
+            stops.append({"offset": f"{plateau_start:.2f}%", "style": f"stop-color:{color}"})
+            stops.append({"offset": f"{plateau_end:.2f}%", "style": f"stop-color:{color}"})
+    return CompiledGradient(gradient_id, coords, tuple(stops))
+
+def create_gradient_definition(defs_element, colors, gradient_id_base, gradient_direction, transition_width_percent=10):
+    """
+    Adds a <linearGradient> for `colors` to <defs> and returns its id.
+    With a `gradient_id_base` the id is '<base>-<direction>-gradient'. Without one the id is derived from
+    the gradient itself, and a gradient already present in `defs_element` is reused instead of added again.
+    """
+    if not colors: return None
+    gradient = compile_gradient(tuple(colors), gradient_direction, transition_width_percent)
+    gradient_id = f"{gradient_id_base}-{gradient_direction}-gradient" if gradient_id_base else gradient.gradient_id
+    if defs_element.find(f"{{{SVG_NAMESPACE}}}linearGradient[@id='{gradient_id}']") is not None:
+        return gradient_id
+    gradient_element = ET.SubElement(defs_element, f"{{{SVG_NAMESPACE}}}linearGradient", {"id": gradient_id, **gradient.coords})
+    for stop in gradient.stops:
+        ET.SubElement(gradient_element, f"{{{SVG_NAMESPACE}}}stop", stop)
     return gradient_id
 
-def modify_leaf_fill(root_element, defs_element, layer_group, leaf_id_method, leaf_params):
+def get_or_create_flag_definition(defs_element, flag_asset, inline=False):
+    """
+    Returns the id of the <image> in <defs> holding `flag_asset` at its natural size, adding it on first use.
+    Every pattern showing this flag references the same image, so the data URI is embedded once per SVG.
+    With `inline`, the flag's own elements are copied into <defs> as a <g> of the same size instead, so
+    renderers draw them directly rather than decoding and parsing a second SVG document.
+    """
+    flag_image_id = f"flag-{flag_asset.country_code}"
+    if defs_element.find(f"*[@id='{flag_image_id}']") is not None:
+        return flag_image_id
+    if inline:
+        defs_element.append(copy.deepcopy(flag_asset.inline_element))
+    else:
+        ET.SubElement(defs_element, f"{{{SVG_NAMESPACE}}}image", {
+            "id": flag_image_id,
+            "width": str(flag_asset.width),
+            "height": str(flag_asset.height),
+            f"{{{XLINK_NAMESPACE}}}href": flag_asset.data_uri
+        })
+    return flag_image_id
+
+def flag_pattern_geometry(leaf_d_attribute, flag_asset, leaf_params):
+    """
+    Where a flag is drawn inside a leaf: scaled to cover the leaf's bounding box, zoomed, centered and panned.
+    :return: An (x, y, width, height) tuple in logo units, or None if the leaf has no usable bounding box.
+    """
+    # 1. Get leaf's bounding box
+    bbox = get_simple_path_bbox(leaf_d_attribute)
+    if not (bbox and bbox['width'] > 0 and bbox['height'] > 0):
+        return None
+    # 2. Calculate "cover" dimensions for the image
+    bbox_w, bbox_h = bbox['width'], bbox['height']
+    bbox_aspect_ratio = bbox_w / bbox_h
+    flag_aspect_ratio = flag_asset.aspect_ratio
+
+    img_w, img_h = (bbox_w, bbox_w / flag_aspect_ratio) if bbox_aspect_ratio > flag_aspect_ratio else (bbox_h * flag_aspect_ratio, bbox_h)
+
+    # 3. Apply zoom
+    zoom_factor = leaf_params.get('zoom', 100.0) / 100.0
+    final_img_w = img_w * zoom_factor
+    final_img_h = img_h * zoom_factor
+
+    # 4. Calculate centered position and apply pan
+    img_x = bbox['x'] + (bbox_w - final_img_w) / 2
+    img_y = bbox['y'] + (bbox_h - final_img_h) / 2
+
+    overhang_x = max(0, final_img_w - bbox_w)
+    overhang_y = max(0, final_img_h - bbox_h)
+    img_x -= (leaf_params.get('pan_x', 0.0) / 100.0) * (overhang_x / 2.0)
+    img_y -= (leaf_params.get('pan_y', 0.0) / 100.0) * (overhang_y / 2.0)
+    return img_x, img_y, final_img_w, final_img_h
+
+def modify_leaf_fill(root_element, defs_element, layer_group, leaf_id_method, leaf_params, warnings=None, unique_ids=False, inline_flags=False, flag_uses=None):
     country_code = leaf_params['country_code']
-    country_name = CODE_TO_COUNTRY_NAME.get(country_code)
-    if not country_name or country_name not in COUNTRY_COLORS:
+    country = COUNTRIES.by_code(country_code)
+    if country is None:
         return False, f"Data not found for code: {country_code}"
+    country_name = country.name
     target_path_element = None
-    all_paths_in_group = [el for el in list(layer_group) if el.tag == f"{{{SVG_NAMESPACE}}}path"]
-    d_start = leaf_id_method['d_start']
-    for path_el_candidate in all_paths_in_group:
-        if 'processed' in path_el_candidate.attrib: continue
-        if path_el_candidate.get("d", "").strip().startswith(d_start):
-            target_path_element = path_el_candidate
-            break
+    if leaf_id_method['type'] == 'element':
+        # Pre-located by CompiledLogoTemplate, no need to search the group
+        target_path_element = leaf_id_method['element']
+    else:
+        all_paths_in_group = [el for el in list(layer_group) if el.tag == f"{{{SVG_NAMESPACE}}}path"]
+        d_start = leaf_id_method['d_start']
+        for path_el_candidate in all_paths_in_group:
+            if 'processed' in path_el_candidate.attrib: continue
+            if path_el_candidate.get("d", "").strip().startswith(d_start):
+                target_path_element = path_el_candidate
+                break
     if target_path_element is None: return False, f"Path not found for {leaf_params['leaf_name']}"
     target_path_element.set('processed', 'true')
 
     leaf_d_attribute = target_path_element.get("d")
     if not leaf_d_attribute: return False, "Target path has no 'd' attribute."
     
-    unique_id_base = f"{country_code}-{leaf_params['leaf_name'].lower()}-{uuid.uuid4().hex[:4]}"
+    unique_id_base = leaf_id_base(leaf_params, unique_ids)
     fill_applied_successfully = False
 
     if leaf_params['fill_type'] == "flag-svg":
-        flag_svg_path = os.path.join("flags", f"{country_code}.svg")
+        flag_svg_path = country.flag_path
         if os.path.exists(flag_svg_path):
             try:
-                # 1. Get flag's original dimensions
-                flag_tree = ET.parse(flag_svg_path)
-                flag_root = flag_tree.getroot()
-                flag_viewbox = flag_root.get("viewBox", "0 0 100 100").split()
-                flag_w = float(flag_root.get("width", flag_viewbox[2] if len(flag_viewbox) == 4 else "100"))
-                flag_h = float(flag_root.get("height", flag_viewbox[3] if len(flag_viewbox) == 4 else "100"))
-                flag_aspect_ratio = flag_w / flag_h if flag_h > 0 else 1
-
-                # 2. Get leaf's bounding box
-                bbox = get_simple_path_bbox(leaf_d_attribute)
-                if bbox and bbox['width'] > 0 and bbox['height'] > 0:
-                    # 3. Calculate "cover" dimensions for the image
-                    bbox_w, bbox_h = bbox['width'], bbox['height']
-                    bbox_aspect_ratio = bbox_w / bbox_h
-                    
-                    img_w, img_h = (bbox_w, bbox_w / flag_aspect_ratio) if bbox_aspect_ratio > flag_aspect_ratio else (bbox_h * flag_aspect_ratio, bbox_h)
+                # 1. Get flag's original dimensions (parsed and encoded once per file version)
+                with PROFILER.stage('flag_load'):
+                    flag_asset = FLAG_REGISTRY.get(country_code)
+                if flag_asset is None: raise FileNotFoundError(flag_svg_path)
 
-                    # 4. Apply zoom
-                    zoom_factor = leaf_params.get('zoom', 100.0) / 100.0
-                    final_img_w = img_w * zoom_factor
-                    final_img_h = img_h * zoom_factor
-                    
-                    # 5. Calculate centered position and apply pan
-                    img_x = bbox['x'] + (bbox_w - final_img_w) / 2
-                    img_y = bbox['y'] + (bbox_h - final_img_h) / 2
-                    
-                    overhang_x = max(0, final_img_w - bbox_w)
-                    overhang_y = max(0, final_img_h - bbox_h)
-                    img_x -= (leaf_params.get('pan_x', 0.0) / 100.0) * (overhang_x / 2.0)
-                    img_y -= (leaf_params.get('pan_y', 0.0) / 100.0) * (overhang_y / 2.0)
+                # 2. Size and place the flag so it covers the leaf
+                geometry = flag_pattern_geometry(leaf_d_attribute, flag_asset, leaf_params)
+                if geometry:
+                    img_x, img_y, final_img_w, final_img_h = geometry
 
-                    # 6. Read and Base64-encode the flag SVG
-                    with open(flag_svg_path, "rb") as f:
-                        encoded_flag = base64.b64encode(f.read()).decode('ascii')
-                    data_uri = f"data:image/svg+xml;base64,{encoded_flag}"
+                    # 3. Embed the flag once, in <defs>: its cached Base64 data URI, or its own elements with inline_flags
+                    inline = inline_flags and flag_asset.inline_element is not None
+                    if inline_flags and not inline:
+                        message = f"Flag for {country_name} cannot be inlined ({flag_asset.inline_error}). Embedding it as an image."
+                        if warnings is None: print(f"Warning: {message}")
+                        else: warnings.append(message)
+                    flag_image_id = get_or_create_flag_definition(defs_element, flag_asset, inline=inline)
 
-                    # 7. Create the <pattern> element
+                    # 4. Create the <pattern> element
                     pattern_id = f"pattern-{unique_id_base}"
                     pattern_el = ET.SubElement(defs_element, f"{{{SVG_NAMESPACE}}}pattern", {
                         "id": pattern_id,
@@ -167,39 +295,44 @@ def modify_leaf_fill(root_element, defs_element, layer_group, leaf_id_method, le
                         "height": str(final_img_h)
                     })
                     
-                    # 8. Create the <image> inside the pattern
-                    ET.SubElement(pattern_el, f"{{{SVG_NAMESPACE}}}image", {
-                        "x": "0",
-                        "y": "0",
-                        "width": str(final_img_w),
-                        "height": str(final_img_h),
-                        f"{{{XLINK_NAMESPACE}}}href": data_uri
+                    # 5. Reference the shared flag image from the pattern, scaled to the cover size
+                    ET.SubElement(pattern_el, f"{{{SVG_NAMESPACE}}}use", {
+                        "transform": f"scale({final_img_w / flag_asset.width})",
+                        f"{{{XLINK_NAMESPACE}}}href": f"#{flag_image_id}"
                     })
                     
-                    # 9. Apply the pattern fill to the target path
+                    # 6. Apply the pattern fill to the target path
                     target_path_element.set("fill", f"url(#{pattern_id})")
                     if 'class' in target_path_element.attrib:
                         del target_path_element.attrib['class']
 
                     fill_applied_successfully = True
+                    PROFILER.count('flag_fills')
+                    if flag_uses is not None:
+                        # Widest drawn size of each flag, in logo units; sizes the raster tiles for PNG output
+                        flag_uses[country_code] = max(flag_uses.get(country_code, 0.0), final_img_w)
             except Exception as e:
                 # Fallback to gradient on any error
-                print(f"Warning: Failed to apply SVG flag pattern for {country_name}. Reason: {e}. Falling back to gradient.")
-                pass
+                PROFILER.count('flag_fallbacks')
+                message = f"Failed to apply SVG flag pattern for {country_name}. Reason: {e}. Falling back to gradient."
+                if warnings is None: print(f"Warning: {message}")
+                else: warnings.append(message)
 
     if leaf_params['fill_type'] == "gradient" or not fill_applied_successfully:
         if target_path_element in list(layer_group):
-            colors = COUNTRY_COLORS[country_name]
-            gradient_id = create_gradient_definition(defs_element, colors, unique_id_base, leaf_params['direction'], leaf_params.get('transition', 10))
+            colors = country.colors
+            # Identical gradients share one <defs> entry unless unique ids were requested
+            with PROFILER.stage('gradient'):
+                gradient_id = create_gradient_definition(defs_element, colors, unique_id_base if unique_ids else None, leaf_params['direction'], leaf_params.get('transition', 10))
+            PROFILER.count('gradient_fills')
             if gradient_id:
                 target_path_element.set("fill", f"url(#{gradient_id})")
                 if 'class' in target_path_element.attrib: del target_path_element.attrib['class']
     
     return True, f"Processed {leaf_params['leaf_name']}."
 
-def process_svg(top_params=None, right_params=None, left_params=None):
-    """Generates the final SVG content as a string."""
-    input_svg_content = """<?xml version="1.0" encoding="UTF-8"?>
+# --- Logo Template ---
+LOGO_TEMPLATE_SVG = """<?xml version="1.0" encoding="UTF-8"?>
 <svg id="Layer_2" data-name="Layer 2" xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" viewBox="0 0 640 510">
   <defs>
     <style> .cls-1 { fill: #088180; } .cls-1, .cls-2 { stroke-width: 0px; } .cls-2 { fill: #fff; } </style>
@@ -208,39 +341,636 @@ def process_svg(top_params=None, right_params=None, left_params=None):
     <path class="cls-1" d="m200.76,164.31s0,.02-.01.04c.01-.02.01-.03.01-.04Z"/><path class="cls-1" d="m336.98,299.22s-.03.01-.04.02c.02-.01.03-.01.04-.02Z"/><path class="cls-2" d="m335.97,494.14c2.17,4.26.47,9.47-3.78,11.64-4.27,2.17-9.48.47-11.64-3.79-2.17-4.27-.49-9.47,3.79-11.63,4.26-2.17,9.47-.47,11.63,3.78Z"/><path class="cls-2" d="m92.66,263.59c23.4,46.34,57.14,86.7,98.33,117.92,30.62-17.89,50.22-52.01,47.69-89.8-2.04-30.52-18.07-56.76-41.39-72.92-7.45-5.16-15.62-9.29-24.34-12.22-3.41-1.13-6.91-2.08-10.47-2.83-42.4-13.57-75.36-49.41-84.13-94.6l-.14-.1C27.48,144.39-4.01,204.67.41,270.87c3.66,54.84,31.24,102.41,71.85,133.18-.18-.14-.34-.28-.52-.42,14.29,11.07,33.1,16.81,52.58,15.51,23.41-1.57,43.64-13.48,56.61-30.95-38.23-34.09-68.6-76.67-88.27-124.61Zm-35.79,124.1s.01.02.03.03t-.03-.03Z"/><path class="cls-2" d="m284.59,97c-12.86,39.08-16.58,80.63-10.99,121.21,27.19,7.15,57.32-1,77.07-23.6,15.96-18.25,21.7-41.94,17.67-64.09-1.28-7.07-3.54-13.98-6.8-20.49-1.27-2.55-2.69-5.03-4.27-7.46-16.16-31.37-14.56-69.93,5.86-100.17v-.14c-48.26-8.63-99.72,7.51-134.33,47.09-28.7,32.81-39.9,74.91-34.39,114.94-.02-.18-.04-.35-.05-.52,1.8,14.22,9.12,27.98,20.78,38.16,14,12.25,32,16.92,49.07,14.38-2.3-40.53,4.54-81.42,20.38-119.31Zm-89.63,49.5s0,.02-.02.04c.02-.02.02-.03.02-.04Z"/><path class="cls-2" d="m465.83,320.23c-50.27,25.39-94.07,62.01-127.93,106.7,19.4,33.22,56.42,54.48,97.43,51.75,33.12-2.21,61.59-19.61,79.13-44.93,5.6-8.07,10.09-16.96,13.25-26.42,1.23-3.7,2.25-7.49,3.08-11.35,14.72-46,53.61-81.77,102.64-91.29l.12-.13c-38.36-55.05-103.77-89.23-175.59-84.43-59.53,3.97-111.13,33.87-144.53,77.94.15-.19.31-.36.46-.55-12.02,15.51-18.24,35.91-16.82,57.05,1.68,25.4,14.61,47.35,33.56,61.42,37-41.46,83.2-74.42,135.21-95.77Zm-134.66-38.82s-.02,0-.02.02c0-.02.01-.02.02-.02Z"/><path class="cls-2" d="m269.5,241.69c-.11.05-.23.11-.35.17-1.69,5.97-3.23,12.03-4.57,18.18-18.98,87.93,3.98,175.16,55.42,240.84,5.66-1.54,11.11-3.67,16.27-6.28-53.72-69.9-79.88-160.26-66.77-252.92Z"/><path class="cls-2" d="m192.17,390.42c-.03.13-.04.28-.06.41,4.35,4.94,8.88,9.79,13.59,14.52,30.01,29.98,64.64,52.48,101.6,67.51-4.39-6.59-8.54-13.37-12.42-20.29-36.69-14.44-71.5-35.14-102.72-62.16Z"/>
   </g>
 </svg>"""
-    try:
-        # Clean up any previously generated elements before processing
-        root = ET.fromstring(input_svg_content)
-        for path in root.findall(f".//{{{SVG_NAMESPACE}}}path[@processed]"):
-            del path.attrib['processed']
-        
-        defs_element = root.find(f".//{{{SVG_NAMESPACE}}}defs")
-        if defs_element is None: defs_element = ET.SubElement(root, f"{{{SVG_NAMESPACE}}}defs")
-        
-        # Clear previous gradients and patterns
-        for item in list(defs_element):
-            item_id = item.get('id', '')
-            if 'gradient' in item_id or 'pattern' in item_id:
-                defs_element.remove(item)
 
+# The three leaves are identified by the start of their 'd' attribute.
+LEAF_D_STARTS = {
+    'Left': "m92.66,263.59c",
+    'Top': "m284.59,97c",
+    'Right': "m465.83,320.23c",
+}
+
+class CompiledLogoTemplate:
+    """
+    The logo template parsed once, with the location of every element a render needs to touch.
+    Each render works on its own deep copy, so the parsed tree itself is never modified.
+    """
+    def __init__(self, svg_content):
+        self.root = ET.fromstring(svg_content)
+
+        defs_element = self.root.find(f"{{{SVG_NAMESPACE}}}defs")
+        if defs_element is None:
+            defs_element = ET.Element(f"{{{SVG_NAMESPACE}}}defs")
+            self.root.insert(0, defs_element)
+        layer_group = self.root.find(f".//{{{SVG_NAMESPACE}}}g[@id='Layer_1-2']")
+        if layer_group is None:
+            raise ValueError("Main layer group 'Layer_1-2' not found.")
+
+        # Handles are stored as child-index paths from the root so they can be re-resolved in a copy
+        self.defs_path = self._index_path(defs_element)
+        self.layer_group_path = self._index_path(layer_group)
+        self.leaf_paths = {}
+        for leaf_name, d_start in LEAF_D_STARTS.items():
+            for index, child in enumerate(layer_group):
+                if child.tag == f"{{{SVG_NAMESPACE}}}path" and child.get("d", "").strip().startswith(d_start):
+                    self.leaf_paths[leaf_name] = self.layer_group_path + (index,)
+                    path_bbox(child.get("d"))  # Warm the memoized leaf geometry
+                    break
+            else:
+                raise ValueError(f"Leaf path for {leaf_name} (d starts with '{d_start}') not found.")
+
+        # The drawn shapes in document order as (leaf_name or None, d, class fill color), for fast_raster
+        class_fills = {}
+        style_element = defs_element.find(f"{{{SVG_NAMESPACE}}}style")
+        for selectors, declarations in re.findall(r"([^{}]+)\{([^}]*)\}", style_element.text if style_element is not None else ""):
+            fill = re.search(r"(?:^|;)\s*fill\s*:\s*([^;]+)", declarations)
+            if fill:
+                for selector in selectors.split(','):
+                    class_fills[selector.strip().lstrip('.')] = fill.group(1).strip()
+        leaf_names_by_d = {self._resolve(self.root, path).get("d"): name for name, path in self.leaf_paths.items()}
+        self.layers = [(leaf_names_by_d.get(child.get("d")), child.get("d"), child.get("fill") or class_fills.get(child.get("class"), "#000"))
+                       for child in layer_group if child.tag == f"{{{SVG_NAMESPACE}}}path"]
+
+    def _index_path(self, target):
+        def search(element, path):
+            if element is target: return path
+            for index, child in enumerate(element):
+                found = search(child, path + (index,))
+                if found is not None: return found
+            return None
+        return search(self.root, ())
+
+    @staticmethod
+    def _resolve(root, path):
+        element = root
+        for index in path:
+            element = element[index]
+        return element
+
+    def instantiate(self):
+        """
+        Returns a fresh copy of the template and handles into it.
+        :return: A (root, defs_element, layer_group, leaf_elements) tuple, where leaf_elements maps
+                 'Left'/'Top'/'Right' to the corresponding <path> element of the copy.
+        """
+        root = copy.deepcopy(self.root)
+        leaf_elements = {name: self._resolve(root, path) for name, path in self.leaf_paths.items()}
+        return root, self._resolve(root, self.defs_path), self._resolve(root, self.layer_group_path), leaf_elements
+
+LOGO_TEMPLATE = CompiledLogoTemplate(LOGO_TEMPLATE_SVG)
+LOGO_TEMPLATE_DIGEST = hashlib.sha256(LOGO_TEMPLATE_SVG.encode('utf-8')).hexdigest()
+LOGO_VIEWBOX_WIDTH = float(LOGO_TEMPLATE.root.get('viewBox').split()[2])
+
+_ATTRIBUTE_SPECIAL_CHARS = re.compile(r'[&<>"\n\r\t]')
+
+def _escape_attribute(value):
+    # The same escaping ElementTree applies to attribute values
+    value = str(value)
+    if _ATTRIBUTE_SPECIAL_CHARS.search(value):
+        value = (value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+                 .replace("\r", "&#13;").replace("\n", "&#10;").replace("\t", "&#09;"))
+    return value
+
+def _attribute_text(attributes):
+    return ''.join(f' {name}="{_escape_attribute(value)}"' for name, value in attributes)
+
+def _empty_element(tag, attributes, content=None):
+    # Serialized the way ET.tostring serializes an element without text or tail
+    attribute_text = _attribute_text(attributes)
+    return f"<{tag}{attribute_text}>{content}</{tag}>" if content else f"<{tag}{attribute_text} />"
+
+@functools.lru_cache(maxsize=1024)
+def _gradient_markup(colors, gradient_direction, transition_width_percent, gradient_id):
+    gradient = compile_gradient(colors, gradient_direction, transition_width_percent)
+    stops = ''.join(_empty_element('stop', stop.items()) for stop in gradient.stops)
+    return _empty_element('linearGradient', [('id', gradient_id), *gradient.coords.items()], stops)
+
+class TextLogoTemplate:
+    """
+    The logo template serialized once into fixed text segments, with slots for the content process_svg adds
+    to <defs> and for the three leaf <path> elements. A render fills the slots and joins the segments,
+    producing the same text as styling a copy of the template tree and serializing it, without either step.
+    """
+    DEFS_SLOT = 'defs'
+
+    def __init__(self, compiled_template):
+        root = copy.deepcopy(compiled_template.root)
+        CompiledLogoTemplate._resolve(root, compiled_template.defs_path).append(ET.Comment(f"slot:{self.DEFS_SLOT}"))
+        self.leaf_attributes, self.leaf_ds = {}, {}
+        for leaf_name, path in compiled_template.leaf_paths.items():
+            parent = CompiledLogoTemplate._resolve(root, path[:-1])
+            leaf_element = parent[path[-1]]
+            self.leaf_attributes[leaf_name] = list(leaf_element.attrib.items())
+            self.leaf_ds[leaf_name] = leaf_element.get("d")
+            placeholder = ET.Comment(f"slot:{leaf_name}")
+            placeholder.tail = leaf_element.tail
+            parent[path[-1]] = placeholder
+
+        # Alternating fixed text and slot names: [text, slot, text, slot, ..., text]
+        self.parts = re.split(r"<!--slot:(\w+)-->", ET.tostring(root, encoding="unicode", method="xml"))
+        self.untouched_leaves = {leaf_name: _empty_element('path', attributes) for leaf_name, attributes in self.leaf_attributes.items()}
+        # Leaf attribute text escaped once: (with the class attribute, without it)
+        self._leaf_attribute_text = {leaf_name: (_attribute_text(attributes), _attribute_text((name, value) for name, value in attributes if name != 'class'))
+                                     for leaf_name, attributes in self.leaf_attributes.items()}
+        # ElementTree only declares xmlns:xlink on the root when the document uses it, i.e. once a flag fill adds an href
+        default_namespace = f'xmlns="{SVG_NAMESPACE}"'
+        xlink_namespace = f'xmlns:xlink="{XLINK_NAMESPACE}"'
+        self.xlink_head = self.parts[0] if xlink_namespace in self.parts[0] else self.parts[0].replace(default_namespace, f"{default_namespace} {xlink_namespace}", 1)
+        self._flag_markup = {}
+
+    def leaf_markup(self, leaf_name, fill):
+        """The <path> of a processed leaf: its class rule is replaced by `fill`, when there is one."""
+        with_class, without_class = self._leaf_attribute_text[leaf_name]
+        if fill:
+            return f'<path{without_class} processed="true" fill="{_escape_attribute(fill)}" />'
+        return f'<path{with_class} processed="true" />'
+
+    def flag_markup(self, flag_asset, inline=False):
+        """
+        The <defs> entry get_or_create_flag_definition adds for a flag, serialized once per flag file version.
+        An inline <g> loses the namespace declarations ElementTree gives a standalone element.
+        """
+        key = (flag_asset.country_code, flag_asset.digest, inline)
+        markup = self._flag_markup.get(key)
+        if markup is None:
+            if inline:
+                markup = ET.tostring(flag_asset.inline_element, encoding="unicode", method="xml")
+                head, _, rest = markup.partition('>')
+                head = head.replace(f' xmlns="{SVG_NAMESPACE}"', '', 1).replace(f' xmlns:xlink="{XLINK_NAMESPACE}"', '', 1)
+                markup = f"{head}>{rest}"
+            else:
+                markup = _empty_element('image', (('id', f"flag-{flag_asset.country_code}"), ('width', flag_asset.width),
+                                                  ('height', flag_asset.height), ('xlink:href', flag_asset.data_uri)))
+            self._flag_markup[key] = markup
+        return markup
+
+    def emit(self, top_params=None, right_params=None, left_params=None, warnings=None, unique_ids=False, inline_flags=False, flag_uses=None):
+        """Fills the slots for the given leaves; see process_svg for the parameters. Mirrors modify_leaf_fill."""
+        defs_content = []
+        defined_ids = set()
+        leaves = dict(self.untouched_leaves)
+        for leaf_name, leaf_params in (('Left', left_params), ('Top', top_params), ('Right', right_params)):
+            if not leaf_params: continue
+            country_code = leaf_params['country_code']
+            country = COUNTRIES.by_code(country_code)
+            if country is None: continue
+            unique_id_base = leaf_id_base(leaf_params, unique_ids)
+            fill = None
+
+            if leaf_params['fill_type'] == "flag-svg" and os.path.exists(country.flag_path):
+                try:
+                    with PROFILER.stage('flag_load'):
+                        flag_asset = FLAG_REGISTRY.get(country_code)
+                    if flag_asset is None: raise FileNotFoundError(country.flag_path)
+                    geometry = flag_pattern_geometry(self.leaf_ds[leaf_name], flag_asset, leaf_params)
+                    if geometry:
+                        img_x, img_y, final_img_w, final_img_h = geometry
+                        inline = inline_flags and flag_asset.inline_element is not None
+                        if inline_flags and not inline:
+                            message = f"Flag for {country.name} cannot be inlined ({flag_asset.inline_error}). Embedding it as an image."
+                            if warnings is None: print(f"Warning: {message}")
+                            else: warnings.append(message)
+                        flag_image_id = f"flag-{country_code}"
+                        if flag_image_id not in defined_ids:
+                            defined_ids.add(flag_image_id)
+                            defs_content.append(self.flag_markup(flag_asset, inline=inline))
+                        pattern_id = f"pattern-{unique_id_base}"
+                        flag_use = _empty_element('use', (('transform', f"scale({final_img_w / flag_asset.width})"), ('xlink:href', f"#{flag_image_id}")))
+                        defs_content.append(_empty_element('pattern', (
+                            ('id', pattern_id), ('patternUnits', "userSpaceOnUse"),
+                            ('x', img_x), ('y', img_y), ('width', final_img_w), ('height', final_img_h)), flag_use))
+                        fill = f"url(#{pattern_id})"
+                        PROFILER.count('flag_fills')
+                        if flag_uses is not None:
+                            flag_uses[country_code] = max(flag_uses.get(country_code, 0.0), final_img_w)
+                except Exception as e:
+                    PROFILER.count('flag_fallbacks')
+                    message = f"Failed to apply SVG flag pattern for {country.name}. Reason: {e}. Falling back to gradient."
+                    if warnings is None: print(f"Warning: {message}")
+                    else: warnings.append(message)
+
+            if fill is None:
+                with PROFILER.stage('gradient'):
+                    if country.colors:
+                        colors, transition = tuple(country.colors), float(leaf_params.get('transition', 10))
+                        gradient = compile_gradient(colors, leaf_params['direction'], transition)
+                        gradient_id = f"{unique_id_base}-{leaf_params['direction']}-gradient" if unique_ids else gradient.gradient_id
+                        if gradient_id not in defined_ids:
+                            defined_ids.add(gradient_id)
+                            defs_content.append(_gradient_markup(colors, leaf_params['direction'], transition, gradient_id))
+                        fill = f"url(#{gradient_id})"
+                PROFILER.count('gradient_fills')
+            leaves[leaf_name] = self.leaf_markup(leaf_name, fill)
+
+        slots = {self.DEFS_SLOT: ''.join(defs_content), **leaves}
+        uses_xlink = any(content.startswith('<pattern') for content in defs_content)
+        parts = [self.xlink_head if uses_xlink else self.parts[0]]
+        for index in range(1, len(self.parts), 2):
+            parts.append(slots[self.parts[index]])
+            parts.append(self.parts[index + 1])
+        return ''.join(parts)
+
+LOGO_TEXT_TEMPLATE = TextLogoTemplate(LOGO_TEMPLATE)
+SVG_EMITTERS = ('text', 'dom')
+
+def reload_logo_template(source_path=__file__):
+    """
+    Re-reads LOGO_TEMPLATE_SVG from this module's source file and, if it changed, recompiles the templates
+    every render uses. Lets a long-running process (--watch) pick up template edits without a restart.
+    :param source_path: The file to read the template from; this module unless testing.
+    :return: True if the template changed.
+    :raises ValueError: If the new template is missing or cannot be compiled, or its viewBox is missing or
+                        malformed. The old template then stays in use, with every global left untouched.
+    """
+    global LOGO_TEMPLATE_SVG, LOGO_TEMPLATE, LOGO_TEMPLATE_DIGEST, LOGO_VIEWBOX_WIDTH, LOGO_TEXT_TEMPLATE
+    with open(source_path, 'r', encoding='utf-8') as f:
+        module_source = f.read()
+    try:
+        svg_content = next(ast.literal_eval(node.value) for node in ast.parse(module_source).body
+                           if isinstance(node, ast.Assign) and any(getattr(target, 'id', None) == 'LOGO_TEMPLATE_SVG' for target in node.targets))
+    except (SyntaxError, StopIteration):
+        raise ValueError("LOGO_TEMPLATE_SVG could not be read from the module source.")
+    if svg_content == LOGO_TEMPLATE_SVG:
+        return False
+    try:
+        template = CompiledLogoTemplate(svg_content)
+        text_template = TextLogoTemplate(template)
     except ET.ParseError as e:
-        return f"Fatal: Could not parse SVG template: {e}", None
-        
-    layer_group = root.find(f".//{{{SVG_NAMESPACE}}}g[@id='Layer_1-2']")
-    if layer_group is None:
-        return "Fatal: Main layer group 'Layer_1-2' not found.", None
-        
-    if left_params:
-        left_leaf_id_method = {'type': 'specific_d', 'd_start': "m92.66,263.59c"}
-        modify_leaf_fill(root, defs_element, layer_group, left_leaf_id_method, left_params)
-    if top_params:
-        top_leaf_id_method = {'type': 'specific_d', 'd_start': "m284.59,97c"}
-        modify_leaf_fill(root, defs_element, layer_group, top_leaf_id_method, top_params)
-    if right_params:
-        right_leaf_id_method = {'type': 'specific_d', 'd_start': "m465.83,320.23c"}
-        modify_leaf_fill(root, defs_element, layer_group, right_leaf_id_method, right_params)
-        
-    return "SVG content generated.", ET.tostring(root, encoding="unicode", method="xml")
+        raise ValueError(f"The logo template is not valid XML: {e}")
+    # Everything below reads the viewBox (PNG sizing, flag tiles, fast_raster), so it must be usable
+    view_box = template.root.get('viewBox')
+    try:
+        view_box_width, view_box_height = (float(value) for value in view_box.replace(',', ' ').split()[2:])
+    except (AttributeError, ValueError):
+        raise ValueError(f"The logo template needs a viewBox of four numbers, got {view_box!r}.")
+    if view_box_width <= 0 or view_box_height <= 0:
+        raise ValueError(f"The logo template's viewBox must have a positive width and height, got {view_box!r}.")
+
+    LOGO_TEMPLATE_SVG, LOGO_TEMPLATE, LOGO_TEXT_TEMPLATE = svg_content, template, text_template
+    LOGO_TEMPLATE_DIGEST = hashlib.sha256(svg_content.encode('utf-8')).hexdigest()
+    LOGO_VIEWBOX_WIDTH = view_box_width
+    return True
+
+def reload_country_data():
+    """
+    Re-imports country_data and rebuilds COUNTRIES in place, for a long-running process (--watch).
+    :return: The set of ISO codes whose colors changed, or that were added or removed.
+    :raises ValueError: If the new data is inconsistent; the old data stays in use.
+    """
+    import country_data
+    try:
+        country_data = importlib.reload(country_data)
+    except Exception as e:
+        raise ValueError(f"country_data.py could not be loaded: {e}")
+    changed_codes = COUNTRIES.reload(country_data.COUNTRY_COLORS, country_data.COUNTRY_CODES, aliases=country_data.COUNTRY_ALIASES)
+    CODE_TO_COUNTRY_NAME.clear()
+    CODE_TO_COUNTRY_NAME.update((country.code, country.name) for country in COUNTRIES)
+    COUNTRY_NAMES_SORTED[:] = COUNTRIES.names
+    return changed_codes
+
+def process_svg(top_params=None, right_params=None, left_params=None, warnings=None, unique_ids=False, inline_flags=False, flag_uses=None, emitter='text'):
+    """
+    Generates the final SVG content as a string.
+    :param emitter: 'text' fills the pre-serialized LOGO_TEXT_TEMPLATE; 'dom' styles a copy of the template
+                    tree with modify_leaf_fill and serializes it. Both produce the same document.
+    :param warnings: Optional list that collects non-fatal problems instead of printing them.
+    :param unique_ids: If True, gradient and pattern ids get random suffixes instead of deterministic ones.
+    :param inline_flags: If True, flag fills copy the flag's vector elements into the logo instead of
+                         embedding the flag file as a base64 <image>.
+    :param flag_uses: Optional dict that collects, per flag-filled country code, the widest size the flag
+                      is drawn at in logo units.
+    """
+    if emitter == 'text':
+        with PROFILER.stage('emit'):
+            svg_content = LOGO_TEXT_TEMPLATE.emit(top_params, right_params, left_params, warnings=warnings, unique_ids=unique_ids, inline_flags=inline_flags, flag_uses=flag_uses)
+        PROFILER.count('logos')
+        return "SVG content generated.", svg_content
+
+    with PROFILER.stage('template'):
+        root, defs_element, layer_group, leaf_elements = LOGO_TEMPLATE.instantiate()
+
+    for leaf_name, params in (('Left', left_params), ('Top', top_params), ('Right', right_params)):
+        if params:
+            leaf_id_method = {'type': 'element', 'd_start': LEAF_D_STARTS[leaf_name], 'element': leaf_elements[leaf_name]}
+            modify_leaf_fill(root, defs_element, layer_group, leaf_id_method, params, warnings=warnings, unique_ids=unique_ids, inline_flags=inline_flags, flag_uses=flag_uses)
+
+    with PROFILER.stage('serialize'):
+        svg_content = ET.tostring(root, encoding="unicode", method="xml")
+    PROFILER.count('logos')
+    return "SVG content generated.", svg_content
+
+
+# --- Output Rendering ---
+OUTPUT_FORMATS = ('svg', 'png', 'pdf')
+DEFAULT_OUTPUT_FORMATS = OUTPUT_FORMATS
+CAIRO_FORMATS = ('png', 'pdf')  # Formats drawn from the SVG by CairoSVG
+
+def parse_output_formats(value):
+    """argparse type for --formats: a comma-separated subset of OUTPUT_FORMATS, e.g. 'svg,png'."""
+    formats = [fmt.strip().lower() for fmt in value.split(',') if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+    if unknown or not formats:
+        raise argparse.ArgumentTypeError(f"invalid format list '{value}' (choose from {', '.join(OUTPUT_FORMATS)})")
+    return formats
+
+def parse_png_scales(value):
+    """
+    argparse type for --png-scales: comma-separated positive whole-number scale factors, e.g. '1,2,3'.
+    Fractional scales are rejected, as convert_assets.py and asset catalogs only know @Nx variants.
+    """
+    try:
+        scales = [int(scale) for scale in value.split(',') if scale.strip()]
+    except ValueError:
+        scales = []
+    if not scales or any(scale <= 0 for scale in scales):
+        raise argparse.ArgumentTypeError(f"invalid scale list '{value}' (expected positive whole numbers, e.g. '1,2,3')")
+    return scales
+
+def parse_shard_spec(value):
+    """argparse type for --shard: 'i/N' with 1 <= i <= N, e.g. '2/4'. Returns (i, N)."""
+    index, _, count = value.partition('/')
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        index, count = 0, 0
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"invalid shard '{value}' (expected i/N with 1 <= i <= N, e.g. '2/4')")
+    return index, count
+
+def png_scale_suffix(scale):
+    """File name suffix for a PNG scale factor, following Apple's convention: '' for 1x, '@2x' for 2x."""
+    return '' if scale == 1 else f"@{scale:g}x"
+
+def _format_available(fmt, png_engine):
+    if fmt == 'svg':
+        return True
+    if fmt == 'png' and png_engine == 'numpy' and load_fast_raster():
+        return True  # Only logos with flag fills need CairoSVG then; render_logo reports those
+    return load_cairosvg() is not None
+
+def output_formats(formats=DEFAULT_OUTPUT_FORMATS, png_engine='cairo'):
+    """The subset of `formats` that can be rendered in the current environment with the given PNG engine."""
+    return [fmt for fmt in OUTPUT_FORMATS if fmt in formats and _format_available(fmt, png_engine)]
+
+def output_labels(formats=DEFAULT_OUTPUT_FORMATS, png_scales=None, png_engine='cairo'):
+    """
+    Labels of the outputs rendered for one logo, in render order: 'svg', 'png', 'png@2x', ..., 'pdf'.
+    Each PNG scale gets its own label so every label maps to exactly one file.
+    """
+    labels = []
+    for fmt in output_formats(formats, png_engine):
+        if fmt == 'png':
+            labels.extend(f"png{png_scale_suffix(scale)}" for scale in (png_scales or (1,)))
+        else:
+            labels.append(fmt)
+    return labels
+
+def output_filename(base_name, label):
+    """File name for an output label: ('en-pl', 'svg') -> 'en-pl.svg', ('en-pl', 'png@2x') -> 'en-pl@2x.png'."""
+    fmt, _, scale = label.partition('@')
+    return f"{base_name}{'@' + scale if scale else ''}.{fmt}"
+
+def output_filenames(base_name, formats=DEFAULT_OUTPUT_FORMATS, png_scales=None, png_engine='cairo'):
+    """Names of the files generate_and_save_logo writes for `base_name` in the current environment."""
+    return [output_filename(base_name, label) for label in output_labels(formats, png_scales, png_engine)]
+
+def _snapshot_cairo_tree(tree):
+    # CairoSVG edits some nodes while drawing (e.g. a <pattern> is retagged as 'g' and an <image>
+    # loses its x/y), so a parsed tree has to be restored before it can be drawn to another surface.
+    snapshot, stack = [], [tree]
+    while stack:
+        node = stack.pop()
+        snapshot.append((node, node.tag, dict(node)))
+        stack.extend(node.children)
+    return snapshot
+
+def _restore_cairo_tree(snapshot):
+    for node, tag, attributes in snapshot:
+        node.tag = tag
+        node.clear()
+        node.update(attributes)
+
+def render_cairo_outputs(svg_content, formats=CAIRO_FORMATS, png_widths=(1200,)):
+    """
+    Parses `svg_content` into a CairoSVG tree once and draws it to a surface per requested output.
+    Yields (format, png_width, data) tuples as each surface is finished; png_width is None for PDF.
+    """
+    cairosvg = load_cairosvg()
+    with PROFILER.stage('cairo_parse'):
+        tree = cairosvg.parser.Tree(bytestring=svg_content.encode('utf-8'))
+        snapshot = _snapshot_cairo_tree(tree)
+    surfaces = [('png', width) for width in png_widths] if 'png' in formats else []
+    if 'pdf' in formats:
+        surfaces.append(('pdf', None))
+
+    for index, (fmt, width) in enumerate(surfaces):
+        with PROFILER.stage(f'render_{fmt}'):
+            if index > 0:
+                _restore_cairo_tree(snapshot)
+            output = io.BytesIO()
+            if fmt == 'png':
+                cairosvg.surface.PNGSurface(tree, output, 96, output_width=width).finish()
+            else:
+                cairosvg.surface.PDFSurface(tree, output, 96).finish()
+        yield fmt, width, output.getvalue()
+
+
+# --- Streaming API ---
+class LogoRenderError(Exception):
+    """Raised when a logo cannot be rendered, e.g. because no SVG could be generated."""
+
+
+def leaf_params_from_preset(config):
+    """
+    Builds the top/right/left leaf params from a presets.json entry.
+    Countries may be given by name, alias or ISO code in any letter case.
+    Leaves with a missing or unknown country are left out.
+    :return: A dict with 'top_params', 'right_params' and 'left_params' keys (values may be None).
+    """
+    leaf_params = {}
+    for prefix, leaf_name in (('top', 'Top'), ('right', 'Right'), ('left', 'Left')):
+        params = None
+        country = COUNTRIES.get(config.get(f'{prefix}_country'))
+        if country:
+            params = {
+                'leaf_name': leaf_name,
+                'country_code': country.code,
+                'fill_type': config.get(f'{prefix}_fill_type', 'gradient'),
+                'direction': config.get(f'{prefix}_direction', 'horizontal'),
+                'transition': config.get(f'{prefix}_transition', 20.0),
+                'zoom': config.get(f'{prefix}_zoom', 100.0),
+                'pan_x': config.get(f'{prefix}_pan_x', 0.0),
+                'pan_y': config.get(f'{prefix}_pan_y', 0.0)
+            }
+        leaf_params[f'{prefix}_params'] = params
+    return leaf_params
+
+
+PNG_ENGINES = ('cairo', 'numpy')
+
+def fast_raster_layers(top_params=None, right_params=None, left_params=None):
+    """
+    The template's shapes with the paints process_svg would give them, as fast_raster.render_png layers.
+    Only meaningful for logos without flag fills: every configured leaf is painted with its gradient.
+    """
+    params_by_leaf = {'Top': top_params, 'Right': right_params, 'Left': left_params}
+    layers = []
+    for leaf_name, d_attr, class_fill in LOGO_TEMPLATE.layers:
+        params = params_by_leaf.get(leaf_name)
+        country = COUNTRIES.by_code(params['country_code']) if params else None
+        if country and country.colors:
+            gradient = compile_gradient(country.colors, params['direction'], params.get('transition', 10))
+            coords = tuple(float(gradient.coords[name].rstrip('%')) / 100 for name in ('x1', 'y1', 'x2', 'y2'))
+            stops = tuple((float(stop['offset'].rstrip('%')) / 100, parse_hex_color(stop['style'].split(':', 1)[1]))
+                          for stop in gradient.stops)
+            layers.append((d_attr, ('gradient', coords, stops)))
+        else:
+            layers.append((d_attr, ('solid', parse_hex_color(class_fill))))
+    return layers
+
+def svg_with_flag_tiles(svg_content, flag_uses, flag_tiles, png_width):
+    """
+    Swaps each embedded flag SVG in `svg_content` (as produced without inline_flags) for a cached PNG
+    tile big enough for a `png_width` pixel wide render. The <image> keeps its size, so only the
+    pixels inside the pattern change.
+    """
+    with PROFILER.stage('flag_tiles'):
+        for country_code, logo_width in flag_uses.items():
+            flag_asset = FLAG_REGISTRY.get(country_code)
+            if flag_asset is None: continue
+            tile_uri = flag_tiles.data_uri(flag_asset, logo_width * png_width / LOGO_VIEWBOX_WIDTH)
+            svg_content = svg_content.replace(flag_asset.data_uri, tile_uri, 1)
+    return svg_content
+
+def render_logo(top_params=None, right_params=None, left_params=None, png_width=1200, formats=DEFAULT_OUTPUT_FORMATS, png_scales=None, warnings=None, unique_ids=False, inline_flags=False, flag_tiles=None, png_engine='cairo', svg_emitter='text'):
+    """
+    Renders one logo in memory, without touching the filesystem or stdout.
+    Formats that cannot be rendered in this environment (PDF, and PNG unless drawn by the numpy engine,
+    without CairoSVG) are left out.
+    Yields (label, data) tuples lazily in output_labels() order, e.g. ('svg', b'<?xml...'), ('png@2x', b'\x89PNG...').
+    :param warnings: List that collects non-fatal problems; pass one, since with None they are printed as in process_svg.
+    :param flag_tiles: Optional FlagTileCache. When given, PNGs embed pre-rasterized flag tiles instead of
+                       the flag SVGs; SVG and PDF output stay vector.
+    :param png_engine: 'numpy' draws PNGs of logos without flag fills with fast_raster instead of CairoSVG.
+    :param svg_emitter: How process_svg builds the document; see its `emitter` parameter.
+    :raises LogoRenderError: If the SVG could not be generated, or a PNG of a logo with flag fills is
+                             requested with the numpy engine and CairoSVG is not available.
+    """
+    flag_uses = {}
+    status, svg_content = process_svg(top_params=top_params, right_params=right_params, left_params=left_params, warnings=warnings, unique_ids=unique_ids, inline_flags=inline_flags, flag_uses=flag_uses, emitter=svg_emitter)
+    if not svg_content:
+        raise LogoRenderError(status)
+
+    labels = output_labels(formats, png_scales, png_engine)
+    if 'svg' in labels:
+        yield 'svg', svg_content.encode('utf-8')
+
+    cairo_formats = [fmt for fmt in CAIRO_FORMATS if fmt in output_formats(formats, png_engine)]
+    if not cairo_formats:
+        return
+    png_widths = [round(png_width * scale) for scale in (png_scales or (1,))]
+    png_labels = iter([label for label in labels if label.startswith('png')])
+
+    if png_engine == 'numpy' and not flag_uses and 'png' in cairo_formats and load_fast_raster():
+        layers = fast_raster_layers(top_params, right_params, left_params)
+        view_box = LOGO_TEMPLATE.root.get('viewBox').split()
+        for width in png_widths:
+            with PROFILER.stage('render_png_numpy'):
+                data = _fast_raster.render_png(layers, float(view_box[2]), float(view_box[3]), width)
+            yield next(png_labels), data
+        cairo_formats = [fmt for fmt in cairo_formats if fmt != 'png']
+    elif 'png' in cairo_formats and not load_cairosvg():
+        raise LogoRenderError("PNG output of logos with flag fills needs CairoSVG, which is not installed.")
+
+    if flag_tiles is not None and flag_uses and 'png' in cairo_formats:
+        tile_source = svg_content
+        if inline_flags:
+            # Tiles replace the <image> embedding, so build the document once more without inlining
+            tile_source = process_svg(top_params=top_params, right_params=right_params, left_params=left_params, warnings=[], unique_ids=unique_ids, emitter=svg_emitter)[1]
+        # Consecutive widths that land in the same tile buckets share one parse of the tiled document
+        for tiled_svg, widths in itertools.groupby(png_widths, key=lambda width: svg_with_flag_tiles(tile_source, flag_uses, flag_tiles, width)):
+            for _, _, data in render_cairo_outputs(tiled_svg, ['png'], png_widths=list(widths)):
+                yield next(png_labels), data
+        cairo_formats = [fmt for fmt in cairo_formats if fmt != 'png']
+
+    if cairo_formats:
+        for fmt, _, data in render_cairo_outputs(svg_content, cairo_formats, png_widths=png_widths):
+            yield (next(png_labels) if fmt == 'png' else fmt), data
+
+
+def iter_rendered_logos(presets, png_width=1200, formats=DEFAULT_OUTPUT_FORMATS, png_scales=None, on_error=None, on_warning=None,
+                        unique_ids=False, inline_flags=False, flag_tiles=None, png_engine='cairo', svg_emitter='text'):
+    """
+    Lazily renders an iterable of presets, one output at a time, so memory use does not grow with the
+    number of presets. Nothing is written to disk or stdout.
+    :param presets: Iterable of (preset_name, config) pairs, where config is a presets.json-style dict.
+    :param on_error: Optional callback(preset_name, exception). When given, a failing preset is reported
+                     and skipped; otherwise the exception propagates and ends the stream.
+    :param on_warning: Optional callback(preset_name, message) for non-fatal problems such as a flag
+                       falling back to a gradient.
+    The remaining keyword arguments are passed to render_logo for every preset.
+    Yields (preset_name, label, data) tuples; see render_logo for the labels.
+    """
+    for preset_name, config in presets:
+        warnings = []
+        try:
+            for label, data in render_logo(png_width=png_width, formats=formats, png_scales=png_scales, warnings=warnings,
+                                           unique_ids=unique_ids, inline_flags=inline_flags, flag_tiles=flag_tiles,
+                                           png_engine=png_engine, svg_emitter=svg_emitter, **leaf_params_from_preset(config)):
+                yield preset_name, label, data
+        except Exception as e:
+            if on_error is None: raise
+            on_error(preset_name, e)
+        finally:
+            if on_warning:
+                for message in warnings:
+                    on_warning(preset_name, message)
+
+
+# --- Render Cache Keys ---
+# Bump when a change to the styling or rendering code should invalidate previously generated files.
+RENDER_CACHE_VERSION = 5
+
+def _normalize_leaf_params(params):
+    # 42 and 42.0 in presets.json describe the same logo
+    return {key: (float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value)
+            for key, value in params.items()}
+
+def _flag_digest(country_code):
+    try:
+        flag_asset = FLAG_REGISTRY.get(country_code)
+        return flag_asset.digest if flag_asset else None
+    except Exception:
+        # Unparsable flags still need a key; hash the raw bytes that produced the gradient fallback.
+        with open(FLAG_REGISTRY.flag_path(country_code), "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+def compute_render_key(top_params=None, right_params=None, left_params=None, png_width=1200, formats=DEFAULT_OUTPUT_FORMATS, png_scales=None, unique_ids=False, inline_flags=False, flag_tile_dir=None, png_engine='cairo', svg_emitter='text'):
+    """
+    Content hash of everything that affects the generated files: the leaf params, the template,
+    the referenced flag files, the country colors, the PNG width and scales and the output formats.
+    `svg_emitter` is accepted but not hashed, since both emitters write the same bytes.
+    """
+    material = {
+        'version': RENDER_CACHE_VERSION,
+        'template': LOGO_TEMPLATE_DIGEST,
+        'png_width': png_width,
+        'png_scales': [float(scale) for scale in png_scales] if png_scales else None,
+        'formats': output_formats(formats, png_engine),
+        'unique_ids': unique_ids,
+        'inline_flags': inline_flags,
+        'flag_tiles': bool(flag_tile_dir) and 'png' in output_formats(formats, png_engine),
+        'png_engine': png_engine if 'png' in output_formats(formats, png_engine) else None,
+        'leaves': {},
+    }
+    for leaf_name, params in (('Left', left_params), ('Top', top_params), ('Right', right_params)):
+        if not params: continue
+        leaf_material = _normalize_leaf_params(params)
+        country = COUNTRIES.by_code(params['country_code'])
+        leaf_material['colors'] = list(country.colors) if country else None
+        if params['fill_type'] == 'flag-svg':
+            leaf_material['flag'] = _flag_digest(params['country_code'])
+        material['leaves'][leaf_name] = leaf_material
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode('utf-8')).hexdigest()
 
 
 # --- Centralized Argument Parser ---
@@ -276,18 +1006,130 @@ def create_argument_parser(is_cli=False):
             help="Generate logos for all entries in presets.json.\n"
                  "The --output argument will be used as the destination directory."
         )
+        parser.add_argument(
+            '--matrix',
+            default=None,
+            help="For --generate-all: Expand the language matrix in this JSON spec into pairs\n"
+                 "instead of reading presets.json (see pair_matrix.py for the format)."
+        )
         parser.add_argument(
             '--png-width',
             type=int,
             default=600,
             help="Width of the output PNG file in pixels. Default is 600."
         )
+        parser.add_argument(
+            '--png-scales',
+            type=parse_png_scales,
+            default=None,
+            help="Comma-separated whole-number PNG scale factors relative to --png-width, e.g. '1,2,3'.\n"
+                 "Writes name.png, name@2x.png and name@3x.png from a single parse of the SVG."
+        )
+        parser.add_argument(
+            '--formats',
+            type=parse_output_formats,
+            default=list(DEFAULT_OUTPUT_FORMATS),
+            help="Comma-separated output formats to write (svg, png, pdf). Default is 'svg,png,pdf'.\n"
+                 "PNG and PDF are drawn from a single parse of the styled SVG."
+        )
+        parser.add_argument(
+            '-j', '--jobs',
+            type=int,
+            default=1,
+            help="Number of worker processes for --generate-all. Default is 1 (serial).\n"
+                 "Use 0 to start one worker per CPU core. With --watch, only the initial pass uses workers."
+        )
+        parser.add_argument(
+            '--unique-ids',
+            action='store_true',
+            help="Give gradient and pattern ids random suffixes. By default ids are derived from\n"
+                 "the leaf params, so regenerating an unchanged logo gives byte-identical files."
+        )
+        parser.add_argument(
+            '--inline-flags',
+            action='store_true',
+            help="Copy each flag's vector elements into the logo instead of embedding the flag\n"
+                 "file as a base64 <image>. Smaller files that rasterize faster."
+        )
+        parser.add_argument(
+            '--flag-tile-cache',
+            default=None,
+            metavar='DIR',
+            help="For PNG output: Rasterize each flag once per size bucket, keep the tiles in DIR\n"
+                 "(and in memory) and embed those bitmaps instead of the flag SVGs. SVG and PDF\n"
+                 "output stay vector. The directory is shared between runs and trimmed to 256 MB."
+        )
+        parser.add_argument(
+            '--png-engine',
+            choices=PNG_ENGINES,
+            default='cairo',
+            help="Rasterizer for PNG output. 'numpy' draws logos that use only gradient fills\n"
+                 "directly from the template geometry (no SVG round trip); logos with flag\n"
+                 "fills still go through CairoSVG, so PNGs of gradient-only logos need only NumPy.\n"
+                 "Default is 'cairo'."
+        )
+        parser.add_argument(
+            '--svg-emitter',
+            choices=SVG_EMITTERS,
+            default='text',
+            help="How the SVG is built. 'text' fills a pre-serialized copy of the template;\n"
+                 "'dom' styles an ElementTree copy and serializes it. Both give identical files.\n"
+                 "Default is 'text'."
+        )
+        parser.add_argument(
+            '--profile',
+            action='store_true',
+            help="Print a per-stage timing breakdown (template, flag loading, gradients,\n"
+                 "serialization, PNG/PDF rendering, file writes) after generation."
+        )
+        parser.add_argument(
+            '--profile-output',
+            default=None,
+            help="With --profile: Also write the breakdown as JSON lines to this file,\n"
+                 "one record per preset followed by a 'total' record."
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="For --generate-all: Re-render every preset, even those whose outputs are\n"
+                 "up to date according to the render manifest in the output directory."
+        )
+        parser.add_argument(
+            '--shard',
+            type=parse_shard_spec,
+            default=None,
+            help="For --generate-all: Render only shard i of N, e.g. '2/4'. Presets are split by a\n"
+                 "hash of their name, so every machine given the same N gets a disjoint share."
+        )
+        parser.add_argument(
+            '--merge-shards',
+            nargs='+',
+            default=None,
+            metavar='SHARD_DIR',
+            help="Copy the outputs of finished --shard runs into the --output directory and\n"
+                 "combine their render manifests. Renders nothing itself."
+        )
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help="For --generate-all: After bringing the outputs up to date, keep running and\n"
+                 "re-render only the presets affected by edits to presets.json (or the --matrix\n"
+                 "spec), flags/, country_data.py or the logo template. Stop with Ctrl+C."
+        )
+        parser.add_argument(
+            '--watch-debounce',
+            type=float,
+            default=0.5,
+            metavar='SECONDS',
+            help="For --watch: Wait until files have been quiet this long before re-rendering.\n"
+                 "Default is 0.5."
+        )
 
     # --- Leaf Arguments Groups ---
     leaf_groups = {'left': 'Left', 'top': 'Top', 'right': 'Right'}
     for prefix, title in leaf_groups.items():
         group = parser.add_argument_group(f'{title} Leaf Options')
-        group.add_argument(f'--{prefix}-country', type=str, help=f'Name of the country for the {prefix} leaf.')
+        group.add_argument(f'--{prefix}-country', type=str, help=f'Country for the {prefix} leaf: name, alias or ISO code (case-insensitive).')
         group.add_argument(f'--{prefix}-fill-type', choices=['gradient', 'flag-svg'], default='gradient', help=f'Fill type for the {prefix} leaf.')
         group.add_argument(f'--{prefix}-direction', choices=['horizontal', 'vertical'], default='horizontal', help='Direction for gradient fill.')
         group.add_argument(f'--{prefix}-transition', type=float, default=20.0, help='Transition softness for gradient (1-99).')
@@ -298,36 +1140,52 @@ def create_argument_parser(is_cli=False):
     return parser
 
 
-def generate_and_save_logo(output_path, top_params=None, right_params=None, left_params=None, png_width=1200):
-    """Generates the SVG, saves it, and saves PNG and PDF versions."""
-    print("Generating SVG content...")
-    status, svg_content = process_svg(top_params=top_params, right_params=right_params, left_params=left_params)
-
-    if not svg_content:
-        print(f"Error: Could not generate SVG. Reason: {status}")
-        return
-
+def generate_and_save_logo(output_path, top_params=None, right_params=None, left_params=None, png_width=1200, formats=DEFAULT_OUTPUT_FORMATS, png_scales=None, unique_ids=False, inline_flags=False, flag_tile_dir=None, png_engine='cairo', svg_emitter='text'):
+    """
+    Generates the SVG and saves it along with PNG and PDF versions, limited to `formats`.
+    With `png_scales`, one PNG is written per scale factor (name.png, name@2x.png, ...).
+    With `flag_tile_dir`, PNGs use flag tiles rasterized once and cached in that directory.
+    :return: A (success, message) tuple describing the outcome.
+    """
     base_path, _ = os.path.splitext(output_path)
-    svg_filepath = f"{base_path}.svg"
-    png_filepath = f"{base_path}.png"
-    pdf_filepath = f"{base_path}.pdf"
+    available_formats = output_formats(formats, png_engine)
+    skipped_formats = [fmt for fmt in CAIRO_FORMATS if fmt in formats and fmt not in available_formats]
+    cairosvg = load_cairosvg() if any(fmt in formats for fmt in CAIRO_FORMATS) else None
+    for message in pop_dependency_messages():
+        print(message)
 
-    try:
-        os.makedirs(os.path.dirname(svg_filepath), exist_ok=True)
-        with open(svg_filepath, "w", encoding="utf-8") as f:
-            f.write(svg_content)
-        print(f"Successfully saved: {svg_filepath}")
-
-        if cairosvg:
-            print(f"Generating PNG (width: {png_width}px)...")
-            cairosvg.svg2png(bytestring=svg_content.encode('utf-8'), write_to=png_filepath, output_width=png_width)
-            print(f"Successfully saved: {png_filepath}")
-
-            print("Generating PDF...")
-            cairosvg.svg2pdf(bytestring=svg_content.encode('utf-8'), write_to=pdf_filepath)
-            print(f"Successfully saved: {pdf_filepath}")
-        else:
-            print("Skipping PNG and PDF generation: CairoSVG not found.")
+    print("Generating SVG content...")
+    if 'png' in available_formats:
+        png_widths = [round(png_width * scale) for scale in (png_scales or (1,))]
+        width_label = ', '.join(f"{width}px" for width in png_widths)
+        print(f"Generating PNG ({'widths' if len(png_widths) > 1 else 'width'}: {width_label})...")
 
+    warnings = []
+    try:
+        os.makedirs(os.path.dirname(base_path) or '.', exist_ok=True)
+        outputs = render_logo(top_params=top_params, right_params=right_params, left_params=left_params,
+                              png_width=png_width, formats=formats, png_scales=png_scales, warnings=warnings, unique_ids=unique_ids, inline_flags=inline_flags,
+                              flag_tiles=get_flag_tile_cache(flag_tile_dir) if flag_tile_dir and cairosvg else None, png_engine=png_engine, svg_emitter=svg_emitter)
+        for label, data in outputs:
+            for message in warnings:
+                print(f"Warning: {message}")
+            warnings.clear()
+            filepath = output_filename(base_path, label)
+            with PROFILER.stage('write'):
+                with open(filepath, "wb") as f:
+                    f.write(data)
+            PROFILER.count('bytes_written', len(data))
+            print(f"Successfully saved: {filepath}")
+        for message in warnings:
+            print(f"Warning: {message}")
+    except LogoRenderError as e:
+        print(f"Error: Could not render the logo. Reason: {e}")
+        return False, str(e)
     except Exception as e:
-        print(f"An error occurred while saving files: {e}")
\ No newline at end of file
+        print(f"An error occurred while saving files: {e}")
+        return False, str(e)
+
+    if skipped_formats:
+        print(f"Skipping {' and '.join(fmt.upper() for fmt in skipped_formats)} generation: CairoSVG not found.")
+
+    return True, f"Saved {base_path}."
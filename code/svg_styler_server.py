@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# svg_styler_server.py
+
+import asyncio
+import argparse
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qsl
+
+from svg_styler_core import (
+    create_argument_parser, render_logo, compute_render_key, leaf_params_from_preset,
+    output_formats, png_scale_suffix, COUNTRIES, FLAG_REGISTRY, OUTPUT_FORMATS
+)
+
+CONTENT_TYPES = {'svg': 'image/svg+xml', 'png': 'image/png', 'pdf': 'application/pdf'}
+MAX_REQUEST_LINE = 8192
+MAX_PNG_WIDTH = 8192
+
+
+class BadRequest(Exception):
+    """Raised for a request that cannot be served; carries the HTTP status to answer with."""
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _raise_bad_request(message):
+    raise BadRequest(message)
+
+
+def _worker_init():
+    FLAG_REGISTRY.preload()
+
+
+def render_output(leaf_params, fmt, png_width, scale):
+    """Worker entry point: renders a single output format and returns its bytes."""
+    png_scales = [scale] if fmt == 'png' else None
+    for _, data in render_logo(png_width=png_width, formats=[fmt], png_scales=png_scales, **leaf_params):
+        return data
+    return None
+
+
+def parse_logo_query(query_pairs, presets):
+    """
+    Turns query parameters into leaf params using the same options as the CLI, e.g.
+    ?preset=pl-en or ?top-country=Poland&top-fill-type=gradient&top-direction=vertical.
+    :param presets: The presets.json contents as a dict, used to resolve ?preset=.
+    :return: A (leaf_params, png_width, scale) tuple.
+    """
+    argv, png_width, scale = [], 600, 1.0
+    for key, value in query_pairs:
+        key = key.replace('_', '-')
+        try:
+            if key == 'png-width':
+                png_width = int(value)
+                continue
+            if key == 'scale':
+                scale = float(value)
+                continue
+        except ValueError:
+            raise BadRequest(f"Invalid value for '{key}': {value}")
+        if key in ('h', 'help'):
+            raise BadRequest("Unsupported query parameter: help.")
+        argv.extend([f"--{key}", value])
+    if not 0 < png_width <= MAX_PNG_WIDTH or not 0 < scale or png_width * scale > MAX_PNG_WIDTH:
+        raise BadRequest(f"PNG size out of range (at most {MAX_PNG_WIDTH}px wide).")
+
+    # A fresh parser per request, since presets are applied through set_defaults
+    parser = create_argument_parser(is_cli=False)
+    parser.error = _raise_bad_request
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit:
+        raise BadRequest("Unsupported query parameter.")
+    if args.preset:
+        preset_config = presets.get(args.preset)
+        if not preset_config:
+            raise BadRequest(f"Preset '{args.preset}' not found.", status=404)
+        parser.set_defaults(**preset_config)
+        args = parser.parse_args(argv)
+
+    for prefix in ('top', 'right', 'left'):
+        country = getattr(args, f'{prefix}_country')
+        if country and country not in COUNTRIES:
+            raise BadRequest(f"'{country}' is not a valid country name.")
+    leaf_params = leaf_params_from_preset(vars(args))
+    if not any(leaf_params.values()):
+        raise BadRequest("At least one leaf must be configured. Use a preset or specify a country (e.g., top-country).")
+    return leaf_params, png_width, scale
+
+
+async def read_line(reader, too_long):
+    """
+    Reads one line, or what is left before EOF. `reader` must be created with limit=MAX_REQUEST_LINE;
+    a line that does not end within that many bytes raises `too_long`.
+    """
+    try:
+        return await reader.readuntil(b'\n')
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError:
+        raise too_long
+
+
+class LogoServer:
+    """
+    Serves GET /logo.svg, /logo.png and /logo.pdf. The template, flag registry and country tables stay
+    loaded for the life of the process, and rasterization runs in a process pool so the event loop stays free.
+    """
+    def __init__(self, workers=None, max_age=86400, response_cache_size=256, presets_path='presets.json'):
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_worker_init)
+        self.max_age = max_age
+        self.response_cache_size = response_cache_size
+        self.presets_path = presets_path
+        self._responses = OrderedDict()
+        self._presets = {}
+        self._presets_stat = None
+
+    def presets(self):
+        """
+        The parsed presets file. It is read again only when its mtime or size changes, like flags in the
+        FlagRegistry; a missing or unparsable file serves no presets.
+        """
+        try:
+            stat = os.stat(self.presets_path)
+        except OSError:
+            self._presets, self._presets_stat = {}, None
+            return self._presets
+        if self._presets_stat != (stat.st_mtime_ns, stat.st_size):
+            try:
+                with open(self.presets_path, 'r') as f:
+                    presets = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                presets = {}
+            self._presets = presets if isinstance(presets, dict) else {}
+            self._presets_stat = (stat.st_mtime_ns, stat.st_size)
+        return self._presets
+
+    async def handle_connection(self, reader, writer):
+        method = None  # Stays None until the request line is parsed
+        try:
+            request_line = await read_line(reader, BadRequest("Request line too long.", status=414))
+            headers = {}
+            while True:
+                line = await read_line(reader, BadRequest("Request header field too long.", status=431))
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            parts = request_line.decode('latin-1').split()
+            if len(parts) != 3:
+                raise BadRequest("Malformed request line.")
+            method, target, _ = parts
+            if method not in ('GET', 'HEAD'):
+                raise BadRequest(f"Method {method} not allowed.", status=405)
+            status, response_headers, body = await self.dispatch(target, headers)
+        except BadRequest as e:
+            status, response_headers, body = e.status, {'Content-Type': 'text/plain; charset=utf-8'}, f"{e}\n".encode('utf-8')
+        except Exception as e:
+            status, response_headers, body = 500, {'Content-Type': 'text/plain; charset=utf-8'}, f"Internal error: {e}\n".encode('utf-8')
+
+        # A HEAD response never carries a body, errors included, but still reports the length a GET would get
+        await self.send(writer, status, response_headers, b'' if method == 'HEAD' else body, len(body))
+
+    async def dispatch(self, target, headers):
+        url = urlsplit(target)
+        if url.path == '/healthz':
+            return 200, {'Content-Type': 'text/plain; charset=utf-8', 'Cache-Control': 'no-store'}, b"ok\n"
+
+        base, _, fmt = url.path.rpartition('.')
+        if base != '/logo' or fmt not in OUTPUT_FORMATS:
+            raise BadRequest(f"Not found: {url.path} (try /logo.svg, /logo.png or /logo.pdf)", status=404)
+        if fmt not in output_formats([fmt]):
+            raise BadRequest(f"{fmt.upper()} output is unavailable: CairoSVG not found.", status=503)
+
+        leaf_params, png_width, scale = parse_logo_query(parse_qsl(url.query), self.presets())
+        # The render key covers template, flags, colors and params, so it doubles as a strong ETag.
+        # Only PNGs depend on the width and scale; leaving them out keeps one ETag per SVG or PDF.
+        if fmt == 'png':
+            render_key = compute_render_key(png_width=png_width, formats=[fmt], png_scales=[scale], **leaf_params)
+        else:
+            render_key = compute_render_key(png_width=None, formats=[fmt], **leaf_params)
+        label = f"{fmt}{png_scale_suffix(scale)}" if fmt == 'png' else fmt
+        etag = f'"{render_key[:40]}-{label}"'
+        response_headers = {
+            'ETag': etag,
+            'Cache-Control': f"public, max-age={self.max_age}",
+            'Content-Type': CONTENT_TYPES[fmt],
+        }
+        if etag in [tag.strip() for tag in headers.get('if-none-match', '').split(',')]:
+            return 304, response_headers, b''
+
+        body = self._responses.get(etag)
+        if body is None:
+            loop = asyncio.get_running_loop()
+            body = await loop.run_in_executor(self.executor, render_output, leaf_params, fmt, png_width, scale)
+            if body is None:
+                raise BadRequest(f"{fmt.upper()} output could not be rendered.", status=503)
+            self._responses[etag] = body
+            while len(self._responses) > self.response_cache_size:
+                self._responses.popitem(last=False)
+        else:
+            self._responses.move_to_end(etag)
+        return 200, response_headers, body
+
+    async def send(self, writer, status, headers, body, content_length):
+        reasons = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                   414: 'URI Too Long', 431: 'Request Header Fields Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+        lines = [f"HTTP/1.1 {status} {reasons.get(status, '')}"]
+        headers = dict(headers, **{'Connection': 'close'})
+        if status != 304:
+            headers['Content-Length'] = str(content_length)
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        try:
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+async def serve(host, port, workers, max_age):
+    FLAG_REGISTRY.preload()
+    logo_server = LogoServer(workers=workers, max_age=max_age)
+    server = await asyncio.start_server(logo_server.handle_connection, host, port, limit=MAX_REQUEST_LINE)
+    print(f"Serving logos on http://{host}:{port}/logo.svg (workers: {workers or os.cpu_count()})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        logo_server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serves styled logos over HTTP.\n"
+                    "Example: GET /logo.png?preset=pl-en&png-width=600&scale=2",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to listen on. Default is 127.0.0.1.")
+    parser.add_argument('--port', type=int, default=8080, help="Port to listen on. Default is 8080.")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Rendering worker processes. Default is one per CPU core.")
+    parser.add_argument('--max-age', type=int, default=86400, help="Cache-Control max-age in seconds. Default is 86400.")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_age))
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# watch_mode.py
+"""
+Support for `--generate-all --watch`: a dependency graph from presets to the inputs their logos are built
+from, and a polling file watcher. Files are compared by mtime and size, so no file system notification
+package is needed.
+"""
+
+import os
+import glob
+import json
+import time
+from collections import defaultdict
+
+POLL_INTERVAL_SECONDS = 0.25
+DEFAULT_DEBOUNCE_SECONDS = 0.5
+TEMPLATE_DEPENDENCY = ('template',)
+
+
+def preset_dependencies(leaf_params):
+    """
+    The inputs a preset's render key is built from, besides its own entry: the logo template, the colors
+    of every leaf country and the flag file of every 'flag-svg' leaf.
+    :param leaf_params: The dict returned by leaf_params_from_preset.
+    """
+    dependencies = {TEMPLATE_DEPENDENCY}
+    for params in leaf_params.values():
+        if not params: continue
+        dependencies.add(('colors', params['country_code']))
+        if params['fill_type'] == 'flag-svg':
+            dependencies.add(('flag', params['country_code']))
+    return dependencies
+
+
+class DependencyGraph:
+    """
+    Maps presets to the inputs they depend on and back. Each preset also keeps a signature of its resolved
+    leaf params, so a reloaded preset list can be compared entry by entry.
+    """
+    def __init__(self):
+        self.dependencies = {}
+        self.dependents = defaultdict(set)
+        self.signatures = {}
+
+    def __len__(self):
+        return len(self.dependencies)
+
+    def set_preset(self, preset_name, leaf_params):
+        """Adds or updates a preset. Returns True if it is new or its resolved leaf params changed."""
+        signature = json.dumps(leaf_params, sort_keys=True)
+        changed = self.signatures.get(preset_name) != signature
+        self.remove_preset(preset_name)
+        self.signatures[preset_name] = signature
+        self.dependencies[preset_name] = preset_dependencies(leaf_params)
+        for dependency in self.dependencies[preset_name]:
+            self.dependents[dependency].add(preset_name)
+        return changed
+
+    def remove_preset(self, preset_name):
+        self.signatures.pop(preset_name, None)
+        for dependency in self.dependencies.pop(preset_name, ()):
+            self.dependents[dependency].discard(preset_name)
+
+    def update_presets(self, presets):
+        """
+        Replaces the preset list with `presets`, an iterable of (preset_name, leaf_params) pairs.
+        :return: A (changed, removed) pair of sets of preset names; changed includes new presets.
+        """
+        changed, seen = set(), set()
+        for preset_name, leaf_params in presets:
+            seen.add(preset_name)
+            if self.set_preset(preset_name, leaf_params):
+                changed.add(preset_name)
+        removed = set(self.dependencies) - seen
+        for preset_name in removed:
+            self.remove_preset(preset_name)
+        return changed, removed
+
+    def affected(self, dependencies):
+        """The presets that depend on any of `dependencies`."""
+        presets = set()
+        for dependency in dependencies:
+            presets |= self.dependents.get(dependency, set())
+        return presets
+
+
+class FileWatcher:
+    """
+    Polls a fixed set of files, plus every file matching `pattern` in a set of directories, for files
+    that appear, disappear or change size or mtime.
+    """
+    def __init__(self, files=(), directories=(), pattern='*.svg'):
+        self.files = list(files)
+        self.directories = list(directories)
+        self.pattern = pattern
+        self._state = self.scan()
+
+    def scan(self):
+        paths = list(self.files)
+        for directory in self.directories:
+            paths.extend(glob.glob(os.path.join(directory, self.pattern)))
+        state = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                state[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                state[path] = None
+        return state
+
+    def changes(self):
+        """The paths that changed since the previous call (or since the watcher was created)."""
+        state = self.scan()
+        changed = {path for path in state.keys() | self._state.keys() if state.get(path) != self._state.get(path)}
+        self._state = state
+        return changed
+
+    def wait_for_changes(self, debounce=DEFAULT_DEBOUNCE_SECONDS, poll_interval=POLL_INTERVAL_SECONDS):
+        """
+        Blocks until something changes, then until nothing has changed for `debounce` seconds, so an editor
+        saving several files (or writing one in several steps) triggers a single batch.
+        :return: The set of paths that changed.
+        """
+        changed = set()
+        while not changed:
+            time.sleep(poll_interval)
+            changed = self.changes()
+        quiet_since = time.monotonic()
+        while time.monotonic() - quiet_since < debounce:
+            time.sleep(min(poll_interval, debounce))
+            more = self.changes()
+            if more:
+                changed |= more
+                quiet_since = time.monotonic()
+        return changed
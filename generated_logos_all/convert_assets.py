@@ -3,6 +3,10 @@ import shutil
 import json
 import re
 import argparse
+import hashlib
+import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # JSON template for raster images (e.g., PNG)
 CONTENTS_JSON_RASTER = {
@@ -35,31 +39,253 @@ CONTENTS_JSON_VECTOR = {
   }
 }
 
-def create_imageset(base_name, source_file_path, is_vector, output_dir, verbose=False):
+# PNG scale variants written by `svg_styler_cli.py --png-scales`: en-pl.png, en-pl@2x.png, en-pl@3x.png
+PNG_SCALES = (1, 2, 3)
+SCALE_SUFFIX_PATTERN = re.compile(r'@[0-9]+x$')
+
+def png_scale_suffix(scale):
+    return '' if scale == 1 else f"@{scale}x"
+
+def find_png_variants(source_dir, base_name, source_files=None):
+    """
+    Returns a {scale: path} dict of the PNG scale variants that exist for `base_name`.
+    :param source_files: Optional set of file names in `source_dir`, to avoid a stat per candidate.
+    """
+    variants = {}
+    for scale in PNG_SCALES:
+        png_filename = f"{base_name}{png_scale_suffix(scale)}.png"
+        png_path = os.path.join(source_dir, png_filename)
+        if (png_filename in source_files) if source_files is not None else os.path.exists(png_path):
+            variants[scale] = png_path
+    return variants
+
+class AssetSyncer:
+    """
+    Brings imageset files up to date without rewriting what is already current. A copied file keeps its
+    source's mtime, so an unchanged file is recognised by size and mtime (or by SHA-256 with `checksum`).
+    Copies and links run on a thread pool; call finish() to wait for them. Safe to share between threads.
+    """
+    def __init__(self, link=False, checksum=False, threads=8):
+        self.link = link
+        self.checksum = checksum
+        self.executor = ThreadPoolExecutor(max_workers=threads) if threads > 1 else None
+        self.futures = []
+        self.stats = {'copied': 0, 'linked': 0, 'unchanged': 0, 'json_written': 0, 'json_unchanged': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    @staticmethod
+    def _sha256(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def is_current(self, source_path, dest_path):
+        try:
+            source_stat, dest_stat = os.stat(source_path), os.stat(dest_path)
+        except FileNotFoundError:
+            return False
+        if os.path.samestat(source_stat, dest_stat):
+            return True  # Hardlinked by an earlier --link run
+        if source_stat.st_size != dest_stat.st_size:
+            return False
+        if self.checksum:
+            return self._sha256(source_path) == self._sha256(dest_path)
+        return source_stat.st_mtime_ns == dest_stat.st_mtime_ns
+
+    def _sync_file(self, source_path, dest_path):
+        if self.is_current(source_path, dest_path):
+            self._count('unchanged')
+            return
+        if self.link:
+            try:
+                # Replace via a temporary name so a failed link never leaves the imageset without the file
+                tmp_path = f"{dest_path}.tmp-link"
+                if os.path.lexists(tmp_path): os.remove(tmp_path)
+                os.link(source_path, tmp_path)
+                os.replace(tmp_path, dest_path)
+                self._count('linked')
+                return
+            except OSError:
+                pass  # e.g. source and output on different filesystems; fall back to copying
+        if os.path.lexists(dest_path):
+            os.remove(dest_path)  # Never write through an existing hardlink into the source file
+        shutil.copy2(source_path, dest_path)
+        self._count('copied')
+
+    def sync_file(self, source_path, dest_path):
+        """Copies (or hardlinks) `source_path` to `dest_path` unless the destination is already current."""
+        if self.executor is None:
+            self._sync_file(source_path, dest_path)
+        else:
+            future = self.executor.submit(self._sync_file, source_path, dest_path)
+            with self._lock:
+                self.futures.append(future)
+
+    def write_json(self, json_path, json_content):
+        """Writes a Contents.json only if its text would change, so Xcode sees no churn."""
+        text = json.dumps(json_content, indent=2)
+        try:
+            with open(json_path, 'r') as f:
+                if f.read() == text:
+                    self._count('json_unchanged')
+                    return
+        except FileNotFoundError:
+            pass
+        with open(json_path, 'w') as f:
+            f.write(text)
+        self._count('json_written')
+
+    def finish(self):
+        """Waits for pending copies and re-raises the first error."""
+        futures, self.futures = self.futures, []
+        for future in futures:
+            future.result()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+def remove_unexpected_files(imageset_full_path, expected_filenames):
+    """Deletes files left in an imageset by an earlier run, e.g. an @3x PNG that no longer exists."""
+    for filename in os.listdir(imageset_full_path):
+        if filename not in expected_filenames and filename != "Contents.json":
+            path = os.path.join(imageset_full_path, filename)
+            if os.path.isfile(path) or os.path.islink(path):
+                os.remove(path)
+
+def make_contents_json(images, is_vector):
+    """
+    Builds a new Contents.json dict from the raster or vector template for the given image entries.
+    The templates themselves are never modified, so imagesets can be built concurrently.
+    """
+    json_content = copy.deepcopy(CONTENTS_JSON_VECTOR if is_vector else CONTENTS_JSON_RASTER)
+    json_content["images"] = images
+    return json_content
+
+def create_imageset(base_name, source_file_path, is_vector, output_dir, verbose=False, syncer=None, log=print):
     """
     Creates an .imageset directory, copies the source file, and writes Contents.json.
+    Files and a Contents.json that are already up to date are left untouched.
     """
+    syncer = syncer or AssetSyncer(threads=1)
     imageset_full_path = os.path.join(output_dir, f"{base_name}.imageset")
     source_filename = os.path.basename(source_file_path)
 
     # Create the .imageset directory
     os.makedirs(imageset_full_path, exist_ok=True)
+    remove_unexpected_files(imageset_full_path, {source_filename})
 
     # Copy the source file into the new directory
-    shutil.copy(source_file_path, os.path.join(imageset_full_path, source_filename))
+    syncer.sync_file(source_file_path, os.path.join(imageset_full_path, source_filename))
 
-    # Select and configure the correct JSON template
-    json_content = CONTENTS_JSON_VECTOR if is_vector else CONTENTS_JSON_RASTER
-    json_content["images"][0]["filename"] = source_filename
+    # Build the Contents.json from a fresh copy of the correct template
+    json_content = make_contents_json([{"idiom": "universal", "filename": source_filename}], is_vector)
 
     # Write the Contents.json file
     json_path = os.path.join(imageset_full_path, "Contents.json")
-    with open(json_path, 'w') as f:
-        json.dump(json_content, f, indent=2)
+    syncer.write_json(json_path, json_content)
     
     if verbose:
         asset_type = "Vector" if is_vector else "Raster"
-        print(f"  -> Created {asset_type} Asset: {os.path.relpath(imageset_full_path)} from {source_filename}")
+        log(f"  -> Created {asset_type} Asset: {os.path.relpath(imageset_full_path)} from {source_filename}")
+
+def create_scaled_imageset(base_name, scaled_sources, output_dir, verbose=False, syncer=None, log=print):
+    """
+    Creates a raster .imageset holding one PNG per scale and writes a Contents.json listing each of them.
+    :param scaled_sources: A {scale: source_file_path} dict, e.g. {1: 'en-pl.png', 2: 'en-pl@2x.png'}.
+    """
+    syncer = syncer or AssetSyncer(threads=1)
+    imageset_full_path = os.path.join(output_dir, f"{base_name}.imageset")
+    os.makedirs(imageset_full_path, exist_ok=True)
+    remove_unexpected_files(imageset_full_path, {os.path.basename(path) for path in scaled_sources.values()})
+
+    images = []
+    for scale in sorted(scaled_sources):
+        source_filename = os.path.basename(scaled_sources[scale])
+        syncer.sync_file(scaled_sources[scale], os.path.join(imageset_full_path, source_filename))
+        images.append({"idiom": "universal", "filename": source_filename, "scale": f"{scale}x"})
+
+    json_content = make_contents_json(images, is_vector=False)
+    json_path = os.path.join(imageset_full_path, "Contents.json")
+    syncer.write_json(json_path, json_content)
+
+    if verbose:
+        scales = ", ".join(image["scale"] for image in images)
+        log(f"  -> Created Raster Asset: {os.path.relpath(imageset_full_path)} with scales {scales}")
+
+def create_raster_imageset(base_name, png_variants, output_dir, verbose=False, syncer=None, log=print):
+    """Creates a single-image raster set for a lone PNG, or a multi-scale set when @2x/@3x variants exist."""
+    if list(png_variants) == [1]:
+        create_imageset(base_name, png_variants[1], is_vector=False, output_dir=output_dir, verbose=verbose, syncer=syncer, log=log)
+    else:
+        create_scaled_imageset(base_name, png_variants, output_dir, verbose=verbose, syncer=syncer, log=log)
+
+def convert_pair(base_name, source_dir, source_files, output_dir, raster_suffix='-raster', verbose=False, syncer=None):
+    """
+    Creates the imagesets for one language pair. Touches only that pair's imagesets, so several pairs can
+    be converted at once from different threads.
+    :param source_files: The set of file names in `source_dir`.
+    :return: A (imageset_names, log_lines) tuple; the log is returned rather than printed so that
+             concurrent runs can print it in a stable order.
+    """
+    log_lines = [f"\nProcessing pair: '{base_name}'"]
+    log = log_lines.append
+    imageset_names = []
+
+    # Check for all possible asset types for this pair
+    svg_path = os.path.join(source_dir, f"{base_name}.svg")
+    pdf_path = os.path.join(source_dir, f"{base_name}.pdf")
+    png_variants = find_png_variants(source_dir, base_name, source_files)
+
+    has_svg = f"{base_name}.svg" in source_files
+    has_pdf = f"{base_name}.pdf" in source_files
+    has_png = bool(png_variants)
+    has_vector = has_svg or has_pdf
+
+    # --- Decision Logic ---
+    if has_vector:
+        # 1. A vector asset exists. Create the primary .imageset from it.
+        # Prioritize SVG over PDF.
+        vector_source_path = svg_path if has_svg else pdf_path
+        create_imageset(base_name, vector_source_path, is_vector=True, output_dir=output_dir, verbose=verbose, syncer=syncer, log=log)
+        imageset_names.append(base_name)
+
+        # 2. If a PNG also exists, create a separate, suffixed raster set.
+        if has_png:
+            raster_imageset_name = f"{base_name}{raster_suffix}"
+            create_raster_imageset(raster_imageset_name, png_variants, output_dir=output_dir, verbose=verbose, syncer=syncer, log=log)
+            imageset_names.append(raster_imageset_name)
+
+    elif has_png:
+        # 3. No vector, but a PNG exists. Create the primary .imageset from the PNG.
+        # It is NOT given the raster suffix in this case.
+        create_raster_imageset(base_name, png_variants, output_dir=output_dir, verbose=verbose, syncer=syncer, log=log)
+        imageset_names.append(base_name)
+
+    else:
+        if verbose:
+            log(f"  -> No assets (.svg, .pdf, .png) found for '{base_name}', skipping.")
+
+    return imageset_names, log_lines
+
+def remove_stale_imagesets(output_dir, expected_imagesets, verbose=False):
+    """
+    Deletes .imageset directories in `output_dir` that this run did not produce, i.e. pairs whose
+    source files were removed. Other files in the output directory are left alone.
+    :return: The list of removed imageset names.
+    """
+    removed = []
+    for entry in sorted(os.listdir(output_dir)):
+        if entry.endswith(".imageset") and entry not in expected_imagesets and os.path.isdir(os.path.join(output_dir, entry)):
+            shutil.rmtree(os.path.join(output_dir, entry))
+            removed.append(entry)
+            if verbose:
+                print(f"  -> Removed stale asset: {entry}")
+    return removed
 
 def main():
     """
@@ -89,6 +315,35 @@ def main():
         action='store_true',
         help="Delete the output directory before generating new assets. Use with caution."
     )
+    parser.add_argument(
+        "--link",
+        action='store_true',
+        help="Hardlink files into the imagesets instead of copying them, where the filesystem allows.\n"
+             "Falls back to copying across filesystems. Edits to linked files also change the sources."
+    )
+    parser.add_argument(
+        "--checksum",
+        action='store_true',
+        help="Compare files by SHA-256 instead of size and modification time when deciding what to update."
+    )
+    parser.add_argument(
+        "--prune",
+        action='store_true',
+        help="Delete .imageset folders whose source files no longer exist. Skipped when the source\n"
+             "directory has no language-pair files, so a wrong --source cannot empty the catalog."
+    )
+    parser.add_argument(
+        "--copy-threads",
+        type=int,
+        default=8,
+        help="Number of threads used to copy or link files. (default: 8)"
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="Number of language pairs to convert concurrently. Output matches a serial run. (default: 1)"
+    )
     parser.add_argument(
         "-v", "--verbose",
         action='store_true',
@@ -119,46 +374,44 @@ def main():
     # --- Processing Logic ---
     lang_pair_pattern = re.compile(r'^([a-z]{2,3}-[a-z]{2,3})$')
     processed_pairs = set()
+    # One directory scan answers every "does this file exist" question below
+    source_files = {entry.name for entry in os.scandir(source_dir) if entry.is_file()}
+    syncer = AssetSyncer(link=args.link, checksum=args.checksum, threads=args.copy_threads)
+    expected_imagesets = set()
 
-    for filename in sorted(os.listdir(source_dir)):
+    pair_names = []
+    for filename in sorted(source_files):
         base_name, _ = os.path.splitext(filename)
-        
+        base_name = SCALE_SUFFIX_PATTERN.sub('', base_name)
         if lang_pair_pattern.match(base_name) and base_name not in processed_pairs:
-            print(f"\nProcessing pair: '{base_name}'")
-            
-            # Check for all possible asset types for this pair
-            svg_path = os.path.join(source_dir, f"{base_name}.svg")
-            pdf_path = os.path.join(source_dir, f"{base_name}.pdf")
-            png_path = os.path.join(source_dir, f"{base_name}.png")
-            
-            has_svg = os.path.exists(svg_path)
-            has_pdf = os.path.exists(pdf_path)
-            has_png = os.path.exists(png_path)
-            has_vector = has_svg or has_pdf
-
-            # --- Decision Logic ---
-            if has_vector:
-                # 1. A vector asset exists. Create the primary .imageset from it.
-                # Prioritize SVG over PDF.
-                vector_source_path = svg_path if has_svg else pdf_path
-                create_imageset(base_name, vector_source_path, is_vector=True, output_dir=output_dir, verbose=args.verbose)
-                
-                # 2. If a PNG also exists, create a separate, suffixed raster set.
-                if has_png:
-                    raster_imageset_name = f"{base_name}{args.raster_suffix}"
-                    create_imageset(raster_imageset_name, png_path, is_vector=False, output_dir=output_dir, verbose=args.verbose)
-
-            elif has_png:
-                # 3. No vector, but a PNG exists. Create the primary .imageset from the PNG.
-                # It is NOT given the raster suffix in this case.
-                create_imageset(base_name, png_path, is_vector=False, output_dir=output_dir, verbose=args.verbose)
-            
-            else:
-                if args.verbose:
-                    print(f"  -> No assets (.svg, .pdf, .png) found for '{base_name}', skipping.")
-
+            pair_names.append(base_name)
             processed_pairs.add(base_name)
 
+    def convert(base_name):
+        return convert_pair(base_name, source_dir, source_files, output_dir, raster_suffix=args.raster_suffix, verbose=args.verbose, syncer=syncer)
+
+    # Pairs are independent, so they can be converted concurrently; logs are printed in pair order
+    if args.jobs > 1 and len(pair_names) > 1:
+        with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+            results = list(executor.map(convert, pair_names))
+    else:
+        results = [convert(base_name) for base_name in pair_names]
+    for imageset_names, log_lines in results:
+        for line in log_lines:
+            print(line)
+        expected_imagesets.update(f"{name}.imageset" for name in imageset_names)
+
+    syncer.finish()
+    removed = []
+    if args.prune and not pair_names:
+        print(f"Warning: No language-pair files found in '{source_dir}'; not pruning imagesets. Check --source.")
+    elif args.prune:
+        removed = remove_stale_imagesets(output_dir, expected_imagesets, verbose=args.verbose)
+
+    stats = syncer.stats
+    print(f"\nImagesets: {len(expected_imagesets)} current, {len(removed)} stale removed.")
+    print(f"Files: {stats['copied']} copied, {stats['linked']} linked, {stats['unchanged']} unchanged; "
+          f"Contents.json: {stats['json_written']} written, {stats['json_unchanged']} unchanged.")
     print("\nAsset conversion finished successfully.")
 
 if __name__ == "__main__":
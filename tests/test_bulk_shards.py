@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from bulk_shards import shard_of, in_shard, merge_shards
+from render_manifest import RenderManifest
+
+PRESET_NAMES = [f"{source}-{target}" for source in ("en", "pl", "cs", "de", "fr", "pt-BR") for target in ("en", "pl", "cs", "de", "fr", "es")] + [f"preset-{index}" for index in range(200)]
+
+
+@pytest.mark.parametrize("shard_count", [1, 2, 3, 4, 7, 16])
+def test_every_preset_lands_in_exactly_one_shard(shard_count):
+    for preset_name in PRESET_NAMES:
+        owners = [index for index in range(1, shard_count + 1) if in_shard(preset_name, (index, shard_count))]
+        assert owners == [shard_of(preset_name, shard_count)]
+        assert in_shard(preset_name, None)
+
+
+def test_shards_are_all_used():
+    assert {shard_of(preset_name, 4) for preset_name in PRESET_NAMES} == {1, 2, 3, 4}
+
+
+def make_shard(shard_dir, outputs, shard=None, completed=True):
+    """Writes a finished (or interrupted) shard directory; outputs maps preset name -> (render key, file contents)."""
+    os.makedirs(shard_dir, exist_ok=True)
+    manifest = RenderManifest(str(shard_dir), shard=shard)
+    manifest.open_journal()
+    for preset_name, (render_key, contents) in outputs.items():
+        (shard_dir / f"{preset_name}.svg").write_text(contents)
+        manifest.record(preset_name, render_key, [f"{preset_name}.svg"])
+    manifest.finish(completed)
+    return str(shard_dir)
+
+
+def test_merge_copies_every_shard_and_marks_presets_up_to_date(tmp_path):
+    shard_dirs = [make_shard(tmp_path / "s1", {'a': ('key-a', 'A')}, shard=(1, 2)),
+                  make_shard(tmp_path / "s2", {'b': ('key-b', 'B')}, shard=(2, 2))]
+    output_dir = str(tmp_path / "out")
+    success, message = merge_shards(shard_dirs, output_dir)
+    assert success and "2 copied" in message
+
+    merged = RenderManifest.load(output_dir)
+    assert merged.shard is None
+    assert merged.is_up_to_date('a', 'key-a') and merged.is_up_to_date('b', 'key-b')
+    assert (tmp_path / "out" / "b.svg").read_text() == 'B'
+
+    # A second merge finds everything current and copies nothing
+    success, message = merge_shards(shard_dirs, output_dir)
+    assert success and "0 copied, 2 already up to date" in message
+
+
+def test_merge_keeps_the_later_shard_for_conflicting_entries(tmp_path, capsys):
+    shard_dirs = [make_shard(tmp_path / "s1", {'a': ('key-old', 'old')}),
+                  make_shard(tmp_path / "s2", {'a': ('key-new', 'new')})]
+    output_dir = str(tmp_path / "out")
+    assert merge_shards(shard_dirs, output_dir)[0]
+    assert "with different settings; keeping the one from" in capsys.readouterr().out
+    assert (tmp_path / "out" / "a.svg").read_text() == 'new'
+    assert RenderManifest.load(output_dir).is_up_to_date('a', 'key-new')
+
+
+def test_merge_replaces_stale_outputs_and_skips_incomplete_entries(tmp_path, capsys):
+    output_dir = str(tmp_path / "out")
+    make_shard(tmp_path / "out", {'a': ('key-stale', 'stale')})
+    shard_dir = make_shard(tmp_path / "s1", {'a': ('key-a', 'fresh'), 'b': ('key-b', 'B')}, shard=(1, 2), completed=False)
+    os.remove(os.path.join(shard_dir, "b.svg"))
+
+    success, message = merge_shards([shard_dir], output_dir)
+    out = capsys.readouterr().out
+    assert success and "1 copied" in message
+    assert "did not finish" in out
+    assert "'b' in " in out and "is missing b.svg; skipped" in out
+    assert "No output for shard(s) 2/2" in out
+    assert (tmp_path / "out" / "a.svg").read_text() == 'fresh'
+    merged = RenderManifest.load(output_dir)
+    assert merged.is_up_to_date('a', 'key-a')
+    assert 'b' not in merged.entries
+
+
+def test_merge_without_finished_presets_fails(tmp_path):
+    os.makedirs(tmp_path / "empty")
+    success, message = merge_shards([str(tmp_path / "empty"), str(tmp_path / "missing")], str(tmp_path / "out"))
+    assert not success
+    assert "Nothing to merge" in message
@@ -0,0 +1,21 @@
+import pytest
+
+from svg_styler_core import COUNTRIES, leaf_params_from_preset
+
+
+@pytest.mark.parametrize("key", ["Poland", "poland", " PL ", "pl"])
+def test_get_resolves_names_and_codes_in_any_case(key):
+    assert COUNTRIES.get(key).code == COUNTRIES.get("Poland").code
+
+
+@pytest.mark.parametrize("key", [None, "", 48, 4.5, ["Poland"], {"name": "Poland"}, True, "Atlantis"])
+def test_get_returns_none_for_unknown_or_non_string_keys(key):
+    assert COUNTRIES.get(key) is None
+    assert key not in COUNTRIES
+
+
+def test_preset_leaves_with_non_string_countries_are_left_out():
+    leaf_params = leaf_params_from_preset({'top_country': 'Poland', 'right_country': 616, 'left_country': None})
+    assert leaf_params['top_params']['country_code'] == COUNTRIES.get('Poland').code
+    assert leaf_params['right_params'] is None
+    assert leaf_params['left_params'] is None
@@ -0,0 +1,34 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from flag_registry import viewport_transform
+
+
+def flag_root(view_box, preserve_aspect_ratio=None):
+    root = ET.Element("svg", {"viewBox": view_box})
+    if preserve_aspect_ratio:
+        root.set("preserveAspectRatio", preserve_aspect_ratio)
+    return root
+
+
+@pytest.mark.parametrize("view_box, width, height", [
+    ("0 0 120 120", 120, 120),
+    ("0 0 119.99999 120", 120, 120),
+    ("0.00000001 0 60 40", 60, 40),
+])
+def test_near_identity_viewbox_needs_no_transform(view_box, width, height):
+    assert viewport_transform(flag_root(view_box), width, height) is None
+
+
+def test_noise_on_one_axis_is_dropped_next_to_a_real_offset():
+    assert viewport_transform(flag_root("0 0 119.99999 60"), 120, 120) == "translate(0,30)"
+
+
+@pytest.mark.parametrize("view_box, par, width, height, expected", [
+    ("0 0 6 4", None, 600, 400, "scale(100)"),
+    ("-10 0 20 10", None, 40, 20, "translate(20,0) scale(2)"),
+    ("0 0 10 10", "none", 20, 10, "scale(2,1)"),
+])
+def test_real_transforms_are_kept(view_box, par, width, height, expected):
+    assert viewport_transform(flag_root(view_box, par), width, height) == expected
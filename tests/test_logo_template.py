@@ -0,0 +1,33 @@
+import pytest
+
+import svg_styler_core
+
+
+def write_module(tmp_path, svg_content):
+    source_path = tmp_path / "svg_styler_core.py"
+    source_path.write_text(f"LOGO_TEMPLATE_SVG = {svg_content!r}\n", encoding="utf-8")
+    return str(source_path)
+
+
+@pytest.mark.parametrize("old, new", [
+    (' viewBox="0 0 640 510"', ''),
+    ('viewBox="0 0 640 510"', 'viewBox="0 0 640"'),
+    ('viewBox="0 0 640 510"', 'viewBox="0 0 wide 510"'),
+    ('viewBox="0 0 640 510"', 'viewBox="0 0 0 510"'),
+])
+def test_reload_rejects_a_template_without_a_usable_viewbox(tmp_path, old, new):
+    assert old in svg_styler_core.LOGO_TEMPLATE_SVG
+    before = (svg_styler_core.LOGO_TEMPLATE_SVG, svg_styler_core.LOGO_TEMPLATE, svg_styler_core.LOGO_TEXT_TEMPLATE,
+              svg_styler_core.LOGO_TEMPLATE_DIGEST, svg_styler_core.LOGO_VIEWBOX_WIDTH)
+    source_path = write_module(tmp_path, svg_styler_core.LOGO_TEMPLATE_SVG.replace(old, new))
+
+    with pytest.raises(ValueError):
+        svg_styler_core.reload_logo_template(source_path)
+
+    after = (svg_styler_core.LOGO_TEMPLATE_SVG, svg_styler_core.LOGO_TEMPLATE, svg_styler_core.LOGO_TEXT_TEMPLATE,
+             svg_styler_core.LOGO_TEMPLATE_DIGEST, svg_styler_core.LOGO_VIEWBOX_WIDTH)
+    assert after == before
+
+
+def test_reload_of_an_unchanged_template_keeps_it():
+    assert svg_styler_core.reload_logo_template() is False
@@ -0,0 +1,40 @@
+import pytest
+
+from pair_matrix import MatrixSpecError, validate_matrix_spec, iter_matrix_presets
+
+LANGUAGES = {
+    "en": {"country": "United Kingdom"},
+    "pt-BR": {"country": "Brazil", "fill_type": "flag-svg"},
+    "pl": {"country": "Poland"},
+}
+
+
+def spec(**extra):
+    return {"languages": LANGUAGES, **extra}
+
+
+def test_overrides_match_language_ids_containing_a_dash():
+    presets = dict(iter_matrix_presets(validate_matrix_spec(spec(overrides={"pt-BR-en": {"top_zoom": 140.0}}))))
+    assert presets["pt-BR-en"]["top_zoom"] == 140.0
+    assert presets["pt-BR-en"]["top_country"] == "Brazil"
+    assert "top_zoom" not in presets["en-pt-BR"]
+
+
+@pytest.mark.parametrize("pair_name", ["pt-en", "BR-en", "en-en", "de-pl", "pl-en"])
+def test_overrides_for_pairs_outside_the_matrix_are_rejected(pair_name):
+    with pytest.raises(MatrixSpecError, match="does not match any pair"):
+        validate_matrix_spec(spec(exclude=["pl-en"], overrides={pair_name: {"top_zoom": 140.0}}))
+
+
+@pytest.mark.parametrize("bad_spec", [
+    spec(leaves=["top", "right"]),
+    spec(leaves="top"),
+    spec(leaves={"source": "top", "target": "top"}),
+    spec(leaves={"source": "middle"}),
+    spec(overrides=["en-pl"]),
+    spec(overrides={"en-pl": 140.0}),
+    spec(overrides={"en-pl": {"top_size": 1}}),
+])
+def test_malformed_specs_raise_matrix_spec_errors(bad_spec):
+    with pytest.raises(MatrixSpecError):
+        validate_matrix_spec(bad_spec)
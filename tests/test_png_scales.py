@@ -0,0 +1,20 @@
+import argparse
+
+import pytest
+
+from svg_styler_core import parse_png_scales, png_scale_suffix
+
+
+@pytest.mark.parametrize("value, expected", [("1", [1]), ("1,2,3", [1, 2, 3]), (" 2, 3 ", [2, 3]), ("1,2,", [1, 2])])
+def test_accepts_whole_number_scales(value, expected):
+    assert parse_png_scales(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "1.5", "1,2.5", "0", "-2", "2x"])
+def test_rejects_scales_without_an_asset_catalog_variant(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_png_scales(value)
+
+
+def test_scale_suffixes_match_the_asset_converter():
+    assert [f"en-pl{png_scale_suffix(scale)}.png" for scale in parse_png_scales('1,2,3')] == ['en-pl.png', 'en-pl@2x.png', 'en-pl@3x.png']
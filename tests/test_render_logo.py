@@ -0,0 +1,25 @@
+import json
+import os
+
+import svg_styler_core
+
+PRESETS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'presets.json')
+
+
+def test_streaming_render_writes_nothing_to_stdout(capsys, monkeypatch):
+    # Start from unloaded optional dependencies, so the render below triggers the lazy imports
+    monkeypatch.setattr(svg_styler_core, '_cairosvg_loaded', False)
+    monkeypatch.setattr(svg_styler_core, '_fast_raster_loaded', False)
+    svg_styler_core.pop_dependency_messages()
+    with open(PRESETS_PATH) as f:
+        presets = list(json.load(f).items())[:2]
+
+    for png_engine in ('cairo', 'numpy'):
+        outputs = list(svg_styler_core.iter_rendered_logos(presets, png_width=64, formats=['svg', 'png', 'pdf'],
+                                                           on_error=lambda *args: None, png_engine=png_engine))
+        assert [label for _, label, _ in outputs if label == 'svg'] == ['svg'] * len(presets)
+
+    assert capsys.readouterr().out == ''
+    messages = svg_styler_core.pop_dependency_messages()
+    assert bool(messages) == (svg_styler_core.load_cairosvg() is None or svg_styler_core.load_fast_raster() is None)
+    assert svg_styler_core.pop_dependency_messages() == []
@@ -0,0 +1,78 @@
+import json
+import os
+
+from render_manifest import RenderManifest, JOURNAL_FILENAME, MANIFEST_FILENAME
+
+
+def write_output(output_dir, filename):
+    with open(os.path.join(output_dir, filename), 'w') as f:
+        f.write("<svg/>")
+
+
+def test_interrupted_run_is_resumed_from_its_journal(tmp_path):
+    output_dir = str(tmp_path)
+    manifest = RenderManifest.load(output_dir)
+    manifest.open_journal()
+    for preset_name, render_key in (('a', 'key-a'), ('b', 'key-b'), ('c', 'key-c')):
+        write_output(output_dir, f"{preset_name}.svg")
+        manifest.record(preset_name, render_key, [f"{preset_name}.svg"])
+    manifest.forget('c')  # e.g. a preset that failed after an earlier success
+    manifest.finish(completed=False)
+    assert os.path.exists(os.path.join(output_dir, JOURNAL_FILENAME))
+
+    resumed = RenderManifest.load(output_dir)
+    assert resumed.interrupted
+    assert resumed.resumed == {'a', 'b'}
+    assert resumed.is_up_to_date('a', 'key-a')
+    assert resumed.is_up_to_date('b', 'key-b')
+    assert not resumed.is_up_to_date('a', 'key-changed')
+    assert 'c' not in resumed.entries
+
+
+def test_killed_run_without_a_manifest_is_resumed_from_a_partial_journal(tmp_path):
+    output_dir = str(tmp_path)
+    manifest = RenderManifest.load(output_dir)
+    manifest.open_journal()
+    write_output(output_dir, "a.svg")
+    manifest.record('a', 'key-a', ["a.svg"])
+    manifest._journal.write('{"name": "b", "key": "key-')  # Killed in the middle of a write
+    manifest._journal.close()
+    assert not os.path.exists(os.path.join(output_dir, MANIFEST_FILENAME))
+
+    resumed = RenderManifest.load(output_dir)
+    assert resumed.interrupted
+    assert resumed.resumed == {'a'}
+    assert resumed.is_up_to_date('a', 'key-a')
+    assert 'b' not in resumed.entries
+
+
+def test_completed_run_removes_the_journal_and_keeps_the_entries(tmp_path):
+    output_dir = str(tmp_path)
+    manifest = RenderManifest.load(output_dir)
+    manifest.open_journal()
+    write_output(output_dir, "a.svg")
+    manifest.record('a', 'key-a', ["a.svg"])
+    manifest.finish(completed=False)
+
+    resumed = RenderManifest.load(output_dir)
+    resumed.open_journal()
+    write_output(output_dir, "b.svg")
+    resumed.record('b', 'key-b', ["b.svg"])
+    resumed.finish(completed=True)
+    assert not resumed.interrupted
+    assert resumed.resumed == set()
+
+    reloaded = RenderManifest.load(output_dir)
+    assert not reloaded.interrupted
+    assert reloaded.resumed == set()
+    assert reloaded.is_up_to_date('a', 'key-a') and reloaded.is_up_to_date('b', 'key-b')
+    with open(os.path.join(output_dir, MANIFEST_FILENAME)) as f:
+        assert set(json.load(f)['entries']) == {'a', 'b'}
+
+
+def test_missing_output_is_not_up_to_date(tmp_path):
+    output_dir = str(tmp_path)
+    manifest = RenderManifest(output_dir)
+    manifest.record('a', 'key-a', ["a.svg", "a.png"])
+    write_output(output_dir, "a.svg")
+    assert not manifest.is_up_to_date('a', 'key-a')
@@ -0,0 +1,27 @@
+import re
+import time
+
+from render_profile import StageProfiler
+
+
+def test_nested_stages_are_charged_self_time():
+    profiler = StageProfiler(enabled=True)
+    start = time.perf_counter()
+    with profiler.stage('emit'):
+        time.sleep(0.02)
+        with profiler.stage('gradient'):
+            time.sleep(0.02)
+        with profiler.stage('flag_load'):
+            time.sleep(0.01)
+    wall = time.perf_counter() - start
+
+    stages = profiler.snapshot()['stages']
+    assert 0.02 <= stages['emit']['total_s'] < 0.04  # The 0.03 s spent in nested stages is not counted again
+    assert sum(stats['total_s'] for stats in stages.values()) <= wall
+
+    report = profiler.format_report()
+    shares = [float(share) for share in re.findall(r"([\d.]+)%$", report, re.MULTILINE)]
+    assert len(shares) == 3
+    assert abs(sum(shares) - 100.0) < 0.5
+    reported_total = float(re.search(r"^\s+total\s+([\d.]+)$", report, re.MULTILINE).group(1))
+    assert reported_total <= wall * 1000 + 0.01
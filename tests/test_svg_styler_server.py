@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import svg_styler_server
+from svg_styler_server import LogoServer, MAX_REQUEST_LINE
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class MemoryWriter:
+    def __init__(self):
+        self.data = bytearray()
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def server(monkeypatch):
+    # Presets and flags are resolved relative to the repository root; threads stand in for worker processes
+    monkeypatch.chdir(REPO_ROOT)
+    monkeypatch.setattr(svg_styler_server, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    logo_server = LogoServer(workers=1)
+    yield logo_server
+    logo_server.close()
+
+
+def send(server, raw):
+    """Feeds raw request bytes through handle_connection and returns (status, headers, body)."""
+    async def run():
+        reader = asyncio.StreamReader(limit=MAX_REQUEST_LINE)
+        reader.feed_data(raw)
+        reader.feed_eof()
+        writer = MemoryWriter()
+        await server.handle_connection(reader, writer)
+        assert writer.closed
+        return bytes(writer.data)
+
+    head, _, body = asyncio.run(run()).partition(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    headers = dict(line.split(': ', 1) for line in header_lines)
+    return int(status_line.split()[1]), headers, body
+
+
+def get(server, target, method='GET', extra_headers=b''):
+    return send(server, f"{method} {target} HTTP/1.1\r\n".encode('latin-1') + b"Host: localhost\r\n" + extra_headers + b"\r\n")
+
+
+def test_serves_a_preset_as_svg(server):
+    status, headers, body = get(server, '/logo.svg?preset=pl-en')
+    assert status == 200
+    assert headers['Content-Type'] == 'image/svg+xml'
+    assert int(headers['Content-Length']) == len(body)
+    assert b'<svg' in body
+
+
+@pytest.mark.parametrize("raw, expected_status", [
+    (b"GARBAGE\r\n\r\n", 400),
+    (b"GET /logo.svg?top-country=Atlantis HTTP/1.1\r\n\r\n", 400),
+    (b"GET /logo.svg?png-width=wide&preset=pl-en HTTP/1.1\r\n\r\n", 400),
+    (b"GET /logo.svg?preset=no-such-preset HTTP/1.1\r\n\r\n", 404),
+    (b"GET /favicon.ico HTTP/1.1\r\n\r\n", 404),
+    (b"POST /logo.svg?preset=pl-en HTTP/1.1\r\n\r\n", 405),
+    (b"GET /logo.svg?preset=pl-en&x=" + b"a" * (MAX_REQUEST_LINE + 1) + b" HTTP/1.1\r\n\r\n", 414),
+    (b"GET /logo.svg?preset=pl-en HTTP/1.1\r\nX-Big: " + b"a" * (MAX_REQUEST_LINE + 1) + b"\r\n\r\n", 431),
+])
+def test_rejects_bad_requests(server, raw, expected_status):
+    status, headers, body = send(server, raw)
+    assert status == expected_status
+    assert headers['Content-Type'].startswith('text/plain')
+    assert int(headers['Content-Length']) == len(body) > 0
+
+
+@pytest.mark.parametrize("target, expected_status", [
+    ('/logo.svg?preset=pl-en', 200),
+    ('/logo.svg?preset=no-such-preset', 404),
+    ('/logo.svg?top-country=Atlantis', 400),
+])
+def test_head_responses_have_no_body(server, target, expected_status):
+    _, _, get_body = get(server, target)
+    status, headers, body = get(server, target, method='HEAD')
+    assert status == expected_status
+    assert body == b''
+    assert int(headers['Content-Length']) == len(get_body)
+
+
+def test_if_none_match_answers_304(server):
+    _, headers, _ = get(server, '/logo.svg?preset=pl-en')
+    status, revalidated, body = get(server, '/logo.svg?preset=pl-en', extra_headers=f"If-None-Match: \"other\", {headers['ETag']}\r\n".encode())
+    assert status == 304
+    assert revalidated['ETag'] == headers['ETag']
+    assert 'Content-Length' not in revalidated
+    assert body == b''
+
+
+def test_svg_etag_ignores_png_size(server):
+    etags = {get(server, target)[1]['ETag'] for target in (
+        '/logo.svg?preset=pl-en', '/logo.svg?preset=pl-en&png-width=800', '/logo.svg?preset=pl-en&png-width=800&scale=2')}
+    assert len(etags) == 1
+
+
+def test_presets_are_reloaded_when_the_file_changes(server, tmp_path):
+    presets_path = tmp_path / "presets.json"
+    presets_path.write_text(json.dumps({"a": {"top_country": "Poland"}}))
+    server.presets_path = str(presets_path)
+    assert get(server, '/logo.svg?preset=a')[0] == 200
+    assert get(server, '/logo.svg?preset=b')[0] == 404
+
+    presets_path.write_text(json.dumps({"a": {"top_country": "Poland"}, "b": {"top_country": "Germany"}}))
+    assert get(server, '/logo.svg?preset=b')[0] == 200
+    presets_path.unlink()
+    assert get(server, '/logo.svg?preset=a')[0] == 404